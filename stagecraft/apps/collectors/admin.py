@@ -18,7 +18,7 @@ from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
 from stagecraft.apps.collectors import models
-from stagecraft.apps.collectors.tasks import run_collector
+from stagecraft.apps.collectors.tasks import queue_collector
 
 
 class SelectWithData(Select):
@@ -118,7 +118,7 @@ def run_now(modeladmin, request, queryset):
 
     for collector in queryset:
         try:
-            run_collector.delay(
+            queue_collector(
                 collector.slug, start_at=start_at, end_at=end_at)
         except SystemExit:
             message = "An exception has occurred. " \
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CollectorsConfig(AppConfig):
+    name = 'stagecraft.apps.collectors'
+    label = 'collectors'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,107 @@
+"""
+Backfills run a collector over a long range of dates as day or week long
+chunks, each in its own task. A failure then costs one chunk rather than the
+whole range, and workers are recycled between chunks. Chunks are
+checkpointed in the database, so starting the same backfill again only runs
+the chunks that have not succeeded.
+"""
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from stagecraft.apps.collectors.models import Backfill, BackfillChunk
+
+CHUNK_DAYS = {
+    'day': 1,
+    'week': 7,
+}
+
+
+def chunk_ranges(start_at, end_at, chunk_days):
+    """Split the inclusive range of dates into inclusive chunks."""
+    ranges = []
+    chunk_start = start_at
+    while chunk_start <= end_at:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_at)
+        ranges.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return ranges
+
+
+def _unfinished():
+    # A chunk left running for longer than BACKFILL_CHUNK_TIMEOUT is assumed
+    # to have died with its worker.
+    stale = timezone.now() - timedelta(
+        seconds=settings.BACKFILL_CHUNK_TIMEOUT)
+    return ~Q(status=BackfillChunk.SUCCEEDED) & ~Q(
+        status=BackfillChunk.RUNNING, updated_at__gte=stale)
+
+
+def prepare(collector, start_at, end_at, chunk_days, dry_run=False):
+    """
+    Find or create the backfill and its chunks, and mark every chunk that
+    still needs running as pending.
+
+    Returns the backfill and the ids of those chunks in date order.
+    """
+    with transaction.atomic():
+        backfill, created = Backfill.objects.get_or_create(
+            collector=collector, start_at=start_at, end_at=end_at,
+            chunk_days=chunk_days, dry_run=dry_run)
+        if created:
+            BackfillChunk.objects.bulk_create([
+                BackfillChunk(backfill=backfill, start_at=start, end_at=end)
+                for start, end in chunk_ranges(start_at, end_at, chunk_days)
+            ])
+
+        chunk_ids = list(backfill.chunks.filter(_unfinished())
+                         .order_by('start_at').values_list('pk', flat=True))
+        BackfillChunk.objects.filter(pk__in=chunk_ids).update(
+            status=BackfillChunk.PENDING, updated_at=timezone.now())
+    return backfill, chunk_ids
+
+
+def claim_chunk(chunk_id):
+    """
+    Mark the chunk as running, unless it has succeeded or is already
+    running elsewhere, in which case return None.
+    """
+    claimed = BackfillChunk.objects.filter(
+        Q(pk=chunk_id) & _unfinished()
+    ).update(status=BackfillChunk.RUNNING, attempts=F('attempts') + 1,
+             error='', updated_at=timezone.now())
+    if not claimed:
+        return None
+    return BackfillChunk.objects.select_related(
+        'backfill__collector').get(pk=chunk_id)
+
+
+def finish_chunk(chunk, status, run=None, error=''):
+    chunk.status = status
+    chunk.run = run
+    chunk.error = error
+    chunk.updated_at = timezone.now()
+    # An update rather than a save, which would raise if the collector, and
+    # so the chunk, had been deleted while it ran
+    BackfillChunk.objects.filter(pk=chunk.pk).update(
+        status=status, run=run, error=error, updated_at=chunk.updated_at)
+
+
+def release_chunk(chunk):
+    """Put a claimed chunk back, unattempted, to be run again later."""
+    BackfillChunk.objects.filter(pk=chunk.pk).update(
+        status=BackfillChunk.PENDING, attempts=F('attempts') - 1,
+        updated_at=timezone.now())
+
+
+def abandon(backfill_id, error):
+    """Fail every chunk of the backfill that has not succeeded."""
+    BackfillChunk.objects.filter(backfill_id=backfill_id).exclude(
+        status=BackfillChunk.SUCCEEDED
+    ).update(status=BackfillChunk.FAILED, error=error,
+             updated_at=timezone.now())
@@ -0,0 +1,132 @@
+"""
+Per-process cache of what running a collector needs from the database.
+
+A snapshot holds a collector's payload, its data source with the
+credentials already decrypted and parsed, and its data set's bearer token.
+Snapshots are stored against a version number kept in Redis, which is
+incremented whenever a collector or anything its config is made from
+changes (see ``stagecraft.apps.collectors.signals``), so a worker only
+reloads them after something has changed. Without Redis there is no shared
+version to trust and nothing is cached.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import copy
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django_statsd.clients import statsd
+
+from stagecraft.apps.collectors.models import Collector
+from stagecraft.libs.redis_client import get_redis_client, RedisError
+from . import fan_out
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'collectors:config-version'
+
+
+class Snapshot(object):
+
+    def __init__(self, payload, data_source, credentials, bearer_token):
+        self.payload = payload
+        self.data_source = data_source
+        self._credentials = credentials
+        self.bearer_token = bearer_token
+
+    @classmethod
+    def from_collector(cls, collector):
+        return cls(fan_out.collector_payload(collector),
+                   collector.data_source,
+                   json.loads(collector.data_source.credentials),
+                   collector.data_set.bearer_token)
+
+    @property
+    def credentials(self):
+        # A copy, as the caller may swap in a credentials store
+        return copy.deepcopy(self._credentials)
+
+
+def current_version():
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        version = client.get(VERSION_KEY)
+        if version is None:
+            client.set(VERSION_KEY, 0, nx=True)
+            version = client.get(VERSION_KEY)
+    except RedisError as e:
+        statsd.incr('collectors.config_cache.error')
+        logger.warning('collector config version read failed: {}'.format(e))
+        return None
+    return int(version)
+
+
+def bump_version():
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.incr(VERSION_KEY)
+    except RedisError as e:
+        statsd.incr('collectors.config_cache.error')
+        logger.error('collector config invalidation failed: {}'.format(e))
+
+
+class ConfigCache(object):
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'COLLECTOR_CONFIG_CACHE_SIZE', 0)
+
+    def snapshots(self, slugs):
+        """
+        Snapshots of the named collectors, keyed by slug, loading those not
+        cached in one query. Collectors that no longer exist are left out.
+        """
+        version = current_version() if self.max_size > 0 else None
+        found = {}
+        if version is not None:
+            with self._lock:
+                for slug in slugs:
+                    entry = self._entries.pop(slug, None)
+                    if entry is not None and entry[0] == version:
+                        # re-insert to mark as most recently used
+                        self._entries[slug] = entry
+                        found[slug] = entry[1]
+
+        missing = [slug for slug in slugs if slug not in found]
+        if found:
+            statsd.incr('collectors.config_cache.hit', len(found))
+        if not missing:
+            return found
+
+        statsd.incr('collectors.config_cache.miss', len(missing))
+        collectors = fan_out.with_config(Collector.objects.select_related(
+            'data_source')).filter(slug__in=missing)
+        loaded = {collector.slug: Snapshot.from_collector(collector)
+                  for collector in collectors}
+        found.update(loaded)
+
+        if version is not None:
+            with self._lock:
+                for slug, snapshot in loaded.items():
+                    self._entries[slug] = (version, snapshot)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+config_cache = ConfigCache()
@@ -0,0 +1,83 @@
+"""
+Planning of scheduled collector runs.
+
+Collectors are loaded in one query and turned into payloads that workers can
+run without looking the collector up again, then split into lanes: lists of
+collectors for one provider run one after another. Each provider gets at
+most ``concurrency`` lanes (see ``COLLECTOR_PROVIDER_LIMITS``), and every
+collector takes a token from its provider's bucket before starting.
+"""
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.conf import settings
+
+from stagecraft.apps.collectors.models import Collector
+from .rate_limit import get_token_bucket
+
+
+def provider_limits(provider_slug):
+    limits = dict(settings.COLLECTOR_PROVIDER_LIMIT_DEFAULTS)
+    limits.update(settings.COLLECTOR_PROVIDER_LIMITS.get(provider_slug, {}))
+    return limits
+
+
+def provider_token_bucket(provider_slug):
+    limits = provider_limits(provider_slug)
+    return get_token_bucket(provider_slug, limits['rate'], limits['burst'])
+
+
+def with_config(query_set):
+    """Load everything a collector payload needs along with the collectors."""
+    return query_set.select_related(
+        'type__provider', 'data_set__data_group', 'data_set__data_type')
+
+
+def collector_payload(collector):
+    """
+    Everything needed to run ``collector`` apart from its credentials and
+    bearer token, which are read by the worker rather than passed through
+    the broker.
+    """
+    return {
+        'collector_id': str(collector.id),
+        'slug': collector.slug,
+        'type': collector.type.slug,
+        'entry_point': collector.type.entry_point,
+        'provider': collector.type.provider.slug,
+        'data_source_id': str(collector.data_source_id),
+        'data_set_id': collector.data_set_id,
+        'data_set': {
+            'data-group': str(collector.data_set.data_group),
+            'data-type': str(collector.data_set.data_type),
+        },
+        'query': collector.query,
+        'options': collector.options,
+    }
+
+
+def payloads_for_types(collector_type_slugs):
+    collectors = with_config(Collector.objects.filter(
+        type__slug__in=collector_type_slugs)).order_by('slug')
+    return [collector_payload(collector) for collector in collectors]
+
+
+def plan_lanes(payloads):
+    """
+    Deal each provider's payloads round-robin into at most its
+    ``concurrency`` lanes. Payloads are ordered by data source first, so a
+    lane runs the collectors sharing credentials close together.
+    """
+    by_provider = defaultdict(list)
+    for payload in payloads:
+        by_provider[payload['provider']].append(payload)
+
+    lanes = []
+    for provider, provider_payloads in sorted(by_provider.items()):
+        provider_payloads.sort(
+            key=lambda payload: (payload['data_source_id'], payload['slug']))
+        concurrency = max(1, provider_limits(provider)['concurrency'])
+        count = min(concurrency, len(provider_payloads))
+        lanes.extend(provider_payloads[i::count] for i in range(count))
+    return lanes
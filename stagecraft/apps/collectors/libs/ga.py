@@ -1,11 +1,183 @@
-from oauth2client.client import Storage, OAuth2Credentials
+"""
+OAuth 2.0 credentials for collectors, stored against their data source.
+
+Refreshing an access token is single flight: ``CredentialStorage`` holds a
+lock per data source (in Redis when it is configured, as a Postgres advisory
+lock otherwise) around oauth2client's refresh, which re-reads the stored
+credentials once it has the lock. So when a token expires under several
+collectors at once, one of them asks the provider for a new one and the rest
+pick up what it stored. A collector waits at most
+``OAUTH2_REFRESH_LOCK_TIMEOUT`` seconds for the lock before going ahead
+without it.
+
+Each process keeps the credentials it last read for each data source
+against a generation number in Redis that every refresh increments, so they
+are only read and decrypted again after they have changed.
+"""
+from __future__ import unicode_literals
+
 import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django_statsd.clients import statsd
+from oauth2client.client import Storage, OAuth2Credentials
+
+from stagecraft.apps.collectors.models import DataSource
+from stagecraft.libs.redis_client import get_redis_client, RedisError
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY_PREFIX = 'collectors:oauth2-generation:'
+LOCK_KEY_PREFIX = 'collectors:oauth2-refresh:'
+ADVISORY_LOCK_POLL_INTERVAL = 0.1
+
+
+def current_generation(data_source_id):
+    client = get_redis_client()
+    if client is None:
+        return None
+    key = '{}{}'.format(GENERATION_KEY_PREFIX, data_source_id)
+    try:
+        generation = client.get(key)
+        if generation is None:
+            client.set(key, 0, nx=True)
+            generation = client.get(key)
+    except RedisError as e:
+        statsd.incr('collectors.oauth2.error')
+        logger.warning('credentials generation read failed: {}'.format(e))
+        return None
+    return int(generation)
+
+
+def bump_generation(data_source_id):
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return client.incr(
+            '{}{}'.format(GENERATION_KEY_PREFIX, data_source_id))
+    except RedisError as e:
+        statsd.incr('collectors.oauth2.error')
+        logger.error('credentials generation bump failed: {}'.format(e))
+        return None
+
+
+class CredentialsCache(object):
+    """
+    The OAuth 2.0 credentials JSON this process last read or wrote for each
+    data source, and the generation it was current for.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, data_source_id, generation):
+        if generation is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(data_source_id)
+        if entry is None or entry[0] != generation:
+            return None
+        return entry[1]
+
+    def set(self, data_source_id, generation, oauth2_json):
+        if generation is None:
+            return
+        with self._lock:
+            self._entries[data_source_id] = (generation, oauth2_json)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+credentials_cache = CredentialsCache()
+
+
+class RefreshLock(object):
+
+    def __init__(self, data_source_id):
+        self.key = '{}{}'.format(LOCK_KEY_PREFIX, data_source_id)
+        self._redis_lock = None
+        self._advisory = False
+
+    def acquire(self):
+        timeout = settings.OAUTH2_REFRESH_LOCK_TIMEOUT
+        with statsd.timer('collectors.oauth2.refresh_lock.wait'):
+            client = get_redis_client()
+            if client is not None:
+                try:
+                    lock = client.lock(
+                        self.key, timeout=timeout, blocking_timeout=timeout)
+                    if lock.acquire():
+                        self._redis_lock = lock
+                    else:
+                        # Carry on unlocked rather than stall the collector;
+                        # the worst case is a second refresh.
+                        statsd.incr('collectors.oauth2.refresh_lock.timeout')
+                        logger.warning(
+                            'timed out waiting for {}'.format(self.key))
+                    return
+                except RedisError as e:
+                    statsd.incr('collectors.oauth2.error')
+                    logger.warning(
+                        'refresh lock failed, using the database: {}'.format(
+                            e))
+            self._advisory = self._try_advisory_lock(timeout)
+            if not self._advisory:
+                statsd.incr('collectors.oauth2.refresh_lock.timeout')
+                logger.warning('timed out waiting for {}'.format(self.key))
+
+    def _try_advisory_lock(self, timeout):
+        # Polled rather than waited for, since an advisory lock has no
+        # expiry and its holder may have hung.
+        deadline = time.time() + timeout
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    'SELECT pg_try_advisory_lock(hashtext(%s))', [self.key])
+                if cursor.fetchone()[0]:
+                    return True
+                if time.time() >= deadline:
+                    return False
+                time.sleep(ADVISORY_LOCK_POLL_INTERVAL)
+
+    def release(self):
+        if self._redis_lock is not None:
+            lock, self._redis_lock = self._redis_lock, None
+            try:
+                lock.release()
+            except RedisError as e:
+                # It will expire by itself
+                logger.warning('refresh lock release failed: {}'.format(e))
+        if self._advisory:
+            self._advisory = False
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_unlock(hashtext(%s))', [self.key])
 
 
 class CredentialStorage(Storage):
 
     def __init__(self, model_class):
         self.model = model_class
+        self._refresh_lock = RefreshLock(model_class.pk)
+
+    def acquire_lock(self):
+        self._refresh_lock.acquire()
+
+    def release_lock(self):
+        self._refresh_lock.release()
+
+    def get(self):
+        # Reading needs no lock. oauth2client takes it itself, and reads
+        # again, before refreshing.
+        return self.locked_get()
 
     def locked_get(self):
         """ Make an OAuth 2.0 credentials object from
@@ -15,9 +187,17 @@ class CredentialStorage(Storage):
         oauth2client.OAuth2Credentials
         """
 
-        db_credentials = json.loads(self.model.credentials)
-        oauth2_credentials = OAuth2Credentials.new_from_json(
-            json.dumps(db_credentials.get('OAUTH2_CREDENTIALS')))
+        generation = current_generation(self.model.pk)
+        oauth2_json = credentials_cache.get(self.model.pk, generation)
+        if oauth2_json is None:
+            statsd.incr('collectors.oauth2.credentials.miss')
+            db_credentials = json.loads(self._stored_credentials())
+            oauth2_json = json.dumps(db_credentials.get('OAUTH2_CREDENTIALS'))
+            credentials_cache.set(self.model.pk, generation, oauth2_json)
+        else:
+            statsd.incr('collectors.oauth2.credentials.hit')
+
+        oauth2_credentials = OAuth2Credentials.new_from_json(oauth2_json)
         oauth2_credentials.set_store(self)
         return oauth2_credentials
 
@@ -26,9 +206,23 @@ class CredentialStorage(Storage):
         a JSON representation of an OAuth 2.0 credentials object.
         """
 
-        db_credentials = json.loads(self.model.credentials)
-        db_credentials['OAUTH2_CREDENTIALS'] = json.loads(
-            oauth2_credentials.to_json())
+        oauth2_json = oauth2_credentials.to_json()
+        db_credentials = json.loads(self._stored_credentials())
+        db_credentials['OAUTH2_CREDENTIALS'] = json.loads(oauth2_json)
 
+        # An update rather than a save, so that a routine token refresh does
+        # not count as a change to the collector configs built from this
+        # data source.
         self.model.credentials = json.dumps(db_credentials)
-        self.model.save()
+        DataSource.objects.filter(pk=self.model.pk).update(
+            credentials=self.model.credentials)
+        statsd.incr('collectors.oauth2.refreshed')
+
+        credentials_cache.set(
+            self.model.pk, bump_generation(self.model.pk), oauth2_json)
+
+    def _stored_credentials(self):
+        # From the database rather than the model, which may have been
+        # loaded before another worker refreshed the token.
+        return DataSource.objects.filter(pk=self.model.pk).values_list(
+            'credentials', flat=True).get()
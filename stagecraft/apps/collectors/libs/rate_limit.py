@@ -0,0 +1,110 @@
+"""
+Token buckets limiting how often collectors start against each provider.
+
+Buckets are held in Redis so that every worker draws from the same one.
+Without Redis each process keeps its own, which still paces the collectors
+a single worker runs.
+"""
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+from django_statsd.clients import statsd
+
+from stagecraft.libs.redis_client import get_redis_client, RedisError
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'collectors:rate:'
+
+# Refills the bucket for the time since it was last used, then takes a
+# token if there is one. Returns how long to wait before trying again.
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+class TokenBucket(object):
+    """
+    Allows ``burst`` starts at once, refilled at ``rate`` per second. A rate
+    of None never makes anyone wait.
+    """
+
+    def __init__(self, name, rate, burst=1):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = self.burst
+        self._at = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token can be taken."""
+        if self.rate is None:
+            return
+        waited = 0
+        wait = self._take()
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            wait = self._take()
+        if waited:
+            statsd.timing('collectors.rate_limit.{}.wait'.format(self.name),
+                          int(waited * 1000))
+
+    def _take(self):
+        client = get_redis_client()
+        if client is not None:
+            try:
+                return float(client.eval(
+                    TAKE_SCRIPT, 1, KEY_PREFIX + self.name,
+                    self.rate, self.burst, repr(time.time())))
+            except RedisError as e:
+                statsd.incr('collectors.rate_limit.error')
+                logger.warning(
+                    'shared rate limit unavailable: {}'.format(e))
+        return self._take_local()
+
+    def _take_local(self):
+        with self._lock:
+            now = time.time()
+            if self._at is not None:
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + max(0, now - self._at) * self.rate)
+            self._at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(name, rate, burst):
+    """The process-wide bucket called ``name``, created on first use."""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if (bucket is None or bucket.rate != rate or
+                bucket.burst != max(1, burst)):
+            bucket = _buckets[name] = TokenBucket(name, rate, burst)
+        return bucket
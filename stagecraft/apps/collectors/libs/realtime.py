@@ -0,0 +1,135 @@
+"""
+Long running service for the realtime collectors.
+
+Rather than starting every realtime collector at the top of the interval,
+each one is given its own slot in it, nudged by a little random jitter, and
+run on a pool of threads. Collectors for one provider run at most
+``concurrency`` at once and take a token from the provider's bucket, as
+scheduled collectors do (see ``fan_out``), and a collector whose previous
+run has not finished when its slot comes round again is skipped.
+
+Staying up between polls lets each thread keep its database connection and
+the process keep its collector configs and OAuth 2.0 credentials cached.
+"""
+from __future__ import unicode_literals
+
+from multiprocessing.pool import ThreadPool
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django_statsd.clients import statsd
+
+from stagecraft.apps.collectors.tasks import execute, get_config
+from . import fan_out, run_guard
+from .config_cache import config_cache
+
+logger = logging.getLogger(__name__)
+
+
+def plan_cycle(payloads, interval, jitter):
+    """
+    ``(offset, payload)`` pairs spreading ``payloads`` evenly over
+    ``interval`` seconds, each offset nudged by up to ``jitter`` seconds but
+    never into the next collector's slot.
+    """
+    if not payloads:
+        return []
+    step = float(interval) / len(payloads)
+    payloads = sorted(payloads, key=lambda payload: payload['slug'])
+    return [(i * step + random.uniform(0, min(jitter, step)), payload)
+            for i, payload in enumerate(payloads)]
+
+
+class RealtimeService(object):
+
+    def __init__(self, collector_types, interval, jitter, workers):
+        self.collector_types = collector_types
+        self.interval = interval
+        self.jitter = jitter
+        self.workers = workers
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._provider_slots = {}
+        self._stopping = threading.Event()
+
+    def run_forever(self):
+        pool = ThreadPool(self.workers)
+        try:
+            while not self._stopping.is_set():
+                self.run_cycle(pool)
+        finally:
+            pool.close()
+            pool.join()
+
+    def stop(self):
+        """Stop starting collectors; those already running are finished."""
+        self._stopping.set()
+
+    def run_cycle(self, pool):
+        started_at = time.time()
+        payloads = fan_out.payloads_for_types(self.collector_types)
+        close_old_connections()
+        statsd.gauge('collectors.realtime.collectors', len(payloads))
+
+        for offset, payload in plan_cycle(
+                payloads, self.interval, self.jitter):
+            if self._wait_until(started_at + offset):
+                return
+            if settings.DISABLE_COLLECTORS:
+                continue
+            if not self._start(payload['slug']):
+                statsd.incr('collectors.realtime.overrun')
+                logger.warning('{} is still running, skipping it'.format(
+                    payload['slug']))
+                continue
+            pool.apply_async(self.run_collector, (payload,))
+
+        self._wait_until(started_at + self.interval)
+
+    def run_collector(self, payload):
+        slug = payload['slug']
+        close_old_connections()
+        try:
+            with self._provider_slot(payload['provider']):
+                snapshot = config_cache.snapshots([slug]).get(slug)
+                if snapshot is None:
+                    logger.warning(
+                        'collector {} was deleted before it ran'.format(slug))
+                    return
+                with run_guard.slug_lock(slug) as locked:
+                    if not locked:
+                        logger.warning(
+                            'collector {} is already running'.format(slug))
+                        return
+                    execute(snapshot.payload, get_config(snapshot))
+        except Exception:
+            statsd.incr('collectors.realtime.failed')
+            logger.exception('collector {} failed'.format(slug))
+        finally:
+            with self._running_lock:
+                self._running.discard(slug)
+
+    def _start(self, slug):
+        with self._running_lock:
+            if slug in self._running:
+                return False
+            self._running.add(slug)
+            return True
+
+    def _provider_slot(self, provider):
+        with self._running_lock:
+            slot = self._provider_slots.get(provider)
+            if slot is None:
+                concurrency = max(
+                    1, fan_out.provider_limits(provider)['concurrency'])
+                slot = self._provider_slots[provider] = \
+                    threading.BoundedSemaphore(concurrency)
+        return slot
+
+    def _wait_until(self, at):
+        """Sleep until ``at``, returning True if stopped meanwhile."""
+        return self._stopping.wait(max(0, at - time.time()))
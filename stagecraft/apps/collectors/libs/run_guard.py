@@ -0,0 +1,209 @@
+"""
+Keeps runs of one collector from being repeated or from overlapping.
+
+A request to run a collector is marked as pending in Redis until a worker
+picks it up, and an identical request made meanwhile is dropped. Each task
+is marked as started as it begins, so a message the broker delivers again
+is not run twice.
+
+A collector is run while holding a lock on its slug, in Redis when it is
+configured and as a Postgres advisory lock otherwise. What happens to a run
+that finds its collector already running depends on
+``COLLECTOR_OVERLAP_POLICY``:
+
+``skip``
+    the run is dropped.
+``queue``
+    the run is queued again to start once the other has finished.
+``supersede``
+    as ``queue``, but only the latest request for a collector is run; ones
+    made before it are dropped when they start.
+
+Without Redis, requests are neither deduplicated nor superseded, but runs
+still do not overlap.
+"""
+from __future__ import unicode_literals
+
+from contextlib import contextmanager
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django_statsd.clients import statsd
+
+from stagecraft.libs.redis_client import get_redis_client, RedisError
+
+logger = logging.getLogger(__name__)
+
+SKIP = 'skip'
+QUEUE = 'queue'
+SUPERSEDE = 'supersede'
+POLICIES = (SKIP, QUEUE, SUPERSEDE)
+
+PENDING_KEY_PREFIX = 'collectors:pending:'
+LATEST_KEY_PREFIX = 'collectors:latest:'
+STARTED_KEY_PREFIX = 'collectors:started:'
+LOCK_KEY_PREFIX = 'collectors:running:'
+
+# Sets KEYS[1] to ARGV[2], or deletes it if ARGV[2] is empty, but only if
+# it holds ARGV[1].
+REPLACE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] == '' then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+end
+return 1
+"""
+
+
+def policy():
+    if settings.COLLECTOR_OVERLAP_POLICY not in POLICIES:
+        raise ValueError('COLLECTOR_OVERLAP_POLICY must be one of {}'.format(
+            ', '.join(POLICIES)))
+    return settings.COLLECTOR_OVERLAP_POLICY
+
+
+def _pending_key(slug, start_at, end_at, dry_run):
+    return '{}{}:{}:{}:{}'.format(
+        PENDING_KEY_PREFIX, slug, start_at or '', end_at or '',
+        'dry-run' if dry_run else 'run')
+
+
+def _latest_key(slug):
+    return '{}{}'.format(LATEST_KEY_PREFIX, slug)
+
+
+def _report_error(e):
+    statsd.incr('collectors.run_guard.error')
+    logger.warning('collector run guard unavailable: {}'.format(e))
+
+
+def request_run(task_id, slug, start_at=None, end_at=None, dry_run=False):
+    """
+    Note that ``task_id`` is about to be queued to run a collector. Returns
+    False if an identical run is already waiting, in which case it should
+    not be.
+    """
+    client = get_redis_client()
+    if client is None:
+        return True
+    timeout = settings.COLLECTOR_PENDING_TIMEOUT
+    try:
+        if policy() == SUPERSEDE:
+            client.set(_latest_key(slug), task_id, ex=timeout)
+            client.set(_pending_key(slug, start_at, end_at, dry_run),
+                       task_id, ex=timeout)
+            return True
+        return bool(client.set(
+            _pending_key(slug, start_at, end_at, dry_run), task_id,
+            nx=True, ex=timeout))
+    except RedisError as e:
+        _report_error(e)
+        return True
+
+
+def requeue(task_id, new_task_id, slug, start_at=None, end_at=None,
+            dry_run=False):
+    """Hand the place of ``task_id`` over to ``new_task_id``."""
+    client = get_redis_client()
+    if client is None:
+        return
+    timeout = settings.COLLECTOR_PENDING_TIMEOUT
+    try:
+        client.set(_pending_key(slug, start_at, end_at, dry_run),
+                   new_task_id, ex=timeout)
+        if task_id is not None:
+            client.eval(REPLACE_SCRIPT, 1, _latest_key(slug),
+                        task_id, new_task_id, timeout)
+    except RedisError as e:
+        _report_error(e)
+
+
+def start_run(task_id, slug, start_at=None, end_at=None, dry_run=False):
+    """
+    Mark ``task_id`` as started. Returns why it should not go ahead,
+    'redelivered' or 'superseded', or None if it should.
+    """
+    client = get_redis_client()
+    if client is None or task_id is None:
+        return None
+    try:
+        if not client.set('{}{}'.format(STARTED_KEY_PREFIX, task_id), 1,
+                          nx=True, ex=settings.COLLECTOR_PENDING_TIMEOUT):
+            return 'redelivered'
+        client.eval(REPLACE_SCRIPT, 1,
+                    _pending_key(slug, start_at, end_at, dry_run),
+                    task_id, '', 0)
+        if policy() == SUPERSEDE:
+            latest = client.get(_latest_key(slug))
+            if latest is not None and latest.decode('utf-8') != task_id:
+                return 'superseded'
+    except RedisError as e:
+        _report_error(e)
+    return None
+
+
+class SlugLock(object):
+    """
+    A lock, taken without waiting, held while a collector runs. A lock in
+    Redis expires after ``COLLECTOR_RUN_LOCK_TIMEOUT`` seconds in case its
+    holder dies; an advisory lock is released with its connection.
+    """
+
+    def __init__(self, slug):
+        self.key = '{}{}'.format(LOCK_KEY_PREFIX, slug)
+        self._redis_lock = None
+        self._advisory = False
+
+    def acquire(self):
+        client = get_redis_client()
+        if client is not None:
+            try:
+                lock = client.lock(
+                    self.key, timeout=settings.COLLECTOR_RUN_LOCK_TIMEOUT)
+                if lock.acquire(blocking=False):
+                    self._redis_lock = lock
+                    return True
+                return False
+            except RedisError as e:
+                _report_error(e)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_try_advisory_lock(hashtext(%s))', [self.key])
+            self._advisory = cursor.fetchone()[0]
+        return self._advisory
+
+    def release(self):
+        if self._redis_lock is not None:
+            lock, self._redis_lock = self._redis_lock, None
+            try:
+                lock.release()
+            except RedisError as e:
+                # It will expire by itself
+                _report_error(e)
+        if self._advisory:
+            self._advisory = False
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_unlock(hashtext(%s))', [self.key])
+
+
+@contextmanager
+def slug_lock(slug):
+    """
+    Hold the lock on ``slug`` for the duration of the block, yielding
+    whether it was free. Overlapping runs are counted.
+    """
+    lock = SlugLock(slug)
+    acquired = lock.acquire()
+    if not acquired:
+        statsd.incr('collectors.overlap')
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
@@ -0,0 +1,126 @@
+"""
+Records each collector run as a ``CollectorRun`` and reports it to statsd,
+keyed by collector type.
+
+Records are counted as the collector posts them to Backdrop through
+performanceplatform-client. Collectors make their own ``DataSet`` client
+from their config, so there is nowhere to hand them a counting one; instead
+``DataSet.post`` is wrapped once per process. If the installed client does
+not have the ``post(records, chunk_size)`` this was written against, that
+is logged and runs are recorded without a count.
+"""
+from __future__ import unicode_literals
+
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.utils import timezone
+from django_statsd.clients import statsd
+
+from stagecraft.apps.collectors.models import CollectorRun
+
+logger = logging.getLogger(__name__)
+
+_posted = threading.local()
+_counter_lock = threading.Lock()
+_counter_installed = None
+
+
+def _posts_records(post):
+    try:
+        args = inspect.getargspec(post).args
+    except TypeError:
+        return False
+    return args[:3] == ['self', 'records', 'chunk_size']
+
+
+def _install_record_counter():
+    global _counter_installed
+    with _counter_lock:
+        if _counter_installed is None:
+            _counter_installed = _wrap_data_set_post()
+            if not _counter_installed:
+                logger.warning(
+                    'performanceplatform-client DataSet.post can not be '
+                    'wrapped, so records written will not be counted')
+    return _counter_installed
+
+
+def _wrap_data_set_post():
+    try:
+        from performanceplatform.client.data_set import DataSet
+    except ImportError:
+        return False
+
+    post = getattr(DataSet, 'post', None)
+    if post is None or not _posts_records(post):
+        return False
+
+    @wraps(post)
+    def counting_post(self, records, *args, **kwargs):
+        counts = getattr(_posted, 'counts', None)
+        if counts is None:
+            return post(self, records, *args, **kwargs)
+
+        if isinstance(records, dict):
+            count = [1]
+        elif isinstance(records, list):
+            count = [len(records)]
+        else:
+            # Count the records of an iterator as the client reads them
+            count = [0]
+            records = _counted(records, count)
+        result = post(self, records, *args, **kwargs)
+        counts.append(count[0])
+        return result
+
+    DataSet.post = counting_post
+    return True
+
+
+def _counted(records, count):
+    for record in records:
+        count[0] += 1
+        yield record
+
+
+@contextmanager
+def record_run(collector_id, collector_type):
+    """
+    Record the collector run made within the block, whether it succeeds or
+    raises. Yields the ``CollectorRun``.
+    """
+    run = CollectorRun.objects.create(collector_id=collector_id)
+    counting = _install_record_counter()
+    _posted.counts = []
+    start = time.time()
+    try:
+        yield run
+    except Exception as e:
+        _finish(run, collector_type, CollectorRun.FAILED, start, counting,
+                error='{}: {}'.format(type(e).__name__, e))
+        raise
+    else:
+        _finish(run, collector_type, CollectorRun.SUCCEEDED, start, counting)
+
+
+def _finish(run, collector_type, status, start, counting, error=''):
+    counts, _posted.counts = _posted.counts, None
+
+    run.status = status
+    run.duration = time.time() - start
+    run.ended_at = timezone.now()
+    run.records_written = sum(counts) if counting else None
+    run.error = error
+    run.save(update_fields=[
+        'status', 'duration', 'ended_at', 'records_written', 'error'])
+
+    prefix = 'collectors.run.{}'.format(collector_type)
+    statsd.timing('{}.duration'.format(prefix), int(run.duration * 1000))
+    statsd.incr('{}.{}'.format(prefix, status))
+    if run.records_written:
+        statsd.incr('{}.records'.format(prefix), run.records_written)
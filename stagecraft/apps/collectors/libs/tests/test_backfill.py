@@ -0,0 +1,137 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from hamcrest import assert_that, equal_to, none, not_none
+from mock import patch
+
+from stagecraft.apps.collectors.libs.backfill import (
+    chunk_ranges, claim_chunk, prepare)
+from stagecraft.apps.collectors.models import BackfillChunk, CollectorType
+from stagecraft.apps.collectors.tasks import run_backfill_chunk
+from stagecraft.apps.collectors.tests.factories import CollectorFactory
+
+
+class ChunkRangesTestCase(TestCase):
+
+    def test_splits_a_range_into_inclusive_chunks(self):
+        assert_that(
+            chunk_ranges(date(2016, 1, 1), date(2016, 1, 16), 7),
+            equal_to([
+                (date(2016, 1, 1), date(2016, 1, 7)),
+                (date(2016, 1, 8), date(2016, 1, 14)),
+                (date(2016, 1, 15), date(2016, 1, 16)),
+            ]))
+
+    def test_a_single_day(self):
+        assert_that(
+            chunk_ranges(date(2016, 1, 1), date(2016, 1, 1), 1),
+            equal_to([(date(2016, 1, 1), date(2016, 1, 1))]))
+
+
+class BackfillTestCase(TestCase):
+
+    def setUp(self):
+        self.collector = CollectorFactory(
+            type=CollectorType.objects.get(slug='ga'))
+
+    def test_preparing_again_only_returns_unfinished_chunks(self):
+        backfill, chunk_ids = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 3), 1)
+        assert_that(len(chunk_ids), equal_to(3))
+
+        BackfillChunk.objects.filter(pk=chunk_ids[0]).update(
+            status=BackfillChunk.SUCCEEDED)
+        BackfillChunk.objects.filter(pk=chunk_ids[1]).update(
+            status=BackfillChunk.FAILED)
+
+        again, remaining = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 3), 1)
+
+        assert_that(again, equal_to(backfill))
+        assert_that(remaining, equal_to(chunk_ids[1:]))
+        assert_that(backfill.progress()['pending'], equal_to(2))
+
+    def test_a_chunk_is_only_claimed_once_at_a_time(self):
+        _, chunk_ids = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 1), 1)
+
+        assert_that(claim_chunk(chunk_ids[0]), not_none())
+        assert_that(claim_chunk(chunk_ids[0]), none())
+
+    def test_a_stale_running_chunk_can_be_claimed_again(self):
+        _, chunk_ids = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 1), 1)
+        BackfillChunk.objects.filter(pk=chunk_ids[0]).update(
+            status=BackfillChunk.RUNNING,
+            updated_at=timezone.now() - timedelta(days=1))
+
+        chunk = claim_chunk(chunk_ids[0])
+
+        assert_that(chunk.attempts, equal_to(1))
+
+    @patch('stagecraft.apps.collectors.tasks._run_collector')
+    def test_running_chunks_checkpoints_them(self, mock_run_collector):
+        backfill, chunk_ids = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 2), 1)
+        mock_run_collector.side_effect = [None, ValueError('quota')]
+
+        for chunk_id in chunk_ids:
+            run_backfill_chunk(chunk_id)
+
+        progress = backfill.progress()
+        assert_that(progress['succeeded'], equal_to(1))
+        assert_that(progress['failed'], equal_to(1))
+        failed = BackfillChunk.objects.get(status=BackfillChunk.FAILED)
+        assert_that(failed.error, equal_to('ValueError: quota'))
+        config = mock_run_collector.call_args_list[0][0][1]
+        assert_that(config.start_at.date(), equal_to(date(2016, 1, 1)))
+        assert_that(config.end_at.date(), equal_to(date(2016, 1, 1)))
+
+    @patch('stagecraft.apps.collectors.tasks.config_cache.snapshots',
+           return_value={})
+    def test_chunks_of_a_deleted_collector_are_failed(self, snapshots_patch):
+        backfill, chunk_ids = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 3), 1)
+
+        run_backfill_chunk(chunk_ids[0])
+
+        assert_that(backfill.progress()['failed'], equal_to(3))
+        assert_that(
+            set(backfill.chunks.values_list('error', flat=True)),
+            equal_to(set(['The collector was deleted'])))
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='queue')
+    @patch('stagecraft.apps.collectors.tasks.run_backfill_chunk.apply_async')
+    @patch('stagecraft.apps.collectors.libs.run_guard.SlugLock.acquire',
+           return_value=False)
+    @patch('stagecraft.apps.collectors.tasks._run_collector')
+    def test_a_chunk_waits_for_a_running_collector(
+            self, mock_run_collector, acquire_patch, apply_async_patch):
+        _, chunk_ids = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 1), 1)
+
+        run_backfill_chunk(chunk_ids[0])
+
+        assert_that(mock_run_collector.called, equal_to(False))
+        chunk = BackfillChunk.objects.get(pk=chunk_ids[0])
+        assert_that(chunk.status, equal_to(BackfillChunk.PENDING))
+        assert_that(chunk.attempts, equal_to(0))
+        apply_async_patch.assert_called_once_with(
+            (chunk_ids[0],), countdown=60)
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='skip')
+    @patch('stagecraft.apps.collectors.libs.run_guard.SlugLock.acquire',
+           return_value=False)
+    @patch('stagecraft.apps.collectors.tasks._run_collector')
+    def test_a_skipped_chunk_is_failed(
+            self, mock_run_collector, acquire_patch):
+        _, chunk_ids = prepare(
+            self.collector, date(2016, 1, 1), date(2016, 1, 1), 1)
+
+        run_backfill_chunk(chunk_ids[0])
+
+        assert_that(mock_run_collector.called, equal_to(False))
+        assert_that(BackfillChunk.objects.get(pk=chunk_ids[0]).status,
+                    equal_to(BackfillChunk.FAILED))
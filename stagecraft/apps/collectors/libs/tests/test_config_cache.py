@@ -0,0 +1,71 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from hamcrest import assert_that, equal_to, is_, has_key, is_not
+from mock import patch
+
+from stagecraft.apps.collectors.libs.config_cache import ConfigCache
+from stagecraft.apps.collectors.tests.factories import CollectorFactory
+
+
+@override_settings(COLLECTOR_CONFIG_CACHE_SIZE=2)
+@patch('stagecraft.apps.collectors.libs.config_cache.current_version',
+       return_value=1)
+class ConfigCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = ConfigCache()
+
+    def test_unchanged_collectors_are_not_reloaded(self, version_patch):
+        collector = CollectorFactory()
+        first = self.cache.snapshots([collector.slug])[collector.slug]
+
+        with self.assertNumQueries(0):
+            second = self.cache.snapshots([collector.slug])[collector.slug]
+
+        assert_that(second, is_(first))
+        assert_that(second.payload['slug'], equal_to(collector.slug))
+
+    def test_a_new_version_reloads_collectors(self, version_patch):
+        collector = CollectorFactory()
+        first = self.cache.snapshots([collector.slug])[collector.slug]
+
+        version_patch.return_value = 2
+        second = self.cache.snapshots([collector.slug])[collector.slug]
+
+        assert_that(second, is_not(first))
+
+    def test_nothing_is_cached_without_a_version(self, version_patch):
+        version_patch.return_value = None
+        collector = CollectorFactory()
+        self.cache.snapshots([collector.slug])
+
+        with self.assertNumQueries(1):
+            self.cache.snapshots([collector.slug])
+
+    def test_missing_collectors_are_left_out(self, version_patch):
+        collector = CollectorFactory()
+
+        snapshots = self.cache.snapshots([collector.slug, 'no-such-slug'])
+
+        assert_that(snapshots, has_key(collector.slug))
+        assert_that(snapshots, is_not(has_key('no-such-slug')))
+
+    def test_credentials_are_copied_for_each_caller(self, version_patch):
+        collector = CollectorFactory()
+        snapshot = self.cache.snapshots([collector.slug])[collector.slug]
+
+        snapshot.credentials['changed'] = True
+
+        assert_that(snapshot.credentials, equal_to({}))
+
+
+class ConfigChangeSignalTestCase(TestCase):
+
+    @patch('stagecraft.apps.collectors.signals.transaction')
+    def test_saving_a_data_source_bumps_the_version(self, transaction):
+        collector = CollectorFactory()
+        transaction.reset_mock()
+
+        collector.data_source.save()
+
+        assert_that(transaction.on_commit.call_count, equal_to(1))
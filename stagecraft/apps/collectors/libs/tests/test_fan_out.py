@@ -0,0 +1,68 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from hamcrest import assert_that, equal_to, contains_inanyorder
+from mock import patch
+
+from stagecraft.apps.collectors.libs.fan_out import plan_lanes
+from stagecraft.apps.collectors.libs.rate_limit import TokenBucket
+
+
+def payload(slug, provider, data_source_id='a'):
+    return {'slug': slug, 'provider': provider,
+            'data_source_id': data_source_id}
+
+
+@override_settings(
+    COLLECTOR_PROVIDER_LIMIT_DEFAULTS={
+        'concurrency': 1, 'rate': None, 'burst': 1},
+    COLLECTOR_PROVIDER_LIMITS={'ga': {'concurrency': 2}})
+class PlanLanesTestCase(TestCase):
+
+    def test_each_provider_gets_at_most_its_concurrency_in_lanes(self):
+        lanes = plan_lanes([
+            payload('ga-1', 'ga'), payload('ga-2', 'ga'),
+            payload('ga-3', 'ga'), payload('pingdom-1', 'pingdom'),
+            payload('pingdom-2', 'pingdom'),
+        ])
+
+        slugs = [[p['slug'] for p in lane] for lane in lanes]
+        assert_that(slugs, contains_inanyorder(
+            ['ga-1', 'ga-3'], ['ga-2'], ['pingdom-1', 'pingdom-2']))
+
+    def test_lanes_are_ordered_by_data_source(self):
+        lanes = plan_lanes([
+            payload('ga-1', 'ga', 'b'), payload('ga-2', 'ga', 'a'),
+            payload('ga-3', 'ga', 'b'), payload('ga-4', 'ga', 'a'),
+        ])
+
+        slugs = [[p['slug'] for p in lane] for lane in lanes]
+        assert_that(slugs, equal_to([['ga-2', 'ga-1'], ['ga-4', 'ga-3']]))
+
+    def test_no_payloads_means_no_lanes(self):
+        assert_that(plan_lanes([]), equal_to([]))
+
+
+class TokenBucketTestCase(TestCase):
+
+    @patch('stagecraft.apps.collectors.libs.rate_limit.time')
+    def test_waits_for_a_token_once_the_burst_is_used(self, mock_time):
+        now = [100.0]
+        mock_time.time.side_effect = lambda: now[0]
+
+        def sleep(seconds):
+            now[0] += seconds
+        mock_time.sleep.side_effect = sleep
+
+        bucket = TokenBucket('test', rate=2, burst=2)
+        for _ in range(4):
+            bucket.acquire()
+
+        assert_that(now[0], equal_to(101.0))
+
+    @patch('stagecraft.apps.collectors.libs.rate_limit.time')
+    def test_no_rate_never_waits(self, mock_time):
+        bucket = TokenBucket('test', rate=None)
+        for _ in range(10):
+            bucket.acquire()
+
+        assert_that(mock_time.sleep.called, equal_to(False))
@@ -1,6 +1,12 @@
+from datetime import datetime, timedelta
 from django.test import TestCase
-from hamcrest import assert_that, equal_to, is_, instance_of
-from stagecraft.apps.collectors.libs.ga import CredentialStorage
+from django.test.utils import override_settings
+from hamcrest import (
+    assert_that, equal_to, is_, instance_of, has_key, greater_than)
+from mock import MagicMock, patch
+from stagecraft.apps.collectors.libs.ga import (
+    CredentialStorage, RefreshLock, credentials_cache)
+from stagecraft.apps.collectors.models import DataSource
 from stagecraft.apps.collectors.tests.factories import DataSourceFactory
 from oauth2client.client import OAuth2Credentials
 import json
@@ -8,6 +14,9 @@ import json
 
 class CredentialStorageTestCase(TestCase):
 
+    def tearDown(self):
+        credentials_cache.clear()
+
     def oauth2_credentials(self):
         return {
             "_module": "oauth2client.client",
@@ -58,3 +67,86 @@ class CredentialStorageTestCase(TestCase):
         storage = storage.locked_get()
 
         assert_that(storage.refresh_token, equal_to('new token'))
+
+    def test_reads_credentials_refreshed_by_another_worker(self):
+        model = DataSourceFactory(credentials=self.credentials())
+        stale = DataSource.objects.get(pk=model.pk)
+        oauth2_credentials = self.oauth2_credentials()
+        oauth2_credentials['access_token'] = 'new token'
+        CredentialStorage(model).locked_put(
+            OAuth2Credentials.new_from_json(json.dumps(oauth2_credentials)))
+
+        refreshed = CredentialStorage(stale).locked_get()
+
+        assert_that(refreshed.access_token, equal_to('new token'))
+
+    def test_a_refresh_does_not_change_the_rest_of_the_credentials(self):
+        model = DataSourceFactory(credentials=self.credentials())
+        CredentialStorage(model).locked_put(
+            OAuth2Credentials.new_from_json(
+                json.dumps(self.oauth2_credentials())))
+
+        stored = json.loads(DataSource.objects.get(pk=model.pk).credentials)
+
+        assert_that(stored, has_key('CLIENT_SECRETS'))
+
+    @patch('stagecraft.apps.collectors.libs.ga.current_generation',
+           return_value=1)
+    def test_unchanged_credentials_are_not_read_again(self, generation):
+        model = DataSourceFactory(credentials=self.credentials())
+        storage = CredentialStorage(model)
+        storage.locked_get()
+
+        with self.assertNumQueries(0):
+            oauth2_credentials = storage.get()
+
+        assert_that(oauth2_credentials.access_token, equal_to('a token'))
+
+    def test_a_token_refreshed_while_waiting_is_reused(self):
+        model = DataSourceFactory(credentials=self.credentials())
+        storage = CredentialStorage(model)
+        expired = storage.get()
+        oauth2_credentials = self.oauth2_credentials()
+        oauth2_credentials['access_token'] = 'new token'
+        oauth2_credentials['token_expiry'] = (
+            datetime.utcnow() + timedelta(hours=1)).strftime(
+                '%Y-%m-%dT%H:%M:%SZ')
+        CredentialStorage(model).locked_put(
+            OAuth2Credentials.new_from_json(json.dumps(oauth2_credentials)))
+
+        with patch.object(expired, '_do_refresh_request') as refresh:
+            expired._refresh(None)
+
+        assert_that(refresh.called, is_(False))
+        assert_that(expired.access_token, equal_to('new token'))
+
+
+class RefreshLockTestCase(TestCase):
+
+    def test_takes_an_advisory_lock_without_redis(self):
+        lock = RefreshLock('a-data-source')
+
+        lock.acquire()
+        try:
+            assert_that(lock._advisory, is_(True))
+        finally:
+            lock.release()
+        assert_that(lock._advisory, is_(False))
+
+    @override_settings(OAUTH2_REFRESH_LOCK_TIMEOUT=0.2)
+    @patch('stagecraft.apps.collectors.libs.ga.ADVISORY_LOCK_POLL_INTERVAL',
+           0.05)
+    @patch('stagecraft.apps.collectors.libs.ga.connection')
+    def test_gives_up_on_an_advisory_lock_held_elsewhere(self, connection):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (False,)
+        connection.cursor.return_value.__enter__.return_value = cursor
+        lock = RefreshLock('a-data-source')
+
+        lock.acquire()
+
+        assert_that(lock._advisory, is_(False))
+        statements = set(call[0][0] for call in cursor.execute.call_args_list)
+        assert_that(statements, equal_to(
+            set(['SELECT pg_try_advisory_lock(hashtext(%s))'])))
+        assert_that(cursor.execute.call_count, greater_than(1))
@@ -0,0 +1,94 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from hamcrest import assert_that, equal_to, contains, less_than, is_
+from mock import Mock, patch
+
+from stagecraft.apps.collectors.libs.realtime import (
+    plan_cycle, RealtimeService)
+from stagecraft.apps.collectors.tests.factories import CollectorFactory
+
+
+def payload(slug, provider='ga'):
+    return {'slug': slug, 'provider': provider}
+
+
+class PlanCycleTestCase(TestCase):
+
+    def test_collectors_are_spread_across_the_interval(self):
+        plan = plan_cycle(
+            [payload('c'), payload('a'), payload('b'), payload('d')], 60, 5)
+
+        assert_that([p['slug'] for _, p in plan],
+                    contains('a', 'b', 'c', 'd'))
+        for i, (offset, _) in enumerate(plan):
+            assert_that(offset - i * 15, less_than(5.0001))
+            assert_that(offset >= i * 15, is_(True))
+
+    def test_jitter_never_reaches_the_next_slot(self):
+        plan = plan_cycle([payload('a'), payload('b')], 10, 30)
+
+        assert_that(plan[0][0], less_than(5.0001))
+
+    def test_no_collectors_plans_nothing(self):
+        assert_that(plan_cycle([], 60, 5), equal_to([]))
+
+
+class RealtimeServiceTestCase(TestCase):
+
+    def setUp(self):
+        self.service = RealtimeService(('ga-realtime',), 0, 0, 1)
+        self.pool = Mock()
+
+    @patch('stagecraft.apps.collectors.libs.realtime.fan_out.'
+           'payloads_for_types', return_value=[payload('a'), payload('b')])
+    def test_each_collector_is_started_once_a_cycle(self, payloads):
+        self.service.run_cycle(self.pool)
+
+        started = [call[0][1][0]['slug']
+                   for call in self.pool.apply_async.call_args_list]
+        assert_that(started, contains('a', 'b'))
+
+    @patch('stagecraft.apps.collectors.libs.realtime.fan_out.'
+           'payloads_for_types', return_value=[payload('a')])
+    def test_a_collector_still_running_is_skipped(self, payloads):
+        self.service.run_cycle(self.pool)
+        self.service.run_cycle(self.pool)
+
+        assert_that(self.pool.apply_async.call_count, equal_to(1))
+
+    @override_settings(DISABLE_COLLECTORS=True)
+    @patch('stagecraft.apps.collectors.libs.realtime.fan_out.'
+           'payloads_for_types', return_value=[payload('a')])
+    def test_nothing_is_started_while_collectors_are_disabled(
+            self, payloads):
+        self.service.run_cycle(self.pool)
+
+        assert_that(self.pool.apply_async.called, is_(False))
+
+    @patch('stagecraft.apps.collectors.libs.realtime.execute')
+    def test_running_a_collector_frees_its_slot(self, execute):
+        collector = CollectorFactory()
+        self.service._start(collector.slug)
+
+        self.service.run_collector(
+            {'slug': collector.slug, 'provider': 'ga'})
+
+        assert_that(execute.call_count, equal_to(1))
+        assert_that(self.service._start(collector.slug), is_(True))
+
+    @patch('stagecraft.apps.collectors.libs.realtime.execute',
+           side_effect=Exception('provider down'))
+    def test_a_failing_collector_frees_its_slot(self, execute):
+        collector = CollectorFactory()
+        self.service._start(collector.slug)
+
+        self.service.run_collector(
+            {'slug': collector.slug, 'provider': 'ga'})
+
+        assert_that(self.service._start(collector.slug), is_(True))
+
+    @patch('stagecraft.apps.collectors.libs.realtime.execute')
+    def test_a_deleted_collector_is_not_run(self, execute):
+        self.service.run_collector(payload('gone'))
+
+        assert_that(execute.called, is_(False))
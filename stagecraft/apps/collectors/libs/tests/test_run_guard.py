@@ -0,0 +1,97 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from hamcrest import (
+    assert_that, equal_to, is_, none, calling, raises, has_item, contains)
+from mock import Mock, patch
+
+from stagecraft.apps.collectors.libs import run_guard
+
+
+def redis_client():
+    client = Mock()
+    client.set.return_value = True
+    client.get.return_value = None
+    return client
+
+
+@override_settings(COLLECTOR_OVERLAP_POLICY='queue')
+class RunGuardTestCase(TestCase):
+
+    def setUp(self):
+        self.client = redis_client()
+        patcher = patch(
+            'stagecraft.apps.collectors.libs.run_guard.get_redis_client',
+            return_value=self.client)
+        self.redis_patch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_a_request_is_marked_as_pending(self):
+        assert_that(run_guard.request_run('task', 'a-collector'), is_(True))
+
+        args, kwargs = self.client.set.call_args
+        assert_that(args, contains(
+            'collectors:pending:a-collector:::run', 'task'))
+        assert_that(kwargs['nx'], is_(True))
+
+    def test_an_identical_pending_request_is_refused(self):
+        self.client.set.return_value = None
+
+        assert_that(run_guard.request_run('task', 'a-collector'), is_(False))
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='supersede')
+    def test_a_superseding_request_is_always_accepted(self):
+        self.client.set.return_value = None
+
+        assert_that(run_guard.request_run('task', 'a-collector'), is_(True))
+        keys = [call[0][0] for call in self.client.set.call_args_list]
+        assert_that(keys, has_item('collectors:latest:a-collector'))
+
+    def test_requests_are_accepted_without_redis(self):
+        self.redis_patch.return_value = None
+
+        assert_that(run_guard.request_run('task', 'a-collector'), is_(True))
+
+    def test_a_task_goes_ahead_once(self):
+        assert_that(run_guard.start_run('task', 'a-collector'), none())
+
+        self.client.set.return_value = None
+        assert_that(run_guard.start_run('task', 'a-collector'),
+                    equal_to('redelivered'))
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='supersede')
+    def test_an_older_request_is_superseded(self):
+        self.client.get.return_value = b'newer-task'
+
+        assert_that(run_guard.start_run('task', 'a-collector'),
+                    equal_to('superseded'))
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='supersede')
+    def test_the_latest_request_goes_ahead(self):
+        self.client.get.return_value = b'task'
+
+        assert_that(run_guard.start_run('task', 'a-collector'), none())
+
+    def test_a_collector_already_running_is_not_locked_again(self):
+        self.client.lock.return_value.acquire.return_value = False
+
+        with run_guard.slug_lock('a-collector') as locked:
+            assert_that(locked, is_(False))
+
+    def test_the_lock_is_released_after_the_run(self):
+        lock = self.client.lock.return_value
+        lock.acquire.return_value = True
+
+        with run_guard.slug_lock('a-collector') as locked:
+            assert_that(locked, is_(True))
+
+        assert_that(lock.release.call_count, equal_to(1))
+
+    def test_runs_are_locked_in_the_database_without_redis(self):
+        self.redis_patch.return_value = None
+
+        with run_guard.slug_lock('a-collector') as locked:
+            assert_that(locked, is_(True))
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='wait')
+    def test_an_unknown_policy_is_refused(self):
+        assert_that(calling(run_guard.policy), raises(ValueError))
@@ -0,0 +1,90 @@
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, is_
+from mock import Mock, patch
+from performanceplatform.client.data_set import DataSet
+
+from stagecraft.apps.collectors.libs import run_history
+from stagecraft.apps.collectors.models import CollectorRun
+from stagecraft.apps.collectors.tests.factories import CollectorFactory
+
+
+def backdrop_response():
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {'status': 'ok'}
+    return response
+
+
+# Against the installed performanceplatform-client, so a release that
+# changes how records are posted fails here rather than going uncounted.
+@patch('performanceplatform.client.base.requests.request',
+       return_value=backdrop_response())
+class RecordRunTestCase(TestCase):
+
+    def setUp(self):
+        self.collector = CollectorFactory()
+        self.data_set = DataSet(
+            'http://backdrop/data/group/type', 'token',
+            retry_on_error=False)
+
+    def record_run(self):
+        return run_history.record_run(
+            self.collector.id, self.collector.type.slug)
+
+    def test_the_installed_client_can_be_counted(self, request_patch):
+        assert_that(run_history._install_record_counter(), is_(True))
+
+    def test_records_posted_in_chunks_are_counted(self, request_patch):
+        with self.record_run() as run:
+            self.data_set.post([{'a': n} for n in range(5)], chunk_size=2)
+
+        run = CollectorRun.objects.get(pk=run.pk)
+        assert_that(request_patch.call_count, equal_to(3))
+        assert_that(run.records_written, equal_to(5))
+        assert_that(run.status, equal_to(CollectorRun.SUCCEEDED))
+
+    def test_records_from_an_iterator_are_counted(self, request_patch):
+        with self.record_run() as run:
+            self.data_set.post(({'a': n} for n in range(3)))
+            self.data_set.post({'a': 'single'})
+
+        assert_that(CollectorRun.objects.get(pk=run.pk).records_written,
+                    equal_to(4))
+
+    def test_records_are_not_counted_when_the_post_fails(
+            self, request_patch):
+        request_patch.side_effect = ValueError('backdrop is down')
+
+        try:
+            with self.record_run() as run:
+                self.data_set.post([{'a': 1}])
+        except ValueError:
+            pass
+
+        run = CollectorRun.objects.get(collector=self.collector)
+        assert_that(run.records_written, equal_to(0))
+        assert_that(run.status, equal_to(CollectorRun.FAILED))
+
+    def test_posts_outside_a_run_are_not_counted(self, request_patch):
+        self.data_set.post([{'a': 1}])
+
+        with self.record_run() as run:
+            pass
+
+        assert_that(CollectorRun.objects.get(pk=run.pk).records_written,
+                    equal_to(0))
+
+
+class RecordCounterTestCase(TestCase):
+
+    def test_a_post_with_another_signature_is_not_wrapped(self):
+        class ChangedDataSet(object):
+            def post(self, path, data):
+                pass
+        post = ChangedDataSet.__dict__['post']
+
+        with patch('performanceplatform.client.data_set.DataSet',
+                   ChangedDataSet):
+            assert_that(run_history._wrap_data_set_post(), is_(False))
+
+        assert_that(ChangedDataSet.__dict__['post'], is_(post))
@@ -0,0 +1,40 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from stagecraft.apps.collectors.libs.realtime import RealtimeService
+
+
+class Command(BaseCommand):
+    help = ("Runs the realtime collectors continuously, spread across each "
+            "interval, until stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int,
+            default=settings.REALTIME_COLLECTOR_INTERVAL,
+            help='Seconds between runs of each collector')
+        parser.add_argument(
+            '--jitter', type=float,
+            default=settings.REALTIME_COLLECTOR_JITTER,
+            help='Most seconds a run may be moved from its slot')
+        parser.add_argument(
+            '--workers', type=int,
+            default=settings.REALTIME_COLLECTOR_WORKERS,
+            help='How many collectors may run at once')
+
+    def handle(self, *args, **options):
+        service = RealtimeService(
+            settings.REALTIME_COLLECTOR_TYPES,
+            options['interval'], options['jitter'], options['workers'])
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping once running collectors finish')
+            service.stop()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write('Running {} collectors every {}s'.format(
+            ', '.join(settings.REALTIME_COLLECTOR_TYPES), options['interval']))
+        service.run_forever()
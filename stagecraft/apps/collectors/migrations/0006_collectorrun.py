@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0005_auto_20170606_1232'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectorRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('records_written', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('collector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='collectors.Collector')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='collectorrun',
+            index_together=set([('collector', 'started_at')]),
+        ),
+    ]
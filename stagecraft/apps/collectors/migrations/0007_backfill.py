@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0006_collectorrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Backfill',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('start_at', models.DateField()),
+                ('end_at', models.DateField()),
+                ('chunk_days', models.PositiveIntegerField()),
+                ('dry_run', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('collector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='backfills', to='collectors.Collector')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BackfillChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_at', models.DateField()),
+                ('end_at', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('backfill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='collectors.Backfill')),
+                ('run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='collectors.CollectorRun')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='backfillchunk',
+            unique_together=set([('backfill', 'start_at')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='backfill',
+            unique_together=set([('collector', 'start_at', 'end_at', 'chunk_days', 'dry_run')]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def remove_realtime_schedule(apps, schema_editor):
+    # Realtime collectors are run by the run_realtime_collectors command
+    # now. Beat's DatabaseScheduler keeps entries that have gone from
+    # CELERYBEAT_SCHEDULE, so the old one has to be removed here or both
+    # would run the collectors.
+    PeriodicTask = apps.get_model('djcelery', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('djcelery', 'PeriodicTasks')
+
+    deleted, _ = PeriodicTask.objects.filter(name='realtime').delete()
+    if deleted:
+        # Tells a running beat to reload its schedule
+        PeriodicTasks.objects.update_or_create(
+            ident=1, defaults={'last_update': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0007_backfill'),
+        ('djcelery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_realtime_schedule, migrations.RunPython.noop)
+    ]
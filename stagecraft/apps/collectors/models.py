@@ -1,16 +1,22 @@
 import json
 import uuid
+from datetime import timedelta
 
 import jsonschema
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import (
+    Aggregate, Case, Count, Exists, FloatField, IntegerField, Max, OuterRef,
+    Sum, Value, When)
 from django.db.models.query import QuerySet
+from django.utils import timezone
 from fernet_fields import EncryptedTextField
 from jsonfield import JSONField
 
 from stagecraft.apps.datasets.models import DataSet
 from stagecraft.apps.users.models import User
+from stagecraft.libs.validation import schema_validators
 
 
 class Provider(models.Model):
@@ -64,8 +70,8 @@ class DataSource(models.Model):
             return 'credentials are not valid JSON'
 
         try:
-            jsonschema.validate(credentials_json,
-                                self.provider.credentials_schema)
+            schema_validators.validate(credentials_json,
+                                       self.provider.credentials_schema)
         except jsonschema.ValidationError as err:
             return 'credentials are invalid: {}'.format(err)
 
@@ -162,14 +168,14 @@ class Collector(models.Model):
 
     def validate(self, user=None):
         try:
-            jsonschema.validate(self.query,
-                                self.type.query_schema)
+            schema_validators.validate(self.query,
+                                       self.type.query_schema)
         except jsonschema.ValidationError as err:
             return 'query is invalid: {}'.format(err)
 
         try:
-            jsonschema.validate(self.options,
-                                self.type.options_schema)
+            schema_validators.validate(self.options,
+                                       self.type.options_schema)
         except jsonschema.ValidationError as err:
             return 'options are invalid: {}'.format(err)
 
@@ -181,13 +187,23 @@ class Collector(models.Model):
             )
 
         if user is not None:
-            if self.data_source.owners.filter(id=user.id).count() == 0:
+            ownership = self._ownership(user)
+            if not ownership['owns_data_source']:
                 return 'the current user is not an owner of the data source'
-            if self.data_set.owners.filter(id=user.id).count() == 0:
+            if not ownership['owns_data_set']:
                 return 'the current user is not an owner of the data set'
 
         return None
 
+    def _ownership(self, user):
+        # Both checks in one query rather than one per relation.
+        return User.objects.filter(pk=user.pk).annotate(
+            owns_data_source=Exists(DataSource.objects.filter(
+                pk=self.data_source_id, owners=OuterRef('pk')).values('pk')),
+            owns_data_set=Exists(DataSet.objects.filter(
+                pk=self.data_set_id, owners=OuterRef('pk')).values('pk')),
+        ).values('owns_data_source', 'owns_data_set').get()
+
     def clean(self, *args, **kwargs):
         super(Collector, self).clean(*args, **kwargs)
         validation = self.validate()
@@ -197,3 +213,192 @@ class Collector(models.Model):
 
     def __str__(self):
         return "{}".format(self.name)
+
+
+class Percentile(Aggregate):
+    """The continuous percentile of an expression, interpolated (Postgres)."""
+    function = 'PERCENTILE_CONT'
+    name = 'Percentile'
+    template = \
+        '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        super(Percentile, self).__init__(
+            expression, percentile=float(percentile),
+            output_field=FloatField(), **extra)
+
+
+class CollectorRunQuerySet(QuerySet):
+
+    PERCENTILES = (50, 90, 99)
+
+    def summary(self):
+        """
+        Count finished runs and failures, and give percentiles of how long
+        the runs took and how many records they wrote.
+        """
+        aggregates = {
+            'runs': Count('pk'),
+            'failures': Sum(Case(
+                When(status=CollectorRun.FAILED, then=Value(1)),
+                default=Value(0), output_field=IntegerField())),
+            'duration_max': Max('duration'),
+        }
+        for field in ('duration', 'records_written'):
+            for percentile in self.PERCENTILES:
+                aggregates['{}_p{}'.format(field, percentile)] = Percentile(
+                    field, percentile / 100.0)
+        totals = self.exclude(status=CollectorRun.RUNNING).aggregate(
+            **aggregates)
+
+        summary = {
+            'runs': totals['runs'],
+            'failures': totals['failures'] or 0,
+            'duration': {'max': totals['duration_max']},
+            'records_written': {},
+        }
+        for field in ('duration', 'records_written'):
+            for percentile in self.PERCENTILES:
+                key = 'p{}'.format(percentile)
+                summary[field][key] = totals['{}_{}'.format(field, key)]
+        return summary
+
+    def prune(self, days):
+        """Delete runs started more than ``days`` days ago."""
+        return self.filter(
+            started_at__lt=timezone.now() - timedelta(days=days)).delete()
+
+
+class CollectorRun(models.Model):
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    objects = CollectorRunQuerySet.as_manager()
+
+    id = models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True)
+    collector = models.ForeignKey(Collector, related_name='runs')
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=RUNNING)
+    started_at = models.DateTimeField(default=timezone.now)
+    ended_at = models.DateTimeField(null=True, blank=True)
+    # seconds
+    duration = models.FloatField(null=True, blank=True)
+    # None when the records posted to Backdrop could not be counted
+    records_written = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        index_together = [('collector', 'started_at')]
+
+    def serialize(self):
+        return {
+            'id': str(self.id),
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'ended_at': self.ended_at and self.ended_at.isoformat(),
+            'duration': self.duration,
+            'records_written': self.records_written,
+            'error': self.error,
+        }
+
+    def __str__(self):
+        return "{} at {}: {}".format(
+            self.collector_id, self.started_at, self.status)
+
+
+class Backfill(models.Model):
+    """
+    A collector run over a range of dates, split into chunks that are run
+    and checkpointed separately.
+    """
+    id = models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True)
+    collector = models.ForeignKey(Collector, related_name='backfills')
+    start_at = models.DateField()
+    end_at = models.DateField()
+    chunk_days = models.PositiveIntegerField()
+    dry_run = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = [
+            ('collector', 'start_at', 'end_at', 'chunk_days', 'dry_run')]
+
+    def progress(self):
+        counts = dict(self.chunks.values_list('status').annotate(Count('pk')))
+        total = sum(counts.values())
+        succeeded = counts.get(BackfillChunk.SUCCEEDED, 0)
+        return {
+            'total': total,
+            'pending': counts.get(BackfillChunk.PENDING, 0),
+            'running': counts.get(BackfillChunk.RUNNING, 0),
+            'succeeded': succeeded,
+            'failed': counts.get(BackfillChunk.FAILED, 0),
+            'complete': total > 0 and succeeded == total,
+        }
+
+    def serialize(self):
+        return {
+            'id': str(self.id),
+            'collector': self.collector.slug,
+            'start_at': self.start_at.isoformat(),
+            'end_at': self.end_at.isoformat(),
+            'chunk_days': self.chunk_days,
+            'dry_run': self.dry_run,
+            'created_at': self.created_at.isoformat(),
+            'progress': self.progress(),
+            'failed_chunks': [
+                {
+                    'start_at': chunk.start_at.isoformat(),
+                    'end_at': chunk.end_at.isoformat(),
+                    'attempts': chunk.attempts,
+                    'error': chunk.error,
+                }
+                for chunk in self.chunks.filter(
+                    status=BackfillChunk.FAILED).order_by('start_at')
+            ],
+        }
+
+    def __str__(self):
+        return "{} {} to {}".format(
+            self.collector_id, self.start_at, self.end_at)
+
+
+class BackfillChunk(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    backfill = models.ForeignKey(Backfill, related_name='chunks')
+    start_at = models.DateField()
+    end_at = models.DateField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run = models.ForeignKey(
+        CollectorRun, null=True, blank=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = [('backfill', 'start_at')]
+
+    def __str__(self):
+        return "{} to {}: {}".format(self.start_at, self.end_at, self.status)
+
+
+schema_validators.evict_on_change(Provider, 'credentials_schema')
+schema_validators.evict_on_change(
+    CollectorType, 'query_schema', 'options_schema')
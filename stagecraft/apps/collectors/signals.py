@@ -0,0 +1,28 @@
+from __future__ import unicode_literals
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from stagecraft.apps.datasets.models import DataGroup, DataSet, DataType
+
+from .libs import config_cache
+from .models import Collector, CollectorType, DataSource, Provider
+
+
+@receiver(post_save, sender=Collector)
+@receiver(post_delete, sender=Collector)
+@receiver(post_save, sender=CollectorType)
+@receiver(post_delete, sender=CollectorType)
+@receiver(post_save, sender=DataSource)
+@receiver(post_delete, sender=DataSource)
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+@receiver(post_save, sender=DataSet)
+@receiver(post_delete, sender=DataSet)
+@receiver(post_save, sender=DataGroup)
+@receiver(post_delete, sender=DataGroup)
+@receiver(post_save, sender=DataType)
+@receiver(post_delete, sender=DataType)
+def collector_config_changed(sender, **kwargs):
+    transaction.on_commit(config_cache.bump_version)
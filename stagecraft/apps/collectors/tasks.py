@@ -1,13 +1,20 @@
 from __future__ import absolute_import
 from argparse import Namespace
-from celery import shared_task, group
+from celery import chain, shared_task, group
+from celery.utils import uuid
 from celery.utils.log import get_task_logger
 from datetime import datetime
 from performanceplatform.collector.main import _run_collector
 from django.conf import settings
+from django.db import transaction
+from django_statsd.clients import statsd
+from stagecraft.apps.collectors.libs import (
+    backfill, fan_out, run_guard, run_history)
+from stagecraft.apps.collectors.libs.config_cache import config_cache
 from stagecraft.apps.collectors.libs.ga import CredentialStorage
-from stagecraft.apps.collectors.models import Collector, CollectorType
-import json
+from stagecraft.apps.collectors.models import (
+    BackfillChunk, Collector, CollectorRun)
+import copy
 
 logger = get_task_logger(__name__)
 
@@ -19,51 +26,216 @@ def log(message):
 
 @shared_task
 def run_collectors_by_type(*args):
-    for slug in args:
-        collector_type = CollectorType.objects\
-            .prefetch_related('collectors').get(slug=slug)
-        slugs = [c.slug for c in collector_type.collectors.all()]
-        group(run_collector.s(slug) for slug in slugs)()
+    payloads = fan_out.payloads_for_types(args)
+    lanes = fan_out.plan_lanes(payloads)
+    if lanes:
+        group(run_collector_lane.s(lane) for lane in lanes)()
+
+
+@shared_task
+def run_collector_lane(payloads):
+    """
+    Run the collectors described by ``payloads`` one after another. A
+    collector that fails is logged and does not stop the rest of the lane.
+    """
+    if settings.DISABLE_COLLECTORS:
+        return 'Collectors Disabled'
+
+    snapshots = config_cache.snapshots(
+        [payload['slug'] for payload in payloads])
+
+    for payload in payloads:
+        snapshot = snapshots.get(payload['slug'])
+        if snapshot is None:
+            logger.warning(
+                'collector {} was deleted before it ran'.format(
+                    payload['slug']))
+            continue
+        with run_guard.slug_lock(payload['slug']) as locked:
+            if not locked:
+                # It will come round again at the next scheduled run
+                logger.warning('collector {} is already running'.format(
+                    payload['slug']))
+                continue
+            try:
+                execute(snapshot.payload, get_config(snapshot))
+            except Exception:
+                logger.exception(
+                    'collector {} failed'.format(payload['slug']))
+
+
+def queue_collector(collector_slug, start_at=None, end_at=None,
+                    dry_run=False):
+    """
+    Queue a run of a collector, unless an identical one is already waiting
+    to start. Returns the id of the queued task, or None.
+    """
+    task_id = uuid()
+    if not run_guard.request_run(
+            task_id, collector_slug, start_at, end_at, dry_run):
+        statsd.incr('collectors.dedup.duplicate')
+        logger.info('a run of {} is already queued'.format(collector_slug))
+        return None
+    run_collector.apply_async(
+        (collector_slug,),
+        {'start_at': start_at, 'end_at': end_at, 'dry_run': dry_run},
+        task_id=task_id)
+    return task_id
 
 
 @shared_task
 def run_collector(collector_slug, start_at=None, end_at=None, dry_run=False):
-    def get_config(collector_slug, start, end):
-        collector = Collector.objects.get(slug=collector_slug)
-
-        credentials = json.loads(collector.data_source.credentials)
-        if ("CLIENT_SECRETS" in credentials and
-                "OAUTH2_CREDENTIALS" in credentials):
-            data_source = collector.data_source
-            storage_object = CredentialStorage(data_source)
-            credentials['OAUTH2_CREDENTIALS'] = storage_object
-
-        config = Namespace(
-            performanceplatform={
-                "backdrop_url": settings.BACKDROP_WRITE_URL + '/data'
-            },
-            credentials=credentials,
-            query={
-                "data-set": {
-                    "data-group": str(collector.data_set.data_group),
-                    "data-type": str(collector.data_set.data_type)
-                },
-                "query": collector.query,
-                "options": collector.options
-            },
-            token={
-                "token": collector.data_set.bearer_token
-            },
-            dry_run=dry_run,
-            start_at=(datetime.strptime(start, '%Y-%m-%d') if start else None),
-            end_at=(datetime.strptime(end, '%Y-%m-%d') if end else None),
-            console_logging=False
-        )
-        return collector.type.entry_point, config
-
-    entry_point, args = get_config(collector_slug, start_at, end_at)
+    task_id = run_collector.request.id
+    skipped = run_guard.start_run(
+        task_id, collector_slug, start_at, end_at, dry_run)
+    if skipped is not None:
+        statsd.incr('collectors.dedup.{}'.format(skipped))
+        return 'Skipped, {}'.format(skipped)
+
+    snapshot = config_cache.snapshots([collector_slug]).get(collector_slug)
+    if snapshot is None:
+        raise Collector.DoesNotExist(
+            "No collector with slug '{}'".format(collector_slug))
+    config = get_config(snapshot, start_at, end_at, dry_run)
+    if settings.DISABLE_COLLECTORS:
+        return 'Collectors Disabled'
+
+    with run_guard.slug_lock(collector_slug) as locked:
+        if locked:
+            return str(execute(snapshot.payload, config).id)
+
+    if run_guard.policy() == run_guard.SKIP:
+        statsd.incr('collectors.overlap.skipped')
+        return 'Skipped, already running'
+
+    statsd.incr('collectors.overlap.queued')
+    new_task_id = uuid()
+    run_guard.requeue(
+        task_id, new_task_id, collector_slug, start_at, end_at, dry_run)
+    run_collector.apply_async(
+        (collector_slug,),
+        {'start_at': start_at, 'end_at': end_at, 'dry_run': dry_run},
+        task_id=new_task_id,
+        countdown=settings.COLLECTOR_OVERLAP_RETRY_DELAY)
+    return 'Queued again, already running'
+
+
+def start_backfill(collector, start_at, end_at, chunk_days, dry_run=False):
+    """
+    Queue every chunk of the backfill that has not yet succeeded, at most
+    BACKFILL_CONCURRENCY at a time, and return the Backfill.
+    """
+    prepared, chunk_ids = backfill.prepare(
+        collector, start_at, end_at, chunk_days, dry_run)
+    if chunk_ids:
+        count = min(settings.BACKFILL_CONCURRENCY, len(chunk_ids))
+        lanes = [chunk_ids[i::count] for i in range(count)]
+        transaction.on_commit(lambda: group(
+            chain(*[run_backfill_chunk.si(chunk_id) for chunk_id in lane])
+            for lane in lanes)())
+    return prepared
+
+
+@shared_task
+def run_backfill_chunk(chunk_id):
+    """
+    Run one chunk of a backfill. A failure is recorded against the chunk
+    rather than raised, so that the chunks queued after it still run.
+
+    A chunk that finds its collector already running is queued again or,
+    under the 'skip' COLLECTOR_OVERLAP_POLICY, failed so that starting the
+    backfill again picks it up.
+    """
     if settings.DISABLE_COLLECTORS:
         return 'Collectors Disabled'
+
+    chunk = backfill.claim_chunk(chunk_id)
+    if chunk is None:
+        return
+
+    slug = chunk.backfill.collector.slug
+    snapshot = config_cache.snapshots([slug]).get(slug)
+    if snapshot is None:
+        logger.warning(
+            'collector {} was deleted before its backfill ran'.format(slug))
+        backfill.abandon(chunk.backfill_id, 'The collector was deleted')
+        return 'Abandoned, collector deleted'
+    config = get_config(snapshot,
+                        chunk.start_at.strftime('%Y-%m-%d'),
+                        chunk.end_at.strftime('%Y-%m-%d'),
+                        chunk.backfill.dry_run)
+
+    with run_guard.slug_lock(slug) as locked:
+        if locked:
+            _run_backfill_chunk(chunk, slug, snapshot, config)
+            return
+
+    if run_guard.policy() == run_guard.SKIP:
+        statsd.incr('collectors.overlap.skipped')
+        backfill.finish_chunk(chunk, BackfillChunk.FAILED,
+                              error='The collector was already running')
+        return 'Skipped, already running'
+
+    statsd.incr('collectors.overlap.queued')
+    backfill.release_chunk(chunk)
+    run_backfill_chunk.apply_async(
+        (chunk_id,), countdown=settings.COLLECTOR_OVERLAP_RETRY_DELAY)
+    return 'Queued again, already running'
+
+
+def _run_backfill_chunk(chunk, slug, snapshot, config):
+    try:
+        run = execute(snapshot.payload, config)
+    except Exception as e:
+        logger.exception('backfill chunk {} of {} failed'.format(
+            chunk.start_at, slug))
+        backfill.finish_chunk(chunk, BackfillChunk.FAILED,
+                              error='{}: {}'.format(type(e).__name__, e))
     else:
-        logfile_path = settings.BASE_DIR + "/log"
-        _run_collector(entry_point, args, logfile_path, 'collectors')
+        backfill.finish_chunk(chunk, BackfillChunk.SUCCEEDED, run=run)
+
+
+@shared_task
+def prune_collector_runs():
+    CollectorRun.objects.prune(settings.COLLECTOR_RUN_RETENTION_DAYS)
+
+
+def get_config(snapshot, start=None, end=None, dry_run=False):
+    # Copies, so that nothing a collector does to its config can leak into
+    # the cached snapshot
+    payload = copy.deepcopy(snapshot.payload)
+    credentials = snapshot.credentials
+    if ("CLIENT_SECRETS" in credentials and
+            "OAUTH2_CREDENTIALS" in credentials):
+        storage_object = CredentialStorage(snapshot.data_source)
+        credentials['OAUTH2_CREDENTIALS'] = storage_object
+
+    return Namespace(
+        performanceplatform={
+            "backdrop_url": settings.BACKDROP_WRITE_URL + '/data'
+        },
+        credentials=credentials,
+        query={
+            "data-set": payload['data_set'],
+            "query": payload['query'],
+            "options": payload['options']
+        },
+        token={
+            "token": snapshot.bearer_token
+        },
+        dry_run=dry_run,
+        start_at=(datetime.strptime(start, '%Y-%m-%d') if start else None),
+        end_at=(datetime.strptime(end, '%Y-%m-%d') if end else None),
+        console_logging=False
+    )
+
+
+def execute(payload, config):
+    """Run a collector once it has a token, and return its CollectorRun."""
+    fan_out.provider_token_bucket(payload['provider']).acquire()
+    logfile_path = settings.BASE_DIR + "/log"
+    with run_history.record_run(
+            payload['collector_id'], payload['type']) as run:
+        _run_collector(
+            payload['entry_point'], config, logfile_path, 'collectors')
+    return run
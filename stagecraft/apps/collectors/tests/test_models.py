@@ -1,7 +1,10 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
 from hamcrest import assert_that, contains_string, not_none, none, equal_to
 
-from stagecraft.apps.collectors.models import DataSource
+from stagecraft.apps.collectors.models import CollectorRun, DataSource
 from stagecraft.apps.collectors.tests.factories import CollectorTypeFactory, \
     CollectorFactory, ProviderFactory, DataSourceFactory
 from stagecraft.apps.datasets.tests.factories import DataTypeFactory, \
@@ -186,3 +189,43 @@ class ProviderTestCase(TestCase):
         }
 
         assert_that(provider.validate(), none())
+
+
+class CollectorRunTestCase(TestCase):
+    def test_summary_gives_percentiles_of_finished_runs(self):
+        collector = CollectorFactory()
+        for duration in range(1, 11):
+            CollectorRun.objects.create(
+                collector=collector, status=CollectorRun.SUCCEEDED,
+                duration=duration, records_written=duration * 10)
+        CollectorRun.objects.create(
+            collector=collector, status=CollectorRun.FAILED, duration=20)
+        CollectorRun.objects.create(collector=collector)
+
+        summary = collector.runs.summary()
+
+        assert_that(summary['runs'], equal_to(11))
+        assert_that(summary['failures'], equal_to(1))
+        assert_that(summary['duration']['p50'], equal_to(6))
+        assert_that(summary['duration']['max'], equal_to(20))
+        assert_that(summary['records_written']['p50'], equal_to(55))
+
+    def test_summary_of_no_runs(self):
+        summary = CollectorFactory().runs.summary()
+
+        assert_that(summary['runs'], equal_to(0))
+        assert_that(summary['failures'], equal_to(0))
+        assert_that(summary['duration']['p90'], none())
+
+    def test_prune_deletes_old_runs(self):
+        collector = CollectorFactory()
+        old = CollectorRun.objects.create(
+            collector=collector,
+            started_at=timezone.now() - timedelta(days=100))
+        recent = CollectorRun.objects.create(collector=collector)
+
+        CollectorRun.objects.prune(90)
+
+        assert_that(list(CollectorRun.objects.all()), equal_to([recent]))
+        assert_that(CollectorRun.objects.filter(pk=old.pk).exists(),
+                    equal_to(False))
@@ -1,12 +1,18 @@
 from django.test import TestCase
-from hamcrest import assert_that, equal_to
+from django.test.utils import override_settings
+from hamcrest import (
+    assert_that, calling, equal_to, greater_than_or_equal_to, is_, none,
+    not_none, raises)
 from mock import patch, ANY
 from stagecraft.apps.collectors.libs.ga import CredentialStorage
-from stagecraft.apps.collectors.models import CollectorType
+from stagecraft.apps.collectors.models import CollectorRun, CollectorType
 from stagecraft.apps.collectors.tasks import (
+    queue_collector,
     run_collector,
+    run_collector_lane,
     run_collectors_by_type
 )
+from stagecraft.apps.collectors.libs.fan_out import collector_payload
 from stagecraft.apps.collectors.tests.factories import (
     CollectorFactory,
     DataSourceFactory
@@ -27,18 +33,72 @@ class TestCeleryTasks(TestCase):
 
         assert_that(mock_ga_collector.called, equal_to(True))
 
+    @override_settings(COLLECTOR_PROVIDER_LIMITS={'ga': {'concurrency': 2}})
+    @patch("stagecraft.apps.collectors.tasks.run_collector_lane")
     @patch("stagecraft.apps.collectors.tasks.group")
-    def test_run_collectors_by_type(self, mock_group):
+    def test_run_collectors_by_type(self, mock_group, mock_lane):
         collector_type = CollectorType.objects.get(slug='ga')
         CollectorFactory(type=collector_type)
         CollectorFactory(type=collector_type)
+        CollectorFactory(type=collector_type)
         another_collector_type = CollectorType.objects.get(slug='gcloud')
         CollectorFactory(type=another_collector_type)
 
-        run_collectors_by_type(
-            collector_type.slug, another_collector_type.slug)
+        with self.assertNumQueries(1):
+            run_collectors_by_type(
+                collector_type.slug, another_collector_type.slug)
+
+        assert_that(mock_group.call_count, equal_to(1))
+        signatures = list(mock_group.call_args[0][0])
+        assert_that(len(signatures), equal_to(3))
+        lanes = [call[0][0] for call in mock_lane.s.call_args_list]
+        assert_that(sorted(len(lane) for lane in lanes),
+                    equal_to([1, 1, 2]))
+        assert_that(json.loads(json.dumps(lanes)), equal_to(lanes))
+
+    @patch("stagecraft.apps.collectors.tasks._run_collector")
+    def test_run_collector_lane_carries_on_after_a_failure(
+            self, mock_run_collector):
+        collector_type = CollectorType.objects.get(slug="ga")
+        payloads = [collector_payload(CollectorFactory(type=collector_type))
+                    for _ in range(3)]
+        mock_run_collector.side_effect = [Exception('boom'), None, None]
+
+        # the collectors' configs, then for each run an advisory lock taken
+        # and released around a row written
+        with self.assertNumQueries(1 + 4 * 3):
+            run_collector_lane(payloads)
+
+        assert_that(mock_run_collector.call_count, equal_to(3))
+        assert_that(
+            sorted(CollectorRun.objects.values_list('status', flat=True)),
+            equal_to(['failed', 'succeeded', 'succeeded']))
+
+    @patch("stagecraft.apps.collectors.tasks._run_collector")
+    def test_run_collector_records_the_run(self, mock_run_collector):
+        collector = CollectorFactory(
+            type=CollectorType.objects.get(slug="ga"))
+
+        run_id = run_collector(collector.slug)
+
+        run = CollectorRun.objects.get(pk=run_id)
+        assert_that(run.collector, equal_to(collector))
+        assert_that(run.status, equal_to(CollectorRun.SUCCEEDED))
+        assert_that(run.duration, greater_than_or_equal_to(0))
+        assert_that(run.ended_at, not_none())
+
+    @patch("stagecraft.apps.collectors.tasks._run_collector")
+    def test_run_collector_records_a_failed_run(self, mock_run_collector):
+        collector = CollectorFactory(
+            type=CollectorType.objects.get(slug="ga"))
+        mock_run_collector.side_effect = ValueError('bad query')
+
+        assert_that(calling(run_collector).with_args(collector.slug),
+                    raises(ValueError))
 
-        assert_that(mock_group.call_count, equal_to(2))
+        run = CollectorRun.objects.get(collector=collector)
+        assert_that(run.status, equal_to(CollectorRun.FAILED))
+        assert_that(run.error, equal_to('ValueError: bad query'))
 
     @patch("performanceplatform.collector.ga.main")
     def test_run_collector_with_no_start_and_end_dates(
@@ -102,3 +162,70 @@ class TestCeleryTasks(TestCase):
         }
         mock_ga_collector.assert_called_with(
             expected_credentials, ANY, ANY, ANY, ANY, ANY)
+
+
+class TestRunDeduplication(TestCase):
+
+    @patch("stagecraft.apps.collectors.tasks.run_collector.apply_async")
+    @patch("stagecraft.apps.collectors.tasks.run_guard.request_run",
+           return_value=False)
+    def test_a_run_already_queued_is_not_queued_again(
+            self, mock_request_run, mock_apply_async):
+        assert_that(queue_collector('a-collector'), none())
+        assert_that(mock_apply_async.called, is_(False))
+
+    @patch("stagecraft.apps.collectors.tasks.run_collector.apply_async")
+    @patch("stagecraft.apps.collectors.tasks.run_guard.request_run",
+           return_value=True)
+    def test_a_run_is_queued_under_the_id_it_was_requested_with(
+            self, mock_request_run, mock_apply_async):
+        task_id = queue_collector('a-collector', dry_run=True)
+
+        mock_request_run.assert_called_with(
+            task_id, 'a-collector', None, None, True)
+        mock_apply_async.assert_called_with(
+            ('a-collector',),
+            {'start_at': None, 'end_at': None, 'dry_run': True},
+            task_id=task_id)
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='skip')
+    @patch("stagecraft.apps.collectors.tasks._run_collector")
+    @patch("stagecraft.apps.collectors.tasks.run_guard.SlugLock.acquire",
+           return_value=False)
+    def test_an_overlapping_run_can_be_skipped(
+            self, mock_acquire, mock_run_collector):
+        collector = CollectorFactory(
+            type=CollectorType.objects.get(slug="ga"))
+
+        assert_that(run_collector(collector.slug),
+                    equal_to('Skipped, already running'))
+        assert_that(mock_run_collector.called, is_(False))
+
+    @override_settings(COLLECTOR_OVERLAP_POLICY='queue',
+                       COLLECTOR_OVERLAP_RETRY_DELAY=30)
+    @patch("stagecraft.apps.collectors.tasks.run_collector.apply_async")
+    @patch("stagecraft.apps.collectors.tasks._run_collector")
+    @patch("stagecraft.apps.collectors.tasks.run_guard.SlugLock.acquire",
+           return_value=False)
+    def test_an_overlapping_run_can_be_queued_again(
+            self, mock_acquire, mock_run_collector, mock_apply_async):
+        collector = CollectorFactory(
+            type=CollectorType.objects.get(slug="ga"))
+
+        run_collector(collector.slug, '2015-08-01', '2015-08-08')
+
+        assert_that(mock_run_collector.called, is_(False))
+        mock_apply_async.assert_called_with(
+            (collector.slug,),
+            {'start_at': '2015-08-01', 'end_at': '2015-08-08',
+             'dry_run': False},
+            task_id=ANY, countdown=30)
+
+    @patch("stagecraft.apps.collectors.tasks._run_collector")
+    @patch("stagecraft.apps.collectors.tasks.run_guard.start_run",
+           return_value='redelivered')
+    def test_a_redelivered_run_is_skipped(
+            self, mock_start_run, mock_run_collector):
+        assert_that(run_collector('a-collector'),
+                    equal_to('Skipped, redelivered'))
+        assert_that(mock_run_collector.called, is_(False))
@@ -1,9 +1,12 @@
 import json
 import uuid
 from datetime import datetime
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from hamcrest import assert_that, equal_to, has_key, has_entries, \
     match_equality
+from stagecraft.apps.collectors.models import CollectorRun
 from stagecraft.apps.collectors.tests.factories import ProviderFactory, \
     DataSourceFactory, CollectorTypeFactory, CollectorFactory
 from stagecraft.apps.datasets.tests.factories import DataSetFactory
@@ -537,6 +540,26 @@ class CollectorViewTestCase(TestCase):
         assert_that(resp_json, match_equality(
             has_entries({"slug": collector_2.slug})))
 
+    def test_list_query_count_does_not_grow_with_collectors(self):
+        def list_collectors():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    '/collector',
+                    HTTP_AUTHORIZATION='Bearer '
+                                       'development-oauth-access-token',
+                    content_type='application/json')
+            assert_that(response.status_code, equal_to(200))
+            return len(queries.captured_queries)
+
+        CollectorFactory()
+        one_collector = list_collectors()
+
+        CollectorFactory()
+        CollectorFactory()
+        three_collectors = list_collectors()
+
+        assert_that(three_collectors, equal_to(one_collector))
+
     # The list route requires for_user if you're not an admin and the model
     # has an owner attribute. This test implicitly tests whether the for_user
     # method and the accompanying model Manager class is required.
@@ -811,7 +834,8 @@ class CollectorViewTestCase(TestCase):
         assert_that(response.status_code, equal_to(404))
 
 
-@patch('stagecraft.apps.collectors.views.run_collector_task')
+@patch('stagecraft.apps.collectors.views.queue_collector',
+       return_value='a-task-id')
 class RunCollectorTest(TestCase):
 
     @with_govuk_signon(permissions=['admin'])
@@ -823,9 +847,25 @@ class RunCollectorTest(TestCase):
             content_type='application/json'
         )
         assert_that(response.status_code, equal_to(200))
-        run_collector_mock.delay.assert_called_with(
+        assert_that(json.loads(response.content),
+                    equal_to({'task_id': 'a-task-id'}))
+        run_collector_mock.assert_called_with(
             collector.slug, start_at=None, end_at=None, dry_run=False)
 
+    @with_govuk_signon(permissions=['admin'])
+    def test_409_if_an_identical_run_is_queued(self, run_collector_mock):
+        run_collector_mock.return_value = None
+        collector = CollectorFactory()
+        response = self.client.post(
+            '/collector-run/{}'.format(collector.slug),
+            HTTP_AUTHORIZATION='Bearer correct-token',
+            content_type='application/json'
+        )
+        assert_that(response.status_code, equal_to(409))
+        assert_that(
+            json.loads(response.content)['message'],
+            equal_to('An identical run of this collector is already queued'))
+
     @with_govuk_signon(permissions=['collector'])
     def test_returns_404_if_collector_does_not_exist(self, run_collector_mock):
         response = self.client.post(
@@ -871,7 +911,7 @@ class RunCollectorTest(TestCase):
             content_type='application/json'
         )
         assert_that(response.status_code, equal_to(200))
-        run_collector_mock.delay.assert_called_with(
+        run_collector_mock.assert_called_with(
             collector.slug,
             start_at="2015-08-01",
             end_at="2015-08-09",
@@ -927,7 +967,7 @@ class RunCollectorTest(TestCase):
             content_type='application/json'
         )
         assert_that(response.status_code, equal_to(200))
-        run_collector_mock.delay.assert_called_with(
+        run_collector_mock.assert_called_with(
             collector.slug, start_at=None, end_at=None, dry_run=True)
 
     @with_govuk_signon(permissions=['admin'])
@@ -943,8 +983,129 @@ class RunCollectorTest(TestCase):
             content_type='application/json'
         )
         assert_that(response.status_code, equal_to(200))
-        run_collector_mock.delay.assert_called_with(
+        run_collector_mock.assert_called_with(
             collector.slug,
             start_at="2015-08-01",
             end_at="2015-08-09",
             dry_run=True)
+
+
+class CollectorRunViewTest(TestCase):
+
+    @with_govuk_signon(permissions=['collector'])
+    def test_lists_recent_runs_with_a_summary(self):
+        collector = CollectorFactory()
+        user, _ = User.objects.get_or_create(
+            email='foobar.lastname@gov.uk')
+        collector.owners.add(user)
+        for duration in (1, 2, 3):
+            CollectorRun.objects.create(
+                collector=collector, status=CollectorRun.SUCCEEDED,
+                duration=duration, records_written=5)
+
+        response = self.client.get(
+            '/collector/{}/runs?limit=2'.format(collector.slug),
+            HTTP_AUTHORIZATION='Bearer correct-token')
+
+        assert_that(response.status_code, equal_to(200))
+        resp_json = json.loads(response.content)
+        assert_that(len(resp_json['runs']), equal_to(2))
+        assert_that(resp_json['summary'], has_entries({
+            'runs': 3,
+            'failures': 0,
+            'duration': has_entries({'p50': 2, 'max': 3}),
+        }))
+
+    @with_govuk_signon(permissions=['collector'])
+    def test_returns_404_if_user_not_owner(self):
+        collector = CollectorFactory()
+        user, _ = User.objects.get_or_create(
+            email='not_correct_user.lastname@gov.uk')
+        collector.owners.add(user)
+
+        response = self.client.get(
+            '/collector/{}/runs'.format(collector.slug),
+            HTTP_AUTHORIZATION='Bearer correct-token')
+
+        assert_that(response.status_code, equal_to(404))
+
+    @with_govuk_signon(permissions=['collector'])
+    def test_400_if_days_is_not_a_number(self):
+        collector = CollectorFactory()
+        user, _ = User.objects.get_or_create(
+            email='foobar.lastname@gov.uk')
+        collector.owners.add(user)
+
+        response = self.client.get(
+            '/collector/{}/runs?days=lots'.format(collector.slug),
+            HTTP_AUTHORIZATION='Bearer correct-token')
+
+        assert_that(response.status_code, equal_to(400))
+
+
+class BackfillViewTest(TestCase):
+
+    def collector(self):
+        collector = CollectorFactory()
+        user, _ = User.objects.get_or_create(
+            email='foobar.lastname@gov.uk')
+        collector.owners.add(user)
+        return collector
+
+    @with_govuk_signon(permissions=['collector'])
+    def test_post_starts_a_chunked_backfill(self):
+        collector = self.collector()
+
+        response = self.client.post(
+            '/collector/{}/backfills'.format(collector.slug),
+            data=to_json({'start_at': '2016-01-01', 'end_at': '2016-01-20',
+                          'chunk': 'week'}),
+            HTTP_AUTHORIZATION='Bearer correct-token',
+            content_type='application/json')
+
+        assert_that(response.status_code, equal_to(200))
+        assert_that(json.loads(response.content)['progress'], has_entries({
+            'total': 3,
+            'pending': 3,
+            'complete': False,
+        }))
+
+        response = self.client.get(
+            '/collector/{}/backfills'.format(collector.slug),
+            HTTP_AUTHORIZATION='Bearer correct-token')
+
+        resp_json = json.loads(response.content)
+        assert_that(len(resp_json), equal_to(1))
+        assert_that(resp_json[0]['chunk_days'], equal_to(7))
+
+    @with_govuk_signon(permissions=['collector'])
+    def test_400_if_range_is_backwards(self):
+        collector = self.collector()
+
+        response = self.client.post(
+            '/collector/{}/backfills'.format(collector.slug),
+            data=to_json({'start_at': '2016-02-01', 'end_at': '2016-01-01'}),
+            HTTP_AUTHORIZATION='Bearer correct-token',
+            content_type='application/json')
+
+        assert_that(response.status_code, equal_to(400))
+
+    @override_settings(BACKFILL_MAX_DAYS=31)
+    @with_govuk_signon(permissions=['collector'])
+    def test_400_if_range_is_too_long(self):
+        collector = self.collector()
+
+        def post(end_at):
+            return self.client.post(
+                '/collector/{}/backfills'.format(collector.slug),
+                data=to_json({'start_at': '2016-01-01', 'end_at': end_at}),
+                HTTP_AUTHORIZATION='Bearer correct-token',
+                content_type='application/json')
+
+        response = post('2016-02-01')
+        assert_that(response.status_code, equal_to(400))
+        assert_that(json.loads(response.content)['message'],
+                    equal_to('A backfill can cover at most 31 days'))
+        assert_that(collector.backfills.count(), equal_to(0))
+
+        assert_that(post('2016-01-31').status_code, equal_to(200))
@@ -1,19 +1,26 @@
 import logging
 from operator import xor
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.vary import vary_on_headers
 
+from stagecraft.apps.collectors.libs.backfill import CHUNK_DAYS
 from stagecraft.apps.collectors.models import Provider, DataSource, \
-    CollectorType, Collector
+    CollectorType, Collector, CollectorRun, Backfill
 from stagecraft.apps.datasets.models import DataSet
 from stagecraft.libs.views.resource import ResourceView, UUID_RE_STRING
-from stagecraft.libs.views.utils import add_items_to_model
-from stagecraft.apps.collectors.tasks import run_collector as \
-    run_collector_task
+from stagecraft.libs.views.utils import add_items_to_model, to_json
+from stagecraft.apps.collectors.tasks import (
+    queue_collector, start_backfill)
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from stagecraft.libs.authorization.http import permission_required
-from stagecraft.libs.views.resource import user_missing_model_permission
+from stagecraft.libs.views.resource import user_missing_model_permission, \
+    with_user_is_owner
 from stagecraft.libs.views.utils import create_http_error
 
 
@@ -76,6 +83,10 @@ class ProviderView(ResourceView):
 
 class DataSourceView(ResourceView):
     model = DataSource
+    private_fields = {'credentials'}
+    list_plan = {
+        'select_related': ['provider'],
+    }
 
     schema = {
         "$schema": "http://json-schema.org/schema#",
@@ -126,6 +137,9 @@ class DataSourceView(ResourceView):
 
 class CollectorTypeView(ResourceView):
     model = CollectorType
+    list_plan = {
+        'select_related': ['provider'],
+    }
 
     schema = {
         "$schema": "http://json-schema.org/schema#",
@@ -183,8 +197,134 @@ class CollectorTypeView(ResourceView):
         }
 
 
+class CollectorRunView(ResourceView):
+    """
+    The runs of a collector started in the last ?days= days (default 30),
+    newest first and at most ?limit= of them, with a summary of them all.
+    """
+    model = CollectorRun
+    max_page_size = 1000
+    default_page_size = 100
+
+    @method_decorator(never_cache)
+    @method_decorator(vary_on_headers('Authorization'))
+    def get(self, request, **kwargs):
+        user, err = self._authorize(request)
+        if err:
+            return err
+
+        try:
+            days = int(request.GET.get('days', 30))
+            limit = int(request.GET.get('limit', self.default_page_size))
+        except ValueError:
+            return create_http_error(
+                400, 'days and limit must be integers', request)
+        if days < 1 or not 1 <= limit <= self.max_page_size:
+            return create_http_error(
+                400, 'days must be at least 1 and limit between 1 and '
+                '{}'.format(self.max_page_size), request)
+
+        collector = kwargs['parent']
+        runs = collector.runs.filter(
+            started_at__gte=timezone.now() - timedelta(days=days))
+
+        return HttpResponse(to_json({
+            'collector': collector.slug,
+            'days': days,
+            'summary': runs.summary(),
+            'runs': [run.serialize() for run in
+                     runs.order_by('-started_at')[:limit]],
+        }), content_type='application/json')
+
+
+class BackfillView(ResourceView):
+    """
+    Backfills of a collector, newest first, with their progress. Posting
+    a range starts a backfill of it, or resumes the chunks of an existing
+    backfill of the same range that have not succeeded.
+    """
+    model = Backfill
+
+    schema = {
+        "$schema": "http://json-schema.org/schema#",
+        "type": "object",
+        "properties": {
+            "start_at": {
+                "type": "string",
+                "pattern": "^[0-9]{4}-[0-9]{2}-[0-9]{2}$"
+            },
+            "end_at": {
+                "type": "string",
+                "pattern": "^[0-9]{4}-[0-9]{2}-[0-9]{2}$"
+            },
+            "chunk": {
+                "enum": sorted(CHUNK_DAYS.keys())
+            },
+            "dry_run": {
+                "type": "boolean"
+            }
+        },
+        "required": ["start_at", "end_at"],
+        "additionalProperties": False,
+    }
+
+    @method_decorator(never_cache)
+    @method_decorator(vary_on_headers('Authorization'))
+    def get(self, request, **kwargs):
+        user, err = self._authorize(request)
+        if err:
+            return err
+
+        backfills = kwargs['parent'].backfills.select_related(
+            'collector').order_by('-created_at')
+        return HttpResponse(
+            to_json([backfill.serialize() for backfill in backfills]),
+            content_type='application/json')
+
+    def post(self, request, **kwargs):
+        user, err = self._authorize(request)
+        if err:
+            return err
+
+        model_json, err = self._validate_json(request)
+        if err:
+            return err
+
+        try:
+            start_at = datetime.strptime(
+                model_json['start_at'], '%Y-%m-%d').date()
+            end_at = datetime.strptime(
+                model_json['end_at'], '%Y-%m-%d').date()
+        except ValueError:
+            return create_http_error(
+                400, 'Incorrect date format, should be YYYY-MM-DD', request)
+        if start_at > end_at:
+            return create_http_error(
+                400, 'start_at must not be after end_at', request)
+        if (end_at - start_at).days + 1 > settings.BACKFILL_MAX_DAYS:
+            return create_http_error(
+                400, 'A backfill can cover at most {} days'.format(
+                    settings.BACKFILL_MAX_DAYS), request)
+
+        backfill = start_backfill(
+            kwargs['parent'], start_at, end_at,
+            CHUNK_DAYS[model_json.get('chunk', 'day')],
+            dry_run=model_json.get('dry_run', False))
+        return HttpResponse(
+            to_json(backfill.serialize()), content_type='application/json')
+
+
 class CollectorView(ResourceView):
     model = Collector
+    stream_list = True
+    list_plan = {
+        'select_related': [
+            'type__provider',
+            'data_source',
+            'data_set__data_group',
+            'data_set__data_type',
+        ],
+    }
 
     schema = {
         "$schema": "http://json-schema.org/schema#",
@@ -223,6 +363,11 @@ class CollectorView(ResourceView):
         "name": "name__iexact"
     }
 
+    sub_resources = {
+        'backfills': BackfillView(),
+        'runs': CollectorRunView(),
+    }
+
     def update_model(self, model, model_json, request, parent):
         try:
             collector_type = CollectorType.objects.get(
@@ -289,7 +434,8 @@ def run_collector(user, request, slug):
     start_at = request.GET.get('start-at', None)
     end_at = request.GET.get('end-at', None)
     dry_run = request.GET.get('dry-run', "False")
-    collector = get_object_or_404(Collector, slug=slug)
+    collector = get_object_or_404(
+        with_user_is_owner(Collector.objects.all(), user), slug=slug)
 
     if user_missing_model_permission(user, collector):
         return create_http_error(404, 'Not Found', request)
@@ -307,10 +453,14 @@ def run_collector(user, request, slug):
             message = "Incorrect date format, should be YYYY-MM-DD"
             return create_http_error(400, message, request)
 
-    run_collector_task.delay(
+    task_id = queue_collector(
         slug,
         start_at=start_at,
         end_at=end_at,
         dry_run=(True if dry_run.lower() == "true" else False))
+    if task_id is None:
+        message = 'An identical run of this collector is already queued'
+        return create_http_error(409, message, request)
 
-    return HttpResponse('', content_type='application/json')
+    return HttpResponse(
+        to_json({'task_id': task_id}), content_type='application/json')
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class DashboardsConfig(AppConfig):
+    name = 'stagecraft.apps.dashboards'
+    label = 'dashboards'
+
+    def ready(self):
+        from . import signals  # noqa
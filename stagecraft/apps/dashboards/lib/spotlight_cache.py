@@ -0,0 +1,211 @@
+"""
+Server-side store of rendered spotlight JSON for published dashboards.
+
+Entries are the encoded output of ``Dashboard.spotlightify()`` held in
+Redis, keyed by dashboard slug and version. A dashboard's version is made of
+a generation number of its own, incremented whenever the dashboard, its
+modules or links change, and one shared by every dashboard, incremented
+whenever the organisation and data set names they render change (see
+``stagecraft.apps.dashboards.signals``). A reader takes the version before
+rendering and stores what it rendered against it, so a rendering that
+raced with a change is stored under a version no longer read rather than
+served until it expires. Entries for old versions are left to expire.
+
+The list of all published dashboards is stored against a version number
+that every one of those changes increments, so the version also serves as
+the list's ETag.
+
+Each entry is stored alongside a compressed copy for every content coding
+in ``stagecraft.libs.compression.ENCODINGS``, so cached responses are
+compressed once rather than on every request.
+"""
+from __future__ import unicode_literals
+
+import logging
+import time
+
+from django.conf import settings
+from django_statsd.clients import statsd
+
+from stagecraft.libs.compression import ENCODINGS, compress
+from stagecraft.libs.redis_client import get_redis_client, RedisError
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'spotlight:dashboard:'
+GENERATION_KEY_PREFIX = 'spotlight:dashboard-generation:'
+SHARED_GENERATION_KEY = 'spotlight:generation'
+LIST_KEY_PREFIX = 'spotlight:list:'
+LIST_VERSION_KEY = 'spotlight:list-version'
+
+
+def _key(slug, version, encoding=None):
+    return _encoded('{}{}:{}'.format(KEY_PREFIX, slug, version), encoding)
+
+
+def _generation_key(slug):
+    return '{}{}'.format(GENERATION_KEY_PREFIX, slug)
+
+
+def _list_key(version, encoding=None):
+    return _encoded('{}{}'.format(LIST_KEY_PREFIX, version), encoding)
+
+
+def _encoded(key, encoding):
+    if encoding is None:
+        return key
+    return '{}:{}'.format(key, encoding)
+
+
+def _set_with_variants(client, key_for, json_str):
+    pipeline = client.pipeline(transaction=False)
+    pipeline.set(key_for(None), json_str,
+                 ex=settings.SPOTLIGHT_CACHE_TIMEOUT)
+    for encoding in ENCODINGS:
+        pipeline.set(key_for(encoding), compress(json_str, encoding),
+                     ex=settings.SPOTLIGHT_CACHE_TIMEOUT)
+    pipeline.execute()
+
+
+def get_dashboard_version(slug):
+    """
+    The current version of a dashboard, or None if there is no store to
+    keep it in. Take it before rendering the dashboard.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return '{}.{}'.format(
+            _current(client, SHARED_GENERATION_KEY),
+            _current(client, _generation_key(slug)))
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.warning('spotlight cache version read failed: {}'.format(e))
+        return None
+
+
+def get_dashboard(slug, version, encoding=None):
+    """
+    The cached JSON for a version of a dashboard, compressed with
+    ``encoding`` if one is given.
+    """
+    client = get_redis_client()
+    if client is None or version is None:
+        return None
+    try:
+        json_str = client.get(_key(slug, version, encoding))
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.warning('spotlight cache read failed: {}'.format(e))
+        return None
+
+    if json_str is None:
+        statsd.incr('spotlight_cache.miss')
+    else:
+        statsd.incr('spotlight_cache.hit')
+    return json_str
+
+
+def set_dashboard(slug, version, json_str):
+    client = get_redis_client()
+    if client is None or version is None:
+        return
+    try:
+        _set_with_variants(
+            client, lambda encoding: _key(slug, version, encoding), json_str)
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.warning('spotlight cache write failed: {}'.format(e))
+
+
+def get_list_version():
+    """
+    The current version of the dashboard list, or None if there is no
+    store to keep it in.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return _current(client, LIST_VERSION_KEY)
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.warning('spotlight list version read failed: {}'.format(e))
+        return None
+
+
+def _current(client, key):
+    version = client.get(key)
+    if version is None:
+        version = _start(client, key)
+    return int(version)
+
+
+def _start(client, key):
+    # Start from the clock rather than zero so that a flushed or evicted
+    # counter can not hand out a version, and so a key or an ETag, that was
+    # used before.
+    client.set(key, int(time.time() * 1000), nx=True)
+    return client.get(key)
+
+
+def _bump(client, key):
+    if client.get(key) is None:
+        _start(client, key)
+    client.incr(key)
+
+
+def get_list(version, encoding=None):
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        json_str = client.get(_list_key(version, encoding))
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.warning('spotlight list read failed: {}'.format(e))
+        return None
+
+    if json_str is None:
+        statsd.incr('spotlight_cache.list.miss')
+    else:
+        statsd.incr('spotlight_cache.list.hit')
+    return json_str
+
+
+def set_list(version, json_str):
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        _set_with_variants(
+            client, lambda encoding: _list_key(version, encoding), json_str)
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.warning('spotlight list write failed: {}'.format(e))
+
+
+def invalidate_dashboard(*slugs):
+    client = get_redis_client()
+    if client is None or not slugs:
+        return
+    try:
+        for slug in slugs:
+            _bump(client, _generation_key(slug))
+        _bump(client, LIST_VERSION_KEY)
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.error('spotlight cache invalidation failed: {}'.format(e))
+
+
+def invalidate_all():
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        _bump(client, SHARED_GENERATION_KEY)
+        _bump(client, LIST_VERSION_KEY)
+    except RedisError as e:
+        statsd.incr('spotlight_cache.error')
+        logger.error('spotlight cache invalidation failed: {}'.format(e))
@@ -0,0 +1,40 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from stagecraft.apps.dashboards.models import Dashboard
+from stagecraft.apps.datasets.models import DataSet
+from stagecraft.libs.views import utils
+
+
+class Command(BaseCommand):
+    help = ("Times the readable and compact JSON encodings of the spotlight "
+            "dashboard list and the /data-sets listing against the current "
+            "database, and reports the size of each.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='How many times to encode each payload')
+
+    def handle(self, *args, **options):
+        payloads = [
+            ('list_for_spotlight', Dashboard.list_for_spotlight()),
+            ('/data-sets', [
+                data_set.serialize() for data_set in
+                DataSet.objects.select_related('data_group', 'data_type')]),
+        ]
+        encodings = [
+            ('readable', utils.to_json),
+            ('compact', utils.to_compact_json),
+        ]
+
+        for name, payload in payloads:
+            for encoding, encode in encodings:
+                seconds = min(timeit.repeat(
+                    lambda: encode(payload), number=1,
+                    repeat=options['repeat']))
+                self.stdout.write(
+                    "{} {}: {} bytes, {:.2f}ms".format(
+                        name, encoding, len(encode(payload).encode('utf-8')),
+                        seconds * 1000))
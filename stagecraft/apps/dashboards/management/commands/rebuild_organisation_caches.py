@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from stagecraft.apps.dashboards.lib import spotlight_cache
+from stagecraft.apps.dashboards.models import Dashboard
+
+
+class Command(BaseCommand):
+    help = ("Recomputes the department, agency, service and transaction "
+            "of every dashboard from the organisation tree. Run this after "
+            "moving nodes around the tree.")
+
+    def handle(self, *args, **options):
+        updated = Dashboard.objects.rebuild_organisation_caches()
+        if updated:
+            spotlight_cache.invalidate_all()
+        self.stdout.write("Updated {} dashboards".format(updated))
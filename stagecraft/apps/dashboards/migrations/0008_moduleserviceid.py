@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POPULATE_SQL = '''
+INSERT INTO dashboards_moduleserviceid (module_id, dashboard_id, service_id)
+SELECT DISTINCT modules.id, modules.dashboard_id, substr(filters, 12)
+FROM (
+    SELECT id, dashboard_id, query_parameters::json->'filter_by' AS filter_by
+    FROM dashboards_module
+    WHERE json_typeof(query_parameters::json->'filter_by') = 'array'
+) modules,
+  json_array_elements_text(modules.filter_by) AS filters
+WHERE filters LIKE 'service\\_id:%'
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0007_auto_20170627_1228'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModuleServiceId',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_id', models.CharField(db_index=True, max_length=256)),
+                ('dashboard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_ids', to='dashboards.Dashboard')),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_ids', to='dashboards.Module')),
+            ],
+        ),
+        migrations.RunSQL(POPULATE_SQL, 'DELETE FROM dashboards_moduleserviceid'),
+    ]
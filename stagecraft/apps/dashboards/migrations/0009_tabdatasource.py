@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POPULATE_SQL = '''
+INSERT INTO dashboards_tabdatasource (module_id, data_group, data_type)
+SELECT DISTINCT modules.id,
+       tabs->'data-source'->>'data-group',
+       tabs->'data-source'->>'data-type'
+FROM (
+    SELECT dashboards_module.id,
+           dashboards_module.options::json->'tabs' AS tabs
+    FROM dashboards_module
+      INNER JOIN dashboards_moduletype
+      ON dashboards_moduletype.id = dashboards_module.type_id
+    WHERE dashboards_moduletype.name = 'tab'
+      AND json_typeof(dashboards_module.options::json->'tabs') = 'array'
+) modules,
+  json_array_elements(modules.tabs) AS tabs
+WHERE tabs->'data-source'->>'data-group' IS NOT NULL
+  AND tabs->'data-source'->>'data-type' IS NOT NULL
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0008_moduleserviceid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TabDataSource',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_group', models.CharField(max_length=200)),
+                ('data_type', models.CharField(max_length=200)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tab_data_sources', to='dashboards.Module')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='tabdatasource',
+            index_together=set([('data_group', 'data_type')]),
+        ),
+        migrations.RunSQL(POPULATE_SQL, 'DELETE FROM dashboards_tabdatasource'),
+    ]
@@ -1,2 +1,3 @@
 from .dashboard import Dashboard, Link
-from .module import Module, ModuleType
+from .module import Module, ModuleServiceId, ModuleType, TabDataSource, \
+    index_modules
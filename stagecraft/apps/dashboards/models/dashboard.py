@@ -2,12 +2,15 @@ from __future__ import unicode_literals
 import uuid
 from django.core.validators import RegexValidator
 from django.db import models
-from stagecraft.apps.organisation.models import Node
+from stagecraft.apps.organisation.models import Node, NodeClosure
 
 from stagecraft.apps.users.models import User
 from django.db.models.query import QuerySet
 
 
+TRANSACTIONS_DATA_SET = 'transactional_services_summaries'
+
+
 def list_to_tuple_pairs(elements):
     return tuple([(element, element) for element in elements])
 
@@ -15,18 +18,11 @@ def list_to_tuple_pairs(elements):
 class DashboardManager(models.Manager):
 
     def by_tx_id(self, tx_id):
-        filter_string = '"service_id:{}"'.format(tx_id)
-        return self.raw('''
-            SELECT DISTINCT dashboards_dashboard.*
-            FROM dashboards_module
-              INNER JOIN dashboards_dashboard ON
-                dashboards_dashboard.id = dashboards_module.dashboard_id,
-              json_array_elements(query_parameters::json->'filter_by') AS filters
-            WHERE filters::text = %s
-              AND data_set_id=(SELECT id FROM datasets_dataset
-                               WHERE name='transactional_services_summaries')
-              AND dashboards_dashboard.status='published'
-        ''', [filter_string])
+        return self.filter(
+            status='published',
+            service_ids__service_id=tx_id,
+            service_ids__module__data_set__name=TRANSACTIONS_DATA_SET,
+        ).distinct()
 
     def get_query_set(self):
         return QuerySet(self.model, using=self._db)
@@ -34,6 +30,69 @@ class DashboardManager(models.Manager):
     def for_user(self, user):
         return self.get_query_set().filter(owners=user)
 
+    def rebuild_organisation_caches(self):
+        """
+        Recompute the department, agency, service and transaction caches of
+        every dashboard from the current organisation tree, returning the
+        number of dashboards that changed.
+        """
+        dashboards = list(self.get_queryset().exclude(
+            _organisation=None).only(*ORGANISATION_CACHE_COLUMNS))
+        ancestors = organisation_caches_by_node(
+            set(d._organisation_id for d in dashboards))
+
+        updated = 0
+        for dashboard in dashboards:
+            caches = ancestors[dashboard._organisation_id]
+            changed = dict(
+                (column, node_id) for column, node_id in caches.items()
+                if getattr(dashboard, column) != node_id)
+            if changed:
+                self.get_queryset().filter(
+                    pk=dashboard.pk).update(**changed)
+                updated += 1
+
+        updated += self.get_queryset().filter(_organisation=None).exclude(
+            department_cache=None, agency_cache=None,
+            service_cache=None, transaction_cache=None,
+        ).update(department_cache=None, agency_cache=None,
+                 service_cache=None, transaction_cache=None)
+
+        return updated
+
+
+ORGANISATION_CACHE_COLUMNS = [
+    '_organisation_id',
+    'department_cache_id',
+    'agency_cache_id',
+    'service_cache_id',
+    'transaction_cache_id',
+]
+
+
+def organisation_caches_by_node(node_ids):
+    """
+    Map each node id to the cache columns a dashboard under it should hold,
+    reading every node's ancestry in a single query. As with the
+    organisation setter, the nearest ancestor of each type wins.
+    """
+    caches = dict((node_id, {
+        'department_cache_id': None,
+        'agency_cache_id': None,
+        'service_cache_id': None,
+        'transaction_cache_id': None,
+    }) for node_id in node_ids)
+
+    links = NodeClosure.objects.filter(
+        descendant_id__in=node_ids,
+    ).select_related('ancestor__typeOf').order_by('descendant', '-depth')
+    for link in links:
+        column = '{}_cache_id'.format(link.ancestor.typeOf.name)
+        if column in caches[link.descendant_id]:
+            caches[link.descendant_id][column] = link.ancestor_id
+
+    return caches
+
 
 class Dashboard(models.Model):
     objects = DashboardManager()
@@ -248,12 +307,14 @@ class Dashboard(models.Model):
         return related_pages_dict
 
     def spotlightify(self, request_slug=None):
+        # Organisation context comes from the denormalised caches rather
+        # than the tree; keep them current with rebuild_organisation_caches.
         base_dict = self.spotlightify_base_dict()
         base_dict['modules'] = self.spotlightify_modules()
         base_dict['relatedPages'] = self.related_pages_dict()
-        if self.department():
+        if self.department_cache is not None:
             base_dict['department'] = self.spotlightify_department()
-        if self.agency():
+        if self.agency_cache is not None:
             base_dict['agency'] = self.spotlightify_agency()
         modules_or_tabs = get_modules_or_tabs(request_slug, base_dict)
         return modules_or_tabs
@@ -295,17 +356,17 @@ class Dashboard(models.Model):
 
     def serialized_modules(self):
         return [m.serialize()
-                for m in self.module_set.filter(parent=None).order_by('order')]
+                for m in self.module_set.tree_for_dashboard(self)]
 
     def spotlightify_modules(self):
-        return [m.spotlightify() for m in
-                self.module_set.filter(parent=None).order_by('order')]
+        return [m.spotlightify()
+                for m in self.module_set.tree_for_dashboard(self)]
 
     def spotlightify_agency(self):
-        return self.agency().spotlightify()
+        return self.agency_cache.spotlightify()
 
     def spotlightify_department(self):
-        return self.department().spotlightify()
+        return self.department_cache.spotlightify()
 
     def update_transaction_link(self, title, url):
         transaction_link = self.get_transaction_link()
@@ -366,9 +427,10 @@ class Dashboard(models.Model):
         return None
 
     def department(self):
-        if self.agency() is not None:
+        agency = self.agency()
+        if agency is not None:
             dept = None
-            for node in self.agency().get_ancestors(include_self=False):
+            for node in agency.get_ancestors(include_self=False):
                 if node.typeOf.name == 'department':
                     dept = node
             return dept
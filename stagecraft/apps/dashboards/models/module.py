@@ -2,13 +2,16 @@ from __future__ import unicode_literals
 
 import copy
 import uuid
+from collections import defaultdict
 
-import jsonschema
 from django.contrib.postgres.fields import ArrayField
 from django.core.validators import RegexValidator
 from django.db import models
 from jsonfield import JSONField
 from jsonschema import Draft3Validator, SchemaError
+from jsonschema.compat import str_types
+
+from stagecraft.libs.validation import schema_validators
 
 from .dashboard import Dashboard
 
@@ -23,6 +26,43 @@ class ModuleManager(models.Manager):
     def for_user(self, user):
         return self.get_queryset().filter(dashboard__owners=user)
 
+    def tree_for_dashboard(self, dashboard):
+        """
+        Fetch every module of a dashboard in a single query and link them
+        together in memory, returning the top level modules in order.
+
+        Each module returned has its children attached, so walking the tree
+        with spotlightify() or serialize() issues no further queries.
+        """
+        modules = list(self.get_queryset().filter(
+            dashboard=dashboard).order_by('order'))
+        return self._link_children(modules)[None]
+
+    def attach_child_modules(self, modules):
+        """
+        Load every module below each of ``modules``, however deep, in a
+        single query and attach them as tree_for_dashboard() does.
+        """
+        if not modules:
+            return
+        everything = list(self.get_queryset().filter(
+            dashboard_id__in=set(m.dashboard_id for m in modules),
+        ).order_by('order'))
+        children = self._link_children(everything)
+        for module in modules:
+            module._child_modules = children[module.id]
+
+    @staticmethod
+    def _link_children(modules):
+        children = defaultdict(list)
+        for module in modules:
+            children[module.parent_id].append(module)
+
+        for module in modules:
+            module._child_modules = children[module.id]
+
+        return children
+
 
 class ModuleType(models.Model):
     id = models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True)
@@ -98,12 +138,12 @@ class Module(models.Model):
 
     # should run on normal validate
     def validate_options(self):
-        jsonschema.validate(self.options, self.type.schema)
+        schema_validators.validate(self.options, self.type.schema)
         return True
 
     # should run on normal validate
     def validate_query_parameters(self):
-        jsonschema.validate(self.query_parameters, query_param_schema)
+        schema_validators.validate(self.query_parameters, query_param_schema)
         return True
 
     # Override to perform custom validation
@@ -141,11 +181,16 @@ class Module(models.Model):
             self.validate_options()
 
     def _parent_id_as_dict(self):
-        if self.parent is not None:
-            return {'id': str(self.parent.id)}
+        if self.parent_id is not None:
+            return {'id': str(self.parent_id)}
         else:
             return None
 
+    def child_modules(self):
+        if hasattr(self, '_child_modules'):
+            return self._child_modules
+        return self.module_set.all().order_by('order')
+
     def spotlightify(self):
         out = copy.deepcopy(self.options)
         out['module-type'] = self.type.name
@@ -163,8 +208,7 @@ class Module(models.Model):
             if self.query_parameters is not None:
                 out['data-source']['query-params'] = self.query_parameters
 
-        out['modules'] = [
-            m.spotlightify() for m in self.module_set.all().order_by('order')]
+        out['modules'] = [m.spotlightify() for m in self.child_modules()]
 
         return out
 
@@ -175,7 +219,7 @@ class Module(models.Model):
                 'id': str(self.type.id),
             },
             'dashboard': {
-                'id': str(self.dashboard.id),
+                'id': str(self.dashboard_id),
             },
             'slug': self.slug,
             'title': self.title,
@@ -193,8 +237,7 @@ class Module(models.Model):
 
         out['parent'] = self._parent_id_as_dict()
 
-        out['modules'] = [
-            m.serialize() for m in self.module_set.all().order_by('order')]
+        out['modules'] = [m.serialize() for m in self.child_modules()]
 
         return out
 
@@ -203,6 +246,121 @@ class Module(models.Model):
         unique_together = ('dashboard', 'slug')
 
 
+SERVICE_ID_PREFIX = 'service_id:'
+
+
+def service_ids_in(query_parameters):
+    if not isinstance(query_parameters, dict):
+        return set()
+    filter_by = query_parameters.get('filter_by')
+    if not isinstance(filter_by, list):
+        return set()
+    return set(
+        value[len(SERVICE_ID_PREFIX):] for value in filter_by
+        if isinstance(value, str_types) and
+        value.startswith(SERVICE_ID_PREFIX))
+
+
+class ModuleServiceIdManager(models.Manager):
+
+    def index_modules(self, modules):
+        """
+        Replace the service ids recorded for ``modules`` with those in their
+        current ``filter_by`` query parameters.
+        """
+        modules = list(modules)
+        self.filter(module__in=[m.pk for m in modules]).delete()
+        self.bulk_create([
+            ModuleServiceId(
+                module_id=module.pk,
+                dashboard_id=module.dashboard_id,
+                service_id=service_id)
+            for module in modules
+            for service_id in service_ids_in(module.query_parameters)
+        ])
+
+
+class ModuleServiceId(models.Model):
+    """
+    The ``service_id:<id>`` filters of each module, pulled out of its query
+    parameters so that dashboards can be found by transaction id with an
+    index lookup. Kept in step with modules by
+    ``stagecraft.apps.dashboards.signals``.
+    """
+    module = models.ForeignKey(
+        Module, related_name='service_ids', on_delete=models.CASCADE)
+    dashboard = models.ForeignKey(
+        Dashboard, related_name='service_ids', on_delete=models.CASCADE)
+    service_id = models.CharField(max_length=256, db_index=True)
+
+    objects = ModuleServiceIdManager()
+
+    class Meta:
+        app_label = 'dashboards'
+
+
+def tab_data_sources_in(options):
+    if not isinstance(options, dict) or \
+            not isinstance(options.get('tabs'), list):
+        return set()
+    data_sources = set()
+    for tab in options['tabs']:
+        data_source = tab.get('data-source') if isinstance(tab, dict) \
+            else None
+        if not isinstance(data_source, dict):
+            continue
+        data_group = data_source.get('data-group')
+        data_type = data_source.get('data-type')
+        if isinstance(data_group, str_types) and \
+                isinstance(data_type, str_types):
+            data_sources.add((data_group, data_type))
+    return data_sources
+
+
+class TabDataSourceManager(models.Manager):
+
+    def index_modules(self, modules):
+        """
+        Replace the data sources recorded for ``modules`` with those named
+        by the tabs in their current options.
+        """
+        modules = list(modules)
+        self.filter(module__in=[m.pk for m in modules]).delete()
+        self.bulk_create([
+            TabDataSource(
+                module_id=module.pk,
+                data_group=data_group,
+                data_type=data_type)
+            for module in modules if module.type.name == 'tab'
+            for data_group, data_type in tab_data_sources_in(module.options)
+        ])
+
+
+class TabDataSource(models.Model):
+    """
+    The data group and data type read by each tab of a ``tab`` module, which
+    are named in its options rather than linked through ``data_set``. Kept
+    in step with modules by ``stagecraft.apps.dashboards.signals``.
+    """
+    module = models.ForeignKey(
+        Module, related_name='tab_data_sources', on_delete=models.CASCADE)
+    data_group = models.CharField(max_length=200)
+    data_type = models.CharField(max_length=200)
+
+    objects = TabDataSourceManager()
+
+    class Meta:
+        app_label = 'dashboards'
+        index_together = [('data_group', 'data_type')]
+
+
+def index_modules(modules):
+    """Bring the lookup tables derived from module JSON up to date."""
+    modules = list(modules)
+    ModuleServiceId.objects.index_modules(modules)
+    TabDataSource.objects.index_modules(modules)
+
+
 query_param_schema = {
     "type": "object",
     "properties": {
@@ -262,3 +420,6 @@ query_param_schema = {
         },
     }
 }
+
+
+schema_validators.evict_on_change(ModuleType, 'schema')
@@ -0,0 +1,94 @@
+from __future__ import unicode_literals
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save)
+from django.dispatch import receiver
+
+from stagecraft.apps.datasets.models import DataGroup, DataSet, DataType
+from stagecraft.apps.organisation.models import Node, NodeType
+
+from .lib import spotlight_cache
+from .models import Dashboard, Link, Module, index_modules
+
+
+def _invalidate_dashboard_on_commit(*slugs):
+    transaction.on_commit(
+        lambda: spotlight_cache.invalidate_dashboard(*slugs))
+
+
+def _invalidate_all_on_commit():
+    transaction.on_commit(spotlight_cache.invalidate_all)
+
+
+def _dashboard_slug(dashboard_id):
+    return Dashboard.objects.filter(
+        id=dashboard_id).values_list('slug', flat=True).first()
+
+
+@receiver(pre_save, sender=Dashboard)
+def dashboard_renamed(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    previous_slug = _dashboard_slug(instance.id)
+    if previous_slug is not None and previous_slug != instance.slug:
+        _invalidate_dashboard_on_commit(previous_slug)
+
+
+@receiver(post_save, sender=Dashboard)
+@receiver(post_delete, sender=Dashboard)
+def dashboard_changed(sender, instance, **kwargs):
+    _invalidate_dashboard_on_commit(instance.slug)
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+@receiver(post_save, sender=Link)
+@receiver(post_delete, sender=Link)
+def dashboard_child_changed(sender, instance, **kwargs):
+    slug = _dashboard_slug(instance.dashboard_id)
+    if slug is not None:
+        _invalidate_dashboard_on_commit(slug)
+
+
+@receiver(post_save, sender=Module)
+def module_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_modules([instance])
+
+
+@receiver(pre_save, sender=DataSet)
+def data_set_renamed(sender, instance, raw=False, **kwargs):
+    # Modules render the names of their data set's group and type
+    if raw or instance._state.adding:
+        return
+    previous = DataSet.objects.filter(id=instance.id).values_list(
+        'data_group_id', 'data_type_id').first()
+    if previous is None or previous == (
+            instance.data_group_id, instance.data_type_id):
+        return
+    slugs = list(Dashboard.objects.filter(
+        module__data_set_id=instance.id).values_list(
+            'slug', flat=True).distinct())
+    if slugs:
+        _invalidate_dashboard_on_commit(*slugs)
+
+
+@receiver(post_save, sender=Node)
+@receiver(post_delete, sender=Node)
+@receiver(post_save, sender=NodeType)
+@receiver(post_delete, sender=NodeType)
+@receiver(post_save, sender=DataGroup)
+@receiver(post_save, sender=DataType)
+def rendered_name_changed(sender, instance, created=False, **kwargs):
+    # Organisation and data set names are rendered into every dashboard that
+    # uses them, so rather than tracking which ones those are just start
+    # again. These are edited rarely.
+    if not created:
+        _invalidate_all_on_commit()
+
+
+@receiver(m2m_changed, sender=Node.parents.through)
+def organisation_tree_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_all_on_commit()
@@ -0,0 +1,91 @@
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, is_not, none
+from mock import patch
+
+from stagecraft.apps.dashboards.lib import spotlight_cache
+
+
+class FakeRedis(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+
+class SpotlightCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.client = FakeRedis()
+        patcher = patch(
+            'stagecraft.apps.dashboards.lib.spotlight_cache.get_redis_client',
+            return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_a_dashboard_is_read_back_at_its_version(self):
+        version = spotlight_cache.get_dashboard_version('a-dashboard')
+        spotlight_cache.set_dashboard('a-dashboard', version, '{}')
+
+        assert_that(
+            spotlight_cache.get_dashboard(
+                'a-dashboard',
+                spotlight_cache.get_dashboard_version('a-dashboard')),
+            equal_to('{}'))
+
+    def test_a_rendering_that_raced_an_invalidation_is_not_served(self):
+        version = spotlight_cache.get_dashboard_version('a-dashboard')
+        spotlight_cache.invalidate_dashboard('a-dashboard')
+        spotlight_cache.set_dashboard('a-dashboard', version, '"stale"')
+
+        assert_that(
+            spotlight_cache.get_dashboard(
+                'a-dashboard',
+                spotlight_cache.get_dashboard_version('a-dashboard')),
+            none())
+
+    def test_invalidating_one_dashboard_leaves_the_others(self):
+        version = spotlight_cache.get_dashboard_version('b-dashboard')
+        spotlight_cache.set_dashboard('b-dashboard', version, '{}')
+
+        spotlight_cache.invalidate_dashboard('a-dashboard')
+
+        assert_that(
+            spotlight_cache.get_dashboard_version('b-dashboard'),
+            equal_to(version))
+
+    def test_invalidating_everything_changes_every_version(self):
+        a_version = spotlight_cache.get_dashboard_version('a-dashboard')
+        b_version = spotlight_cache.get_dashboard_version('b-dashboard')
+        list_version = spotlight_cache.get_list_version()
+
+        spotlight_cache.invalidate_all()
+
+        assert_that(spotlight_cache.get_dashboard_version('a-dashboard'),
+                    is_not(equal_to(a_version)))
+        assert_that(spotlight_cache.get_dashboard_version('b-dashboard'),
+                    is_not(equal_to(b_version)))
+        assert_that(spotlight_cache.get_list_version(),
+                    equal_to(list_version + 1))
+
+    def test_nothing_is_cached_without_a_version(self):
+        spotlight_cache.set_dashboard('a-dashboard', None, '{}')
+
+        assert_that(self.client.values, equal_to({}))
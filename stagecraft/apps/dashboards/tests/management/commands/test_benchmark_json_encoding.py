@@ -0,0 +1,19 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+from hamcrest import assert_that, contains_string
+
+from ...factories.factories import DashboardFactory
+
+
+class TestBenchmarkJsonEncoding(TestCase):
+
+    def test_reports_both_encodings_of_both_payloads(self):
+        DashboardFactory(slug='benchmarked-dashboard')
+        out = StringIO()
+
+        call_command('benchmark_json_encoding', repeat=1, stdout=out)
+
+        for line in ['list_for_spotlight readable', 'list_for_spotlight '
+                     'compact', '/data-sets readable', '/data-sets compact']:
+            assert_that(out.getvalue(), contains_string(line))
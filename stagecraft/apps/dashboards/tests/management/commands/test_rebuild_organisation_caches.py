@@ -0,0 +1,46 @@
+from django.core.management import call_command
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, is_, none
+import mock
+
+from stagecraft.apps.dashboards.models import Dashboard
+from ...factories.factories import (
+    AgencyWithDepartmentFactory, DashboardFactory, DepartmentFactory)
+
+
+class TestRebuildOrganisationCaches(TestCase):
+
+    @mock.patch('stagecraft.apps.dashboards.lib.spotlight_cache.'
+                'invalidate_all')
+    def test_caches_follow_a_moved_agency(self, invalidate_all):
+        agency = AgencyWithDepartmentFactory()
+        old_department = agency.parents.first()
+        dashboard = DashboardFactory()
+        dashboard.organisation = agency
+        dashboard.save()
+
+        new_department = DepartmentFactory()
+        agency.parents.remove(old_department)
+        agency.parents.add(new_department)
+
+        call_command('rebuild_organisation_caches')
+
+        dashboard = Dashboard.objects.get(pk=dashboard.pk)
+        assert_that(dashboard.department_cache, equal_to(new_department))
+        assert_that(dashboard.agency_cache, equal_to(agency))
+        invalidate_all.assert_called_once_with()
+
+    @mock.patch('stagecraft.apps.dashboards.lib.spotlight_cache.'
+                'invalidate_all')
+    def test_unchanged_caches_are_left_alone(self, invalidate_all):
+        dashboard = DashboardFactory()
+        dashboard.organisation = AgencyWithDepartmentFactory()
+        dashboard.save()
+
+        assert_that(
+            Dashboard.objects.rebuild_organisation_caches(), is_(0))
+        call_command('rebuild_organisation_caches')
+
+        assert_that(invalidate_all.called, is_(False))
+        assert_that(
+            Dashboard.objects.get(pk=dashboard.pk).service_cache, none())
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from hamcrest import (
     assert_that, has_entry, has_key, is_not, has_length, equal_to, instance_of,
     has_entries, has_items, has_property, is_, none, calling, raises,
@@ -128,6 +130,26 @@ class DashboardTestCase(TransactionTestCase):
         )
         assert_that(len(spotlightify['modules']), equal_to(1))
 
+    def test_spotlightify_query_count_does_not_grow_with_nesting(self):
+        parent = ModuleFactory(
+            slug='a-module', order=1, dashboard=self.dashboard)
+
+        with CaptureQueriesContext(connection) as shallow:
+            self.dashboard.spotlightify()
+
+        child = ModuleFactory(
+            slug='b-module', order=2, dashboard=self.dashboard,
+            parent=parent)
+        ModuleFactory(
+            slug='c-module', order=3, dashboard=self.dashboard,
+            parent=child)
+
+        with CaptureQueriesContext(connection) as deep:
+            self.dashboard.spotlightify()
+
+        assert_that(len(deep.captured_queries),
+                    equal_to(len(shallow.captured_queries)))
+
     def test_transaction_link(self):
         self.dashboard.update_transaction_link('blah', 'http://www.gov.uk')
         self.dashboard.update_transaction_link('blah2', 'http://www.gov.uk')
@@ -262,6 +262,28 @@ class ModuleTestCase(TestCase):
             serialization['modules'][0]['parent'],
             has_entry('id', str(parent.id)))
 
+    def test_tree_for_dashboard_links_children_in_order(self):
+        parent = ModuleFactory(
+            slug='a-module', order=1, dashboard=self.dashboard_a)
+        child = ModuleFactory(
+            slug='b-module', order=3, parent=parent,
+            dashboard=self.dashboard_a)
+        other_child = ModuleFactory(
+            slug='c-module', order=2, parent=parent,
+            dashboard=self.dashboard_a)
+        ModuleFactory(slug='d-module', order=4, dashboard=self.dashboard_b)
+
+        with self.assertNumQueries(1):
+            modules = Module.objects.tree_for_dashboard(self.dashboard_a)
+            spotlightify = [m.spotlightify() for m in modules]
+
+        assert_that(modules, contains(parent))
+        assert_that(modules[0].child_modules(),
+                    contains(other_child, child))
+        assert_that(spotlightify[0], has_entry(
+            'modules', contains(other_child.spotlightify(),
+                                child.spotlightify())))
+
     def test_cannot_have_two_equal_slugs_on_one_dashboard(self):
         def create_module(dashboard_model):
             with transaction.atomic():
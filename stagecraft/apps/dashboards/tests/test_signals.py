@@ -0,0 +1,128 @@
+from django.test import TransactionTestCase
+from hamcrest import assert_that, equal_to
+from mock import patch
+
+from stagecraft.apps.dashboards.tests.factories.factories import (
+    DashboardFactory, LinkFactory, ModuleFactory, ModuleTypeFactory)
+from stagecraft.apps.dashboards.views.module import add_modules_to_dashboard
+from stagecraft.apps.datasets.tests.factories import (
+    DataGroupFactory, DataSetFactory)
+from stagecraft.apps.organisation.tests.factories import (
+    NodeFactory, NodeTypeFactory)
+
+
+@patch('stagecraft.apps.dashboards.signals.spotlight_cache')
+class SpotlightCacheInvalidationTestCase(TransactionTestCase):
+
+    def test_saving_a_dashboard_invalidates_it(self, spotlight_cache_patch):
+        dashboard = DashboardFactory(slug='a-dashboard')
+        spotlight_cache_patch.reset_mock()
+
+        dashboard.title = 'A new title'
+        dashboard.save()
+
+        spotlight_cache_patch.invalidate_dashboard.assert_called_with(
+            'a-dashboard')
+
+    def test_renaming_a_dashboard_invalidates_the_old_slug(
+            self, spotlight_cache_patch):
+        dashboard = DashboardFactory(slug='a-dashboard')
+        spotlight_cache_patch.reset_mock()
+
+        dashboard.slug = 'b-dashboard'
+        dashboard.save()
+
+        invalidated = [
+            call[0] for call in
+            spotlight_cache_patch.invalidate_dashboard.call_args_list]
+        assert_that(sorted(invalidated),
+                    equal_to([('a-dashboard',), ('b-dashboard',)]))
+
+    def test_saving_a_module_invalidates_its_dashboard(
+            self, spotlight_cache_patch):
+        dashboard = DashboardFactory(slug='a-dashboard')
+        spotlight_cache_patch.reset_mock()
+
+        ModuleFactory(dashboard=dashboard)
+
+        spotlight_cache_patch.invalidate_dashboard.assert_called_once_with(
+            'a-dashboard')
+
+    @patch('stagecraft.apps.dashboards.views.module.spotlight_cache')
+    def test_adding_modules_invalidates_their_dashboards(
+            self, view_spotlight_cache_patch, spotlight_cache_patch):
+        dashboard = DashboardFactory(slug='a-dashboard')
+        moved = ModuleFactory(
+            dashboard=DashboardFactory(slug='b-dashboard'), slug='moved')
+        module_type = ModuleTypeFactory()
+
+        def module_settings(slug, **extra):
+            settings = {
+                'slug': slug,
+                'type_id': str(module_type.id),
+                'title': slug,
+                'description': '',
+                'info': [],
+                'options': {},
+                'order': 1,
+            }
+            settings.update(extra)
+            return settings
+
+        modules = add_modules_to_dashboard(dashboard, [
+            module_settings('new'),
+            module_settings('moved', id=str(moved.id)),
+        ])
+
+        invalidated = \
+            view_spotlight_cache_patch.invalidate_dashboard.call_args[0]
+        assert_that(sorted(invalidated),
+                    equal_to(['a-dashboard', 'b-dashboard']))
+        assert_that([module._state.adding for module in modules],
+                    equal_to([False, False]))
+
+    def test_deleting_a_link_invalidates_its_dashboard(
+            self, spotlight_cache_patch):
+        link = LinkFactory(dashboard=DashboardFactory(slug='a-dashboard'))
+        spotlight_cache_patch.reset_mock()
+
+        link.delete()
+
+        spotlight_cache_patch.invalidate_dashboard.assert_called_once_with(
+            'a-dashboard')
+
+    def test_editing_an_organisation_invalidates_everything(
+            self, spotlight_cache_patch):
+        node = NodeFactory()
+        assert_that(spotlight_cache_patch.invalidate_all.called,
+                    equal_to(False))
+
+        node.name = 'A new name'
+        node.save()
+
+        assert_that(spotlight_cache_patch.invalidate_all.called,
+                    equal_to(True))
+
+    def test_moving_a_data_set_invalidates_the_dashboards_using_it(
+            self, spotlight_cache_patch):
+        data_set = DataSetFactory()
+        ModuleFactory(
+            dashboard=DashboardFactory(slug='a-dashboard'), data_set=data_set)
+        DashboardFactory(slug='b-dashboard')
+        spotlight_cache_patch.reset_mock()
+
+        data_set.data_group = DataGroupFactory()
+        data_set.save()
+
+        spotlight_cache_patch.invalidate_dashboard.assert_called_once_with(
+            'a-dashboard')
+
+    def test_deleting_an_organisation_type_invalidates_everything(
+            self, spotlight_cache_patch):
+        node_type = NodeTypeFactory()
+        spotlight_cache_patch.reset_mock()
+
+        node_type.delete()
+
+        assert_that(spotlight_cache_patch.invalidate_all.called,
+                    equal_to(True))
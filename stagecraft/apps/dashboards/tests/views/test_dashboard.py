@@ -97,6 +97,48 @@ class DashboardViewsListTestCase(TestCase):
             has_entries(returned_data[1])
         )
 
+    def test_dashboard_list_honours_if_none_match(self):
+        DashboardFactory(slug='listed-dashboard')
+        resp = self.client.get('/public/dashboards')
+        etag = resp['ETag']
+
+        resp = self.client.get(
+            '/public/dashboards', HTTP_IF_NONE_MATCH=etag)
+        assert_that(resp.status_code, equal_to(304))
+        assert_that(resp['ETag'], equal_to(etag))
+
+        DashboardFactory(slug='another-listed-dashboard')
+        resp = self.client.get(
+            '/public/dashboards', HTTP_IF_NONE_MATCH=etag)
+        assert_that(resp.status_code, equal_to(200))
+
+    @patch(
+        "stagecraft.apps.dashboards.models."
+        "dashboard.Dashboard.list_for_spotlight")
+    @patch('stagecraft.apps.dashboards.views.dashboard.spotlight_cache')
+    def test_dashboard_list_304_needs_no_rendering(
+            self, spotlight_cache_patch, patch_list_for_spotlight):
+        spotlight_cache_patch.get_list_version.return_value = 7
+
+        resp = self.client.get(
+            '/public/dashboards', HTTP_IF_NONE_MATCH='"list-7"')
+
+        assert_that(resp.status_code, equal_to(304))
+        assert_that(spotlight_cache_patch.get_list.called, equal_to(False))
+        assert_that(patch_list_for_spotlight.called, equal_to(False))
+
+    @patch('stagecraft.apps.dashboards.views.dashboard.spotlight_cache')
+    def test_dashboard_list_is_rendered_once_per_version(
+            self, spotlight_cache_patch):
+        spotlight_cache_patch.get_list_version.return_value = 7
+        spotlight_cache_patch.get_list.return_value = None
+
+        resp = self.client.get('/public/dashboards')
+
+        spotlight_cache_patch.set_list.assert_called_once_with(
+            7, resp.content)
+        assert_that(resp['ETag'], equal_to('"list-7"'))
+
     def test_get_dashboards_with_slug_query_param_returns_dashboard_json(self):
         DashboardFactory(slug='my_first_slug')
         resp = self.client.get(
@@ -124,6 +166,70 @@ class DashboardViewsListTestCase(TestCase):
             '/public/dashboards', {'slug': 'unpublished_dashboard'})
         assert_that(resp['Cache-Control'], equal_to('no-cache'))
 
+    @patch('stagecraft.apps.dashboards.views.dashboard.spotlight_cache')
+    def test_published_dashboard_is_stored_in_spotlight_cache(
+            self, spotlight_cache_patch):
+        spotlight_cache_patch.get_dashboard_version.return_value = '3.5'
+        spotlight_cache_patch.get_dashboard.return_value = None
+        DashboardFactory(slug='published_dashboard')
+        DashboardFactory(slug='unpublished_dashboard', published=False)
+
+        resp = self.client.get(
+            '/public/dashboards', {'slug': 'published_dashboard'})
+        spotlight_cache_patch.set_dashboard.assert_called_once_with(
+            'published_dashboard', '3.5', resp.content)
+
+        spotlight_cache_patch.set_dashboard.reset_mock()
+        self.client.get(
+            '/public/dashboards', {'slug': 'unpublished_dashboard'})
+        assert_that(spotlight_cache_patch.set_dashboard.called,
+                    equal_to(False))
+
+    @patch('stagecraft.apps.dashboards.views.dashboard.fetch_dashboard')
+    @patch('stagecraft.apps.dashboards.views.dashboard.spotlight_cache')
+    def test_precompressed_dashboard_is_served_as_stored(
+            self, spotlight_cache_patch, fetch_dashboard_patch):
+        spotlight_cache_patch.get_dashboard_version.return_value = '3.5'
+        spotlight_cache_patch.get_dashboard.return_value = b'gzipped bytes'
+
+        resp = self.client.get(
+            '/public/dashboards', {'slug': 'my-dashboard'},
+            HTTP_ACCEPT_ENCODING='gzip')
+
+        spotlight_cache_patch.get_dashboard.assert_called_once_with(
+            'my-dashboard', '3.5', 'gzip')
+        assert_that(resp.content, equal_to(b'gzipped bytes'))
+        assert_that(resp['Content-Encoding'], equal_to('gzip'))
+        assert_that(resp['Vary'], equal_to('Accept-Encoding'))
+        assert_that(fetch_dashboard_patch.called, equal_to(False))
+
+    @patch('stagecraft.apps.dashboards.views.dashboard.fetch_dashboard')
+    @patch('stagecraft.apps.dashboards.views.dashboard.spotlight_cache')
+    def test_cached_dashboard_is_served_without_fetching(
+            self, spotlight_cache_patch, fetch_dashboard_patch):
+        spotlight_cache_patch.get_dashboard.return_value = to_json({
+            'slug': 'my-dashboard',
+            'modules': [
+                {'slug': 'a-module', 'modules': []},
+                {'slug': 'b-module', 'modules': []},
+            ],
+        })
+
+        resp = self.client.get(
+            '/public/dashboards', {'slug': 'my-dashboard'})
+        assert_that(json.loads(resp.content),
+                    has_entry('slug', 'my-dashboard'))
+        assert_that(resp['Cache-Control'], equal_to('max-age=300'))
+
+        resp = self.client.get(
+            '/public/dashboards', {'slug': 'my-dashboard/b-module'})
+        assert_that(json.loads(resp.content), has_entries({
+            'page-type': 'module',
+            'modules': contains(has_entry('slug', 'b-module')),
+        }))
+
+        assert_that(fetch_dashboard_patch.called, equal_to(False))
+
     @patch(
         'stagecraft.apps.dashboards.models.dashboard.Dashboard.spotlightify')
     def test_get_dashboards_with_slug_query_param_returns_404_if_no_dashboard(
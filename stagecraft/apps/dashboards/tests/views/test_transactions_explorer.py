@@ -43,6 +43,10 @@ class TransactionsExplorerViewsTestCase(TestCase):
         cls.data_group.delete()
 
     def build_dashboard(self, published=True, filter_by=[]):
+        dashboard, _ = self.build_dashboard_with_module(published, filter_by)
+        return dashboard
+
+    def build_dashboard_with_module(self, published=True, filter_by=[]):
         dashboard = DashboardFactory(
             published=published,
         )
@@ -54,7 +58,7 @@ class TransactionsExplorerViewsTestCase(TestCase):
             },
         )
 
-        return dashboard
+        return dashboard, module
 
     def test_dashboard_by_tx(self):
         dashboard = self.build_dashboard(
@@ -113,3 +117,21 @@ class TransactionsExplorerViewsTestCase(TestCase):
 
         assert_that(len(resp_json), is_(1))
         assert_that(resp_json[0]['slug'], is_(dashboard.slug))
+
+    def test_dashboard_by_tx_follows_module_changes(self):
+        _, module = self.build_dashboard_with_module(
+            published=True,
+            filter_by=['service_id:hmrc-tax'],
+        )
+        module.query_parameters = {'filter_by': ['service_id:hmrc-vat']}
+        module.save()
+
+        assert_that(
+            list(Dashboard.objects.by_tx_id('hmrc-tax')), has_length(0))
+        assert_that(
+            list(Dashboard.objects.by_tx_id('hmrc-vat')), has_length(1))
+
+        module.delete()
+
+        assert_that(
+            list(Dashboard.objects.by_tx_id('hmrc-vat')), has_length(0))
@@ -1,14 +1,20 @@
+import hashlib
+import json
 import logging
 
 from django.conf import settings
-from django.http import (HttpResponse)
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
 
-from stagecraft.apps.dashboards.models.dashboard import Dashboard
+from stagecraft.apps.dashboards.lib import spotlight_cache
+from stagecraft.apps.dashboards.models.dashboard import (
+    Dashboard, get_modules_or_tabs)
 from stagecraft.apps.organisation.models import Node
+from stagecraft.libs.compression import encoded_response, negotiate_encoding
 from stagecraft.libs.validation.validation import is_uuid
 from stagecraft.libs.views.resource import ResourceView, UUID_RE_STRING
 from stagecraft.libs.views.utils import to_json, create_http_error
-from .module import add_module_to_dashboard, ModuleView
+from .module import add_modules_to_dashboard, ModuleView
 import time
 
 logger = logging.getLogger(__name__)
@@ -17,20 +23,78 @@ logger = logging.getLogger(__name__)
 def dashboards_for_spotlight(request):
     dashboard_slug = request.GET.get('slug')
     if not dashboard_slug:
-        return dashboard_list_for_spotlight()
+        return dashboard_list_for_spotlight(request)
     else:
         return single_dashboard_for_spotlight(request, dashboard_slug)
 
 
-def dashboard_list_for_spotlight():
-    dashboard_json = Dashboard.list_for_spotlight()
-    json_str = to_json(dashboard_json)
-    response = HttpResponse(json_str, content_type='application/json')
+def dashboard_list_for_spotlight(request):
+    version = spotlight_cache.get_list_version()
+    if version is None:
+        json_str = to_json(Dashboard.list_for_spotlight(), compact=True)
+        etag = quote_etag(hashlib.sha1(json_str.encode('utf-8')).hexdigest())
+    else:
+        etag = quote_etag('list-{}'.format(version))
+        if etag_matches(request, etag):
+            # Answered from the version alone, without touching the database
+            return list_response(HttpResponseNotModified(), etag)
+
+        encoding = negotiate_encoding(request)
+        if encoding is not None:
+            body = spotlight_cache.get_list(version, encoding)
+            if body is not None:
+                return encoded_response(list_response(
+                    HttpResponse(body, content_type='application/json'),
+                    etag), encoding)
+
+        json_str = spotlight_cache.get_list(version)
+        if json_str is None:
+            json_str = to_json(Dashboard.list_for_spotlight(), compact=True)
+            spotlight_cache.set_list(version, json_str)
+
+    if etag_matches(request, etag):
+        return list_response(HttpResponseNotModified(), etag)
+
+    return list_response(
+        HttpResponse(json_str, content_type='application/json'), etag)
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison
+    etags = [e[2:] if e.startswith('W/') else e
+             for e in parse_etags(if_none_match)]
+    return '*' in etags or etag in etags
+
+
+def list_response(response, etag):
+    response['ETag'] = etag
     response['Cache-Control'] = 'max-age=300'
     return response
 
 
 def single_dashboard_for_spotlight(request, dashboard_slug):
+    slug = dashboard_slug.split('/')[0]
+    version = spotlight_cache.get_dashboard_version(slug)
+    encoding = negotiate_encoding(request)
+    if slug == dashboard_slug and encoding is not None:
+        body = spotlight_cache.get_dashboard(slug, version, encoding)
+        if body is not None:
+            return encoded_response(
+                spotlight_response(body, published=True), encoding)
+
+    json_str = spotlight_cache.get_dashboard(slug, version)
+    if json_str is not None:
+        if slug != dashboard_slug:
+            dashboard_json = get_modules_or_tabs(
+                dashboard_slug, json.loads(json_str))
+            if not dashboard_json:
+                return error_response(request, dashboard_slug)
+            json_str = to_json(dashboard_json)
+        return spotlight_response(json_str, published=True)
+
     start = time.time()
     logger.info('fetching dashboard')
     dashboard = fetch_dashboard(dashboard_slug)
@@ -40,20 +104,33 @@ def single_dashboard_for_spotlight(request, dashboard_slug):
         fetch_elapsed), extra={'elapsed_time': fetch_elapsed})
     if not dashboard:
         return error_response(request, dashboard_slug)
-    dashboard_json = dashboard.spotlightify(dashboard_slug)
+    dashboard_json = dashboard.spotlightify()
     spotlightify_time = time.time()
     spotlightify_elapsed = spotlightify_time - start
     logger.info('spotlightifying dashboard took {}'.format(
         spotlightify_elapsed), extra={'elapsed_time': spotlightify_elapsed})
-    if not dashboard_json:
-        return error_response(request, dashboard_slug)
     json_str = to_json(dashboard_json)
 
+    if dashboard.published:
+        spotlight_cache.set_dashboard(slug, version, json_str)
+
+    if slug != dashboard_slug:
+        # get_modules_or_tabs narrows the dashboard JSON in place, so this
+        # has to happen after the whole dashboard has been encoded.
+        dashboard_json = get_modules_or_tabs(dashboard_slug, dashboard_json)
+        if not dashboard_json:
+            return error_response(request, dashboard_slug)
+        json_str = to_json(dashboard_json)
+
+    return spotlight_response(json_str, dashboard.published)
+
+
+def spotlight_response(json_str, published):
     response = HttpResponse(json_str, content_type='application/json')
 
     response['Access-Control-Allow-Origin'] = '*'
 
-    if dashboard.published:
+    if published:
         response['Cache-Control'] = 'max-age=300'
     else:
         response['Cache-Control'] = 'no-cache'
@@ -69,12 +146,14 @@ def error_response(request, dashboard_slug):
 
 def fetch_dashboard(dashboard_slug):
     slug = dashboard_slug.split('/')[0]
-    dashboard = Dashboard.objects.filter(slug=slug).first()
+    dashboard = Dashboard.objects.filter(slug=slug).select_related(
+        'department_cache', 'agency_cache').first()
     return dashboard
 
 
 class DashboardView(ResourceView):
     model = Dashboard
+    stream_list = True
 
     id_fields = {
         'id': UUID_RE_STRING,
@@ -188,16 +267,6 @@ class DashboardView(ResourceView):
             if key not in ['organisation', 'links']:
                 setattr(model, key.replace('-', '_'), value)
 
-    def update_module(self, dashboard, module, parent=None):
-        module_model = add_module_to_dashboard(dashboard, module, parent)
-        modules = [module_model]
-
-        for child_module in module['modules']:
-            modules.extend(
-                self.update_module(dashboard, child_module, module_model))
-
-        return modules
-
     def update_relationships(self, model, model_json, request, parent):
         if 'links' in model_json:
             for link_data in model_json['links']:
@@ -212,14 +281,15 @@ class DashboardView(ResourceView):
                                           **link_data)
 
         if 'modules' in model_json:
-            current_module_ids = set([m.id for m in model.module_set.all()])
+            current_module_ids = set(
+                model.module_set.values_list('id', flat=True))
 
-            for module in model_json['modules']:
-                try:
-                    for changed_module in self.update_module(model, module):
-                        current_module_ids.discard(changed_module.id)
-                except ValueError as e:
-                    return create_http_error(400, e.message, request)
+            try:
+                for changed_module in add_modules_to_dashboard(
+                        model, model_json['modules']):
+                    current_module_ids.discard(changed_module.id)
+            except ValueError as e:
+                return create_http_error(400, e.message, request)
 
             model.module_set.filter(id__in=current_module_ids).delete()
 
@@ -245,8 +315,7 @@ class DashboardView(ResourceView):
             "description": model.description,
             "title": model.title,
             "tagline": model.tagline,
-            "modules": [m.serialize() for m in model.module_set.filter(
-                parent=None).order_by('order')],
+            "modules": model.serialized_modules(),
             "dashboard_type": model.dashboard_type,
             "slug": model.slug,
             "improve_dashboard_message": model.improve_dashboard_message,
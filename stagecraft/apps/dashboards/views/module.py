@@ -1,18 +1,27 @@
 from django.utils.decorators import method_decorator
 from stagecraft.libs.views.resource import ResourceView, UUID_RE_STRING
+from functools import reduce
 import json
+import operator
+import uuid
 
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from jsonschema.exceptions import ValidationError
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.exceptions import NON_FIELD_ERRORS
 from django.views.decorators.cache import never_cache
-from django.db import DataError
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Q
+from django.db.models.functions import Cast
 
 from stagecraft.apps.datasets.models import DataSet
 from stagecraft.libs.validation.validation import is_uuid
 
-from ..models import Dashboard, Module, ModuleType
+from stagecraft.libs.bulk_update import bulk_update
+
+from ..lib import spotlight_cache
+from ..models import Dashboard, Module, ModuleType, index_modules
 from stagecraft.libs.views.utils import create_http_error, add_items_to_model
 
 
@@ -27,7 +36,146 @@ REQUIRED_KEYS = set(['type_id', 'slug', 'title', 'description', 'info',
                      'options', 'order'])
 
 
+MODULE_FIELDS = ['dashboard', 'type', 'parent', 'data_set', 'slug', 'title',
+                 'description', 'info', 'options', 'query_parameters',
+                 'order']
+
+# Looked up in bulk before validation, so full_clean() need not check them
+# again one query at a time.
+RESOLVED_FIELDS = ['dashboard', 'type', 'parent', 'data_set']
+
+
+def _as_uuid(value):
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
 def add_module_to_dashboard(dashboard, module_settings, parent_module=None):
+    return add_modules_to_dashboard(
+        dashboard, [module_settings], parent_module, recursive=False)[0]
+
+
+def add_modules_to_dashboard(dashboard, modules_settings, parent_module=None,
+                             recursive=True):
+    """
+    Create or update a list of modules and, unless ``recursive`` is False,
+    the modules nested under each of them. Returns every module written.
+
+    Module types, data sets and existing modules are each fetched in one
+    query up front and the modules are validated in memory, so the number
+    of queries does not grow with the number of modules. A ValueError
+    describing the first module found to be invalid is raised before
+    anything is written.
+    """
+    flattened = _flatten_tree(modules_settings, recursive)
+
+    module_types = ModuleType.objects.in_bulk(
+        [_as_uuid(s.get('type_id')) for s, _ in flattened
+         if _as_uuid(s.get('type_id'))])
+    existing_modules = Module.objects.in_bulk(
+        [_as_uuid(s.get('id')) for s, _ in flattened
+         if _as_uuid(s.get('id'))])
+    data_sets = _data_sets_by_name(flattened)
+    slugs = dict(Module.objects.filter(
+        dashboard=dashboard).values_list('slug', 'id'))
+    moved_from = set(
+        module.dashboard_id for module in existing_modules.values()
+        if module.dashboard_id != dashboard.id)
+    saved_slugs = dict(
+        (module.id, (module.dashboard_id, module.slug))
+        for module in existing_modules.values())
+
+    modules = []
+    for module_settings, parent_index in flattened:
+        parent = parent_module if parent_index is None \
+            else modules[parent_index]
+        module = _build_module(
+            dashboard, module_settings, parent,
+            module_types, existing_modules, data_sets, slugs)
+        modules.append(module)
+
+    new_modules = [module for module in modules if module._state.adding]
+    changed_modules = [
+        module for module in modules if not module._state.adding]
+    renamed_ids = [
+        module.id for module in changed_modules
+        if saved_slugs[module.id] != (module.dashboard_id, module.slug)]
+    try:
+        with transaction.atomic():
+            _write_modules(new_modules, changed_modules, renamed_ids)
+    except IntegrityError as e:
+        raise ValueError('modules could not be saved: {}'.format(e))
+    for module in new_modules:
+        module._state.adding = False
+
+    # Neither of those sends post_save, so do what its receivers would have.
+    index_modules(modules)
+    _invalidate_spotlight_on_commit(dashboard, moved_from)
+
+    return modules
+
+
+def _write_modules(new_modules, changed_modules, renamed_ids):
+    # The slugs were checked against each other as they will be once every
+    # module is written, but Postgres checks them row by row as they are
+    # written. So park renamed modules on slugs of their own, their ids,
+    # then update existing modules before creating new ones, freeing any
+    # slug given up to another module before it is taken.
+    if renamed_ids:
+        Module.objects.filter(id__in=renamed_ids).update(
+            slug=Cast('id', CharField()))
+    bulk_update(changed_modules, MODULE_FIELDS)
+    Module.objects.bulk_create(new_modules)
+
+
+def _invalidate_spotlight_on_commit(dashboard, moved_from):
+    slugs = [dashboard.slug]
+    if moved_from:
+        slugs.extend(Dashboard.objects.filter(
+            id__in=moved_from).values_list('slug', flat=True))
+    transaction.on_commit(
+        lambda: spotlight_cache.invalidate_dashboard(*slugs))
+
+
+def _flatten_tree(modules_settings, recursive):
+    """
+    List (module_settings, parent_index) pairs with each module before its
+    children, in the order the modules used to be saved one at a time.
+    """
+    flattened = []
+
+    def visit(settings_list, parent_index):
+        for module_settings in settings_list:
+            flattened.append((module_settings, parent_index))
+            if recursive:
+                visit(module_settings.get('modules', []), len(flattened) - 1)
+
+    visit(modules_settings, None)
+    return flattened
+
+
+def _data_sets_by_name(flattened):
+    names = set(
+        (s['data_group'], s['data_type']) for s, _ in flattened
+        if s.get('data_group') and s.get('data_type'))
+    if not names:
+        return {}
+
+    query = reduce(operator.or_, [
+        Q(data_group__name=data_group, data_type__name=data_type)
+        for data_group, data_type in names])
+    return dict(
+        ((data_set.data_group.name, data_set.data_type.name), data_set)
+        for data_set in DataSet.objects.filter(query).select_related(
+            'data_group', 'data_type'))
+
+
+def _build_module(dashboard, module_settings, parent_module,
+                  module_types, existing_modules, data_sets, slugs):
 
     def make_error(msg_part):
         return "Error in module {0} (slug '{1}') - message: '{2}'".format(
@@ -37,20 +185,22 @@ def add_module_to_dashboard(dashboard, module_settings, parent_module=None):
     if len(missing_keys) > 0:
         raise ValueError('missing keys: {}'.format(', '.join(missing_keys)))
 
-    try:
-        module_type = ModuleType.objects.get(id=module_settings['type_id'])
-    except(ModuleType.DoesNotExist, DataError):
+    module_type = module_types.get(_as_uuid(module_settings['type_id']))
+    if module_type is None:
         raise ValueError(make_error('module type was not found'))
 
     if module_settings.get('id'):
-        try:
-            module = Module.objects.get(id=module_settings['id'])
-        except Module.DoesNotExist:
+        module = existing_modules.get(_as_uuid(module_settings['id']))
+        if module is None:
             msg = 'module with id {} not found'.format(module_settings['id'])
             raise ValueError(make_error(msg))
     else:
         module = Module()
 
+    previous_slug = None
+    if module.dashboard_id == dashboard.id:
+        previous_slug = module.slug
+
     module.dashboard = dashboard
     module.type = module_type
     module.slug = module_settings['slug']
@@ -72,12 +222,9 @@ def add_module_to_dashboard(dashboard, module_settings, parent_module=None):
         raise ValueError(make_error(msg))
 
     if module_settings.get('data_group') and module_settings.get('data_type'):
-        try:
-            data_set = DataSet.objects.get(
-                data_group__name=module_settings['data_group'],
-                data_type__name=module_settings['data_type'],
-            )
-        except DataSet.DoesNotExist:
+        data_set = data_sets.get(
+            (module_settings['data_group'], module_settings['data_type']))
+        if data_set is None:
             raise ValueError(make_error('data set does not exist'))
 
         module.data_set = data_set
@@ -92,22 +239,41 @@ def add_module_to_dashboard(dashboard, module_settings, parent_module=None):
         raise ValueError(make_error('query_parameters but no data set'))
 
     try:
-        module.full_clean()
+        module.full_clean(exclude=RESOLVED_FIELDS, validate_unique=False)
+        errors = {}
     except DjangoValidationError as err:
+        errors = err.message_dict
+
+    # The check validate_unique() would make, against the slugs as they
+    # will be once the modules before this one have been written.
+    if 'slug' not in errors and slugs.get(module.slug, module.id) != module.id:
+        errors.setdefault(NON_FIELD_ERRORS, []).extend(
+            module.unique_error_message(
+                Module, ('dashboard', 'slug')).messages)
+
+    if errors:
         messages = [
             '{}: {}'.format(k, ' '.join(v))
-            for k, v in err.message_dict.items()
+            for k, v in errors.items()
         ]
         msg = "\n".join(messages)
         raise ValueError(make_error(msg))
 
-    module.save()
+    if previous_slug is not None and slugs.get(previous_slug) == module.id:
+        del slugs[previous_slug]
+    slugs[module.slug] = module.id
 
     return module
 
 
 class ModuleView(ResourceView):
     model = Module
+    owners_lookup = 'dashboard__owners'
+
+    # Module.serialize() nests every level of children
+    list_plan = {
+        'prepare': Module.objects.attach_child_modules,
+    }
 
     id_fields = {
         'id': UUID_RE_STRING,
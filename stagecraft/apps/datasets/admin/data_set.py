@@ -53,10 +53,8 @@ class DataSetAdmin(VersionAdmin):
             if obj in self.DO_NOT_DELETE:
                 return False
             data_set = DataSet.objects.get(name=obj)
-            for m in data_set.modules:
-                if m.dashboard.published:
-                    return False
-            return True
+            return not data_set.modules_query_set().filter(
+                dashboard__status='published').exists()
         return super(DataSetAdmin, self).has_delete_permission(request, obj)
 
     def response_change(self, request, model):
@@ -6,6 +6,7 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db import transaction
+from django.db.models import Q
 from django.db.models.query import QuerySet
 
 from django.utils.encoding import python_2_unicode_compatible
@@ -274,27 +275,20 @@ class DataSet(models.Model):
             self.data_group.name,
             self.data_type.name)
 
-    def _get_tabbed_modules(self):
-        modules = []
-
-        for m in Module.objects.filter(type__name='tab'):
-            for tab in m.options['tabs']:
-                if (tab['data-source']['data-group'] ==
-                        self.data_group.name) \
-                        and (tab['data-source']['data-type'] ==
-                             self.data_type.name):
-                    modules.append(m)
-        return modules
+    def modules_query_set(self):
+        """
+        Modules reading this data set, either directly or from one of their
+        tabs.
+        """
+        return Module.objects.filter(
+            Q(data_set=self) |
+            Q(tab_data_sources__data_group=self.data_group.name,
+              tab_data_sources__data_type=self.data_type.name)
+        ).distinct()
 
     @property
     def modules(self):
-        modules = []
-        for m in self.module_set.all():
-            modules.append(m)
-
-        modules.extend(self._get_tabbed_modules())
-
-        return modules
+        return list(self.modules_query_set().select_related('dashboard'))
 
     @property
     def is_capped(self):
@@ -286,6 +286,33 @@ class DataSetTestCase(TestCase):
 
         assert_equal([], data_set.modules)
 
+    def test_modules_property_follows_changes_to_tabs(self):
+        data_set = DataSet.objects.create(
+            data_group=self.data_group1,
+            data_type=self.data_type1)
+        options = {
+            'tabs': [
+                {
+                    'data-source': {
+                        'data-group': data_set.data_group.name,
+                        'data-type': data_set.data_type.name,
+                    },
+                    'module-type': 'single_timeseries',
+                    'title': 'title_1'
+                }
+            ]
+        }
+        module = ModuleFactory(
+            dashboard=DashboardFactory(status="published"),
+            type=self.module_type,
+            options=options)
+        assert_equal([module.slug], [m.slug for m in data_set.modules])
+
+        module.options = {'tabs': []}
+        module.save()
+
+        assert_equal([], data_set.modules)
+
 
 def test_character_allowed_in_name():
     for character in 'a1_':
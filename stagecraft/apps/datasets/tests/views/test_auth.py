@@ -5,6 +5,7 @@ from hamcrest import assert_that, is_, is_not, equal_to
 from httmock import HTTMock
 
 from stagecraft.apps.datasets.models.oauth_user import OAuthUser
+from stagecraft.libs.authorization.user_cache import user_cache
 from stagecraft.libs.authorization.tests.test_http import govuk_signon_mock
 from ..support.test_helpers import is_unauthorized, is_forbidden
 
@@ -14,6 +15,8 @@ class OAuthInvalidateTestCase(TestCase):
     def setUp(self):
         self.client = Client(enforce_csrf_checks=True)
         settings.USE_DEVELOPMENT_USERS = False
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
 
     def tearDown(self):
         settings.USE_DEVELOPMENT_USERS = True
@@ -5,6 +5,7 @@ from django.views.decorators.http import require_http_methods
 
 from ..models.oauth_user import OAuthUser
 from stagecraft.libs.authorization.http import permission_required
+from stagecraft.libs.authorization.user_cache import user_cache
 
 
 @csrf_exempt
@@ -13,4 +14,5 @@ from stagecraft.libs.authorization.http import permission_required
 @never_cache
 def invalidate(user, request, uid):
     OAuthUser.objects.purge_user(uid)
+    user_cache.purge(uid)
     return HttpResponse(status=204)
@@ -29,6 +29,8 @@ class InstanceExistsError(Exception):
 
 class DataSetView(ResourceView):
     model = DataSet
+    stream_list = True
+    compact_json = True
     list_filters = {
         'data-group': 'data_group__name',
         'data_group': 'data_group__name',
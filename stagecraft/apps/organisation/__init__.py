@@ -0,0 +1 @@
+default_app_config = 'stagecraft.apps.organisation.apps.OrganisationConfig'
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class OrganisationConfig(AppConfig):
+    name = 'stagecraft.apps.organisation'
+    label = 'organisation'
+
+    def ready(self):
+        from . import signals  # noqa
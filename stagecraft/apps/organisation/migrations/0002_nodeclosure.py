@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+POPULATE_SQL = '''
+INSERT INTO organisation_node_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE paths(ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM organisation_node
+  UNION ALL
+    SELECT parents.to_node_id, paths.descendant_id, paths.depth + 1
+    FROM organisation_node_parents parents
+      INNER JOIN paths ON parents.from_node_id = paths.ancestor_id
+)
+SELECT ancestor_id, descendant_id, MIN(depth)
+FROM paths
+GROUP BY ancestor_id, descendant_id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organisation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeClosure',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(related_name='descendant_links', on_delete=django.db.models.deletion.CASCADE, to='organisation.Node')),
+                ('descendant', models.ForeignKey(related_name='ancestor_links', on_delete=django.db.models.deletion.CASCADE, to='organisation.Node')),
+            ],
+            options={
+                'db_table': 'organisation_node_closure',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='nodeclosure',
+            unique_together=set([('ancestor', 'descendant')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='nodeclosure',
+            index_together=set([('descendant', 'depth')]),
+        ),
+        migrations.RunSQL(
+            POPULATE_SQL,
+            'DELETE FROM organisation_node_closure',
+        ),
+    ]
@@ -1,47 +1,74 @@
 import uuid
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connection, models
+
+
+# Walks up from each of the given descendants, keeping the shortest path
+# where a node is reachable more than one way.
+CLOSURE_INSERT_SQL = '''
+INSERT INTO organisation_node_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE paths(ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM organisation_node WHERE id IN ({})
+  UNION ALL
+    SELECT parents.to_node_id, paths.descendant_id, paths.depth + 1
+    FROM organisation_node_parents parents
+      INNER JOIN paths ON parents.from_node_id = paths.ancestor_id
+)
+SELECT ancestor_id, descendant_id, MIN(depth)
+FROM paths
+GROUP BY ancestor_id, descendant_id
+'''
 
 
 class NodeManager(models.Manager):
 
     def ancestors_of(self, node, include_self=True):
-        if include_self:
-            initial_query = 'VALUES (null::uuid, %s::uuid, 0)'
-        else:
-            initial_query = '''
-            SELECT parents.from_node_id::uuid AS node_from,
-                   parents.to_node_id::uuid AS node_to,
-                   0 AS depth
-            FROM organisation_node_parents parents
-            WHERE parents.from_node_id=%s::uuid
-            '''
-
-        return self.raw('''
-        WITH RECURSIVE node_parents(node_from, node_to, depth) AS (
-        ''' + initial_query + '''
-          UNION ALL
-            SELECT parents.from_node_id::uuid AS node_from,
-                   parents.to_node_id::uuid AS node_to,
-                   (node_parents.depth+1) AS depth
-            FROM organisation_node_parents parents, node_parents
-            WHERE parents.from_node_id=node_parents.node_to
-        )
-        SELECT organisation_node.*
-        FROM node_parents
-          INNER JOIN organisation_node
-          ON organisation_node.id = node_parents.node_to
-        ORDER BY node_parents.depth DESC
-        ''', [node.id])
+        min_depth = 0 if include_self else 1
+        return self.filter(
+            descendant_links__descendant=node,
+            descendant_links__depth__gte=min_depth,
+        ).order_by('-descendant_links__depth')
+
+    def descendants_of(self, node, include_self=False, max_depth=None):
+        # One filter() call, so that every condition applies to the same
+        # closure row rather than each joining ancestor_links again
+        conditions = {
+            'ancestor_links__ancestor': node,
+            'ancestor_links__depth__gte': 0 if include_self else 1,
+        }
+        if max_depth is not None:
+            conditions['ancestor_links__depth__lte'] = max_depth
+        return self.filter(**conditions).order_by('ancestor_links__depth')
 
     def immediate_descendants(self, node):
-        return self.raw('''
-        SELECT organisation_node.*
-        FROM organisation_node_parents
-          INNER JOIN organisation_node
-          ON organisation_node.id = organisation_node_parents.from_node_id
-        WHERE organisation_node_parents.to_node_id = %s
-        ''', [node.id])
+        return self.descendants_of(node, max_depth=1)
+
+    def rebuild_closure(self, nodes=None):
+        """
+        Recompute the closure rows of ``nodes`` and everything below them,
+        or of every node if ``nodes`` is None.
+        """
+        with connection.cursor() as cursor:
+            if nodes is None:
+                cursor.execute('DELETE FROM organisation_node_closure')
+                cursor.execute(CLOSURE_INSERT_SQL.format(
+                    'SELECT id FROM organisation_node'))
+                return
+
+            node_ids = [getattr(node, 'pk', node) for node in nodes]
+            affected = list(NodeClosure.objects.filter(
+                ancestor_id__in=node_ids,
+            ).values_list('descendant_id', flat=True).distinct())
+            affected = list(set(affected) | set(node_ids))
+
+            cursor.execute(
+                'DELETE FROM organisation_node_closure '
+                'WHERE descendant_id = ANY(%s::uuid[])', [affected])
+            cursor.execute(
+                CLOSURE_INSERT_SQL.format(
+                    'SELECT id FROM organisation_node '
+                    'WHERE id = ANY(%s::uuid[])'),
+                [affected])
 
     def get_queryset(self):
         return super(NodeManager, self).get_queryset().select_related('typeOf')
@@ -114,6 +141,9 @@ class Node(models.Model):
     def get_immediate_descendants(self):
         return Node.objects.immediate_descendants(self)
 
+    def get_descendants(self, include_self=False):
+        return Node.objects.descendants_of(self, include_self)
+
     def spotlightify(self):
         node = {}
         if self.abbreviation is not None:
@@ -124,3 +154,22 @@ class Node(models.Model):
         if self.slug is not None:
             node['slug'] = self.slug
         return node
+
+
+class NodeClosure(models.Model):
+    """
+    Every (ancestor, descendant) pair in the organisation tree, including
+    each node paired with itself at depth 0. Kept up to date from
+    ``Node.parents`` by ``stagecraft.apps.organisation.signals``.
+    """
+
+    class Meta:
+        db_table = 'organisation_node_closure'
+        unique_together = ('ancestor', 'descendant')
+        index_together = [('descendant', 'depth')]
+
+    ancestor = models.ForeignKey(
+        Node, related_name='descendant_links', on_delete=models.CASCADE)
+    descendant = models.ForeignKey(
+        Node, related_name='ancestor_links', on_delete=models.CASCADE)
+    depth = models.PositiveIntegerField()
@@ -0,0 +1,57 @@
+from __future__ import unicode_literals
+
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete)
+from django.dispatch import receiver
+
+from .models import Node, NodeClosure
+
+
+@receiver(post_save, sender=Node)
+def node_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # Loaded from a fixture, perhaps over an existing node. Its parents
+        # are set afterwards, through node_parents_changed.
+        NodeClosure.objects.get_or_create(
+            ancestor_id=instance.pk, descendant_id=instance.pk,
+            defaults={'depth': 0})
+    elif created:
+        NodeClosure.objects.create(
+            ancestor=instance, descendant=instance, depth=0)
+
+
+@receiver(m2m_changed, sender=Node.parents.through)
+def node_parents_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        # instance's own parents changed
+        Node.objects.rebuild_closure([instance])
+    elif action == 'post_clear':
+        # instance.node_set.clear(): its former children are still
+        # recorded as its descendants, so rebuild those
+        Node.objects.rebuild_closure(
+            NodeClosure.objects.filter(
+                ancestor=instance, depth=1,
+            ).values_list('descendant_id', flat=True))
+    elif pk_set:
+        # instance was added to or removed from these nodes' parents
+        Node.objects.rebuild_closure(pk_set)
+
+
+@receiver(pre_delete, sender=Node)
+def node_deleting(sender, instance, **kwargs):
+    # The parent links of a deleted node go without an m2m_changed signal,
+    # so note what sits below it while the closure still says.
+    instance._closure_descendants = list(NodeClosure.objects.filter(
+        ancestor=instance, depth__gt=0,
+    ).values_list('descendant_id', flat=True))
+
+
+@receiver(post_delete, sender=Node)
+def node_deleted(sender, instance, **kwargs):
+    descendants = getattr(instance, '_closure_descendants', None)
+    if descendants:
+        Node.objects.rebuild_closure(descendants)
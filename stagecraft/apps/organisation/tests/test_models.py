@@ -1,9 +1,10 @@
+from django.core import serializers
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.test import TestCase
 from hamcrest import (
     assert_that, has_entry, has_key, is_not, is_,
-    calling, raises
+    calling, raises, contains
 )
 from nose.tools import eq_, assert_raises
 
@@ -72,6 +73,85 @@ class NodeTestCase(TestCase):
         assert_that(len(immediate_descendants), is_(1))
         assert_that(a_node_has_name('intermediate', immediate_descendants))
 
+    def test_get_descendants(self):
+        root = Node.objects.create(name='root', typeOf=self.node_type)
+        intermediate = Node.objects.create(name='intermediate',
+                                           typeOf=self.node_type)
+        intermediate.parents.add(root)
+        leaf = Node.objects.create(name='leaf', typeOf=self.node_type)
+        leaf.parents.add(intermediate)
+
+        descendants = list(root.get_descendants())
+        assert_that([n.name for n in descendants],
+                    contains('intermediate', 'leaf'))
+        assert_that(len(root.get_descendants(include_self=True)), is_(3))
+
+    def test_max_depth_excludes_deeper_descendants(self):
+        root = Node.objects.create(name='root', typeOf=self.node_type)
+        intermediate = Node.objects.create(name='intermediate',
+                                           typeOf=self.node_type)
+        intermediate.parents.add(root)
+        leaf = Node.objects.create(name='leaf', typeOf=self.node_type)
+        leaf.parents.add(intermediate)
+
+        descendants = Node.objects.descendants_of(root, max_depth=1)
+
+        assert_that([n.name for n in descendants], contains('intermediate'))
+        assert_that(
+            [n.name for n in Node.objects.descendants_of(
+                root, include_self=True, max_depth=1)],
+            contains('root', 'intermediate'))
+
+    def test_ancestors_follow_changes_to_parents(self):
+        root = Node.objects.create(name='root', typeOf=self.node_type)
+        other_root = Node.objects.create(name='other', typeOf=self.node_type)
+        intermediate = Node.objects.create(name='intermediate',
+                                           typeOf=self.node_type)
+        intermediate.parents.add(root)
+        leaf = Node.objects.create(name='leaf', typeOf=self.node_type)
+        leaf.parents.add(intermediate)
+
+        assert_that([n.name for n in leaf.get_ancestors()],
+                    contains('root', 'intermediate', 'leaf'))
+
+        intermediate.parents.remove(root)
+        other_root.node_set.add(intermediate)
+
+        assert_that([n.name for n in leaf.get_ancestors()],
+                    contains('other', 'intermediate', 'leaf'))
+
+        intermediate.delete()
+
+        assert_that([n.name for n in leaf.get_ancestors()],
+                    contains('leaf'))
+
+    def test_nodes_loaded_from_a_fixture_are_in_the_closure(self):
+        root = Node.objects.create(name='root', typeOf=self.node_type)
+        leaf = Node.objects.create(name='leaf', typeOf=self.node_type)
+        leaf.parents.add(root)
+        # Children first, as a fixture may have them
+        fixture = serializers.serialize('json', [leaf, root])
+        Node.objects.filter(pk__in=[root.pk, leaf.pk]).delete()
+
+        for loaded in serializers.deserialize('json', fixture):
+            loaded.save()
+
+        assert_that([n.name for n in Node.objects.ancestors_of(leaf)],
+                    contains('root', 'leaf'))
+        assert_that(
+            [n.name for n in Node.objects.descendants_of(
+                root, include_self=True)],
+            contains('root', 'leaf'))
+
+    def test_get_ancestors_is_a_single_query(self):
+        parent = Node.objects.create(name='parent', typeOf=self.node_type)
+        child = Node.objects.create(name='child', typeOf=self.node_type)
+        child.parents.add(parent)
+
+        with self.assertNumQueries(1):
+            types = [n.typeOf.name for n in child.get_ancestors()]
+        assert_that(types, is_(['foo', 'foo']))
+
 
 class NodeTypeTestCase(TestCase):
 
@@ -1,7 +1,6 @@
 import logging
 import uuid
 
-import jsonschema
 from jsonfield import JSONField
 from django.core.validators import RegexValidator
 from django.db import models
@@ -12,6 +11,7 @@ from jsonschema import Draft3Validator, SchemaError, ValidationError
 from stagecraft.apps.dashboards.models.module import query_param_schema
 from stagecraft.apps.datasets.models import DataGroup, DataType
 from stagecraft.apps.users.models import User
+from stagecraft.libs.validation import schema_validators
 
 logger = logging.getLogger(__name__)
 
@@ -82,13 +82,17 @@ class Transform(models.Model):
 
     def validate(self):
         try:
-            jsonschema.validate(self.query_parameters, query_param_schema)
+            schema_validators.validate(
+                self.query_parameters, query_param_schema)
         except ValidationError as err:
             return 'query parameters are invalid: {}'.format(err)
 
         try:
-            jsonschema.validate(self.options, self.type.schema)
+            schema_validators.validate(self.options, self.type.schema)
         except ValidationError as err:
             return 'options are invalid: {}'.format(err)
 
         return None
+
+
+schema_validators.evict_on_change(TransformType, 'schema')
@@ -65,6 +65,15 @@ class TransformTypeView(ResourceView):
 class TransformView(ResourceView):
 
     model = Transform
+    list_plan = {
+        'select_related': [
+            'type',
+            'input_group',
+            'input_type',
+            'output_group',
+            'output_type',
+        ],
+    }
     schema = {
         "$schema": "http://json-schema.org/schema#",
         "type": "object",
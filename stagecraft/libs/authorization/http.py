@@ -1,14 +1,20 @@
 import logging
-import json
-import requests
 
+import requests
 from stagecraft.apps.datasets.models import OAuthUser
+from stagecraft.libs.authorization.user_cache import user_cache
+from stagecraft.libs.http_client import get_http_client
 from stagecraft.libs.validation.validation import extract_bearer_token
 from stagecraft.libs.views.utils import create_http_error
 from django.conf import settings
 from django_statsd.clients import statsd
 
 audit_logger = logging.getLogger('stagecraft.audit')
+logger = logging.getLogger(__name__)
+
+
+class SignonUnavailableError(Exception):
+    """Raised when signon can not be asked who a token belongs to."""
 
 
 @statsd.timer('get_user.both')
@@ -31,7 +37,9 @@ def _get_user(access_token, anon_allowed):
             except KeyError:
                 user = None
         else:
-            user = _get_user_from_database(access_token)
+            user = user_cache.get(access_token)
+            if user is None:
+                user = _get_user_from_database(access_token)
             if user is None:
                 user = _get_user_from_signon(access_token)
                 if user is not None:
@@ -50,11 +58,17 @@ def _get_user(access_token, anon_allowed):
 
 @statsd.timer('get_user.signon')
 def _get_user_from_signon(access_token):
-    response = requests.get(
-        '{0}/user.json?client_id={1}'.format(
-            settings.SIGNON_URL, settings.SIGNON_CLIENT_ID),
-        headers={'Authorization': 'Bearer {0}'.format(access_token)}
-    )
+    try:
+        response = get_http_client('signon').get(
+            '{0}/user.json?client_id={1}'.format(
+                settings.SIGNON_URL, settings.SIGNON_CLIENT_ID),
+            headers={'Authorization': 'Bearer {0}'.format(access_token)}
+        )
+    except requests.RequestException as e:
+        # Includes timeouts and the circuit being open
+        statsd.incr('get_user.signon.error')
+        logger.warning('could not reach signon: {}'.format(e))
+        raise SignonUnavailableError(e)
     if response.status_code == 200:
         return response.json()['user']
 
@@ -63,7 +77,9 @@ def _get_user_from_signon(access_token):
 def _get_user_from_database(access_token):
     oauth_user = OAuthUser.objects.get_by_access_token(access_token)
     if oauth_user:
-        return oauth_user.serialize()
+        user = oauth_user.serialize()
+        user_cache.set(access_token, user, oauth_user.expires_at)
+        return user
 
 
 def _set_user_to_database(access_token, user):
@@ -114,9 +130,14 @@ def forbidden(request, message):
 # allow permission 'anon' in the permissions for a user to see the view
 def authorize(request, permission, anon_allowed=True):
     access_token = extract_bearer_token(request)
-    (user, has_permission) = check_permission(
-        access_token, permission, anon_allowed
-    )
+    try:
+        (user, has_permission) = check_permission(
+            access_token, permission, anon_allowed
+        )
+    except SignonUnavailableError:
+        return None, create_http_error(
+            503, 'Service Unavailable: could not check access token.',
+            request)
 
     if user is None:
         return user, unauthorized(request, 'invalid access token.')
@@ -143,7 +164,3 @@ def permission_required(permission=None):
                 return a_view(user, request, *args, **kwargs)
         return _wrapped_view
     return decorator
-
-
-def to_json(what):
-    return json.dumps(what, indent=1)
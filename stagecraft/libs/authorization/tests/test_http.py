@@ -4,16 +4,20 @@ from functools import wraps
 from hamcrest import assert_that, equal_to, none, is_
 from httmock import urlmatch, HTTMock
 from mock import patch
+import requests
 
 from django.conf import settings
 from django.http import HttpRequest, HttpResponse
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from stagecraft.apps.datasets.models import OAuthUser
 from stagecraft.apps.datasets.tests.support.test_helpers import has_header
 from stagecraft.libs.authorization.http import (
-    check_permission, authorize, _get_resource_role_permissions
+    check_permission, authorize, _get_resource_role_permissions, _get_user
 )
+from stagecraft.libs.authorization.user_cache import user_cache
+from stagecraft.libs.http_client import CircuitOpenError
 
 
 def govuk_signon_mock(**kwargs):
@@ -22,6 +26,7 @@ def govuk_signon_mock(**kwargs):
     # This will prevent loading them from the database
     # instead of using the signon mock.
     OAuthUser.objects.all().delete()
+    user_cache.clear()
 
     @urlmatch(netloc=r'.*signon.*')
     def func(url, request):
@@ -72,6 +77,8 @@ class CheckPermissionTestCase(TestCase):
 
     def setUp(self):
         self.use_development_users = settings.USE_DEVELOPMENT_USERS
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
 
     def tearDown(self):
         settings.USE_DEVELOPMENT_USERS = self.use_development_users
@@ -90,7 +97,7 @@ class CheckPermissionTestCase(TestCase):
         assert_that(user['name'], equal_to('Foobar'))
         assert_that(has_permission, equal_to(True))
 
-    @patch('requests.get')
+    @patch('stagecraft.libs.http_client.http_client.HttpClient.get')
     def test_signon_with_client_id(self, get_patch):
         settings.USE_DEVELOPMENT_USERS = False
 
@@ -297,6 +304,46 @@ class CheckPermissionTestCase(TestCase):
         ))
 
 
+@override_settings(OAUTH_USER_CACHE_SIZE=10, USE_DEVELOPMENT_USERS=False)
+class CachedUserTestCase(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        OAuthUser.objects.create(access_token='correct-token',
+                                 uid='my-uid',
+                                 email='joe@example.com',
+                                 permissions=['signin'],
+                                 expires_at=datetime.now() + timedelta(days=1))
+
+    def test_a_user_is_read_from_the_database_once(self):
+        _get_user('correct-token', anon_allowed=False)
+
+        with self.assertNumQueries(0):
+            user = _get_user('correct-token', anon_allowed=False)
+
+        assert_that(user['email'], equal_to('joe@example.com'))
+
+    def test_a_purged_user_is_read_from_the_database_again(self):
+        _get_user('correct-token', anon_allowed=False)
+        OAuthUser.objects.filter(uid='my-uid').update(
+            permissions=['signin', 'admin'])
+
+        user_cache.purge('my-uid')
+
+        with self.assertNumQueries(1):
+            user = _get_user('correct-token', anon_allowed=False)
+        assert_that(user['permissions'], equal_to(['signin', 'admin']))
+
+    def test_purging_another_user_keeps_the_cached_one(self):
+        _get_user('correct-token', anon_allowed=False)
+
+        user_cache.purge('another-uid')
+
+        with self.assertNumQueries(0):
+            _get_user('correct-token', anon_allowed=False)
+
+
 class AuthorizeTestCase(TestCase):
 
     def setUp(self):
@@ -338,3 +385,31 @@ class AuthorizeTestCase(TestCase):
                 request, set(['super-high-level-permission']))
             assert_that(err.status_code, is_(403))
             assert_that(user['uid'], is_('a-long-uid'))
+
+    @patch('stagecraft.libs.authorization.http.get_http_client')
+    def test_authorize_when_signon_times_out(self, get_http_client):
+        settings.USE_DEVELOPMENT_USERS = False
+        user_cache.clear()
+        get_http_client.return_value.get.side_effect = \
+            requests.exceptions.ReadTimeout('too slow')
+
+        request = HttpRequest()
+        request.META['HTTP_AUTHORIZATION'] = 'Bearer uncached-token'
+
+        user, err = authorize(request, set(['signin']))
+        assert_that(err.status_code, is_(503))
+        assert_that(user, is_(None))
+
+    @patch('stagecraft.libs.authorization.http.get_http_client')
+    def test_authorize_when_the_signon_circuit_is_open(
+            self, get_http_client):
+        settings.USE_DEVELOPMENT_USERS = False
+        user_cache.clear()
+        get_http_client.return_value.get.side_effect = \
+            CircuitOpenError('signon')
+
+        request = HttpRequest()
+        request.META['HTTP_AUTHORIZATION'] = 'Bearer uncached-token'
+
+        user, err = authorize(request, set(['signin']))
+        assert_that(err.status_code, is_(503))
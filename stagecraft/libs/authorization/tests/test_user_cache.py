@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from hamcrest import assert_that, equal_to, none
+from mock import Mock, patch
+
+from stagecraft.libs.authorization.user_cache import (
+    UserCache, PURGE_CHANNEL)
+
+
+def make_user(uid):
+    return {'uid': uid, 'email': 'foo@foo.com', 'permissions': ['signin']}
+
+
+@override_settings(OAUTH_USER_CACHE_SIZE=2, OAUTH_USER_CACHE_TTL=60)
+@patch('stagecraft.libs.authorization.user_cache.get_redis_client',
+       return_value=None)
+class UserCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = UserCache()
+        self.expires_at = timezone.now() + timedelta(minutes=15)
+
+    def test_returns_cached_user(self, redis_patch):
+        self.cache.set('a-token', make_user('a-uid'), self.expires_at)
+
+        assert_that(self.cache.get('a-token'), equal_to(make_user('a-uid')))
+        assert_that(self.cache.get('another-token'), none())
+
+    def test_entries_do_not_outlive_the_token(self, redis_patch):
+        expires_at = timezone.now() - timedelta(seconds=1)
+        self.cache.set('a-token', make_user('a-uid'), expires_at)
+
+        assert_that(self.cache.get('a-token'), none())
+
+    def test_least_recently_used_entry_is_evicted(self, redis_patch):
+        self.cache.set('a-token', make_user('a-uid'), self.expires_at)
+        self.cache.set('b-token', make_user('b-uid'), self.expires_at)
+        self.cache.get('a-token')
+        self.cache.set('c-token', make_user('c-uid'), self.expires_at)
+
+        assert_that(self.cache.get('b-token'), none())
+        assert_that(self.cache.get('a-token')['uid'], equal_to('a-uid'))
+        assert_that(self.cache.get('c-token')['uid'], equal_to('c-uid'))
+
+    @override_settings(OAUTH_USER_CACHE_SIZE=0)
+    def test_disabled_when_size_is_zero(self, redis_patch):
+        self.cache.set('a-token', make_user('a-uid'), self.expires_at)
+
+        assert_that(self.cache.get('a-token'), none())
+
+    def test_purge_drops_every_token_for_the_user(self, redis_patch):
+        self.cache.set('a-token', make_user('a-uid'), self.expires_at)
+        self.cache.set('b-token', make_user('a-uid'), self.expires_at)
+
+        self.cache.purge('a-uid')
+
+        assert_that(self.cache.get('a-token'), none())
+        assert_that(self.cache.get('b-token'), none())
+
+    def test_purge_is_published_to_other_processes(self, redis_patch):
+        client = redis_patch.return_value = Mock()
+
+        self.cache.purge('a-uid')
+
+        client.publish.assert_called_once_with(PURGE_CHANNEL, 'a-uid')
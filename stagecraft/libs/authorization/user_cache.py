@@ -0,0 +1,129 @@
+"""
+Per-process cache of users looked up by OAuth bearer token.
+
+Entries live for at most ``OAUTH_USER_CACHE_TTL`` seconds and never past the
+token's own expiry. Purging a user publishes their uid on a Redis channel so
+that every worker process drops them, not just the one handling the purge.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from django_statsd.clients import statsd
+
+from stagecraft.libs.redis_client import get_redis_client, RedisError
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHANNEL = 'stagecraft:oauth_user:purge'
+
+
+class UserCache(object):
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._subscriber_pid = None
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'OAUTH_USER_CACHE_SIZE', 0)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'OAUTH_USER_CACHE_TTL', 60)
+
+    def get(self, access_token):
+        if self.max_size <= 0:
+            return None
+        self._ensure_subscribed()
+
+        with self._lock:
+            entry = self._entries.pop(access_token, None)
+            if entry is None:
+                return None
+            user, deadline = entry
+            if deadline < time.time():
+                return None
+            # re-insert to mark as most recently used
+            self._entries[access_token] = entry
+            return user
+
+    def set(self, access_token, user, expires_at):
+        if self.max_size <= 0:
+            return
+        remaining = (expires_at - timezone.now()).total_seconds()
+        deadline = time.time() + min(self.ttl, remaining)
+
+        with self._lock:
+            self._entries.pop(access_token, None)
+            self._entries[access_token] = (user, deadline)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def purge(self, uid):
+        """Drop a user from this process and tell every other one to."""
+        self.purge_local(uid)
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            client.publish(PURGE_CHANNEL, uid)
+        except RedisError as e:
+            statsd.incr('oauth_user_cache.publish_error')
+            logger.error('could not publish user purge: {}'.format(e))
+
+    def purge_local(self, uid):
+        with self._lock:
+            tokens = [token for token, (user, _) in self._entries.items()
+                      if user['uid'] == uid]
+            for token in tokens:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _ensure_subscribed(self):
+        # Checked against the pid so that each forked worker starts its own
+        # listener rather than inheriting a dead thread from the master.
+        pid = os.getpid()
+        if self._subscriber_pid == pid:
+            return
+        client = get_redis_client()
+        if client is None:
+            return
+        with self._lock:
+            if self._subscriber_pid == pid:
+                return
+            self._subscriber_pid = pid
+        thread = threading.Thread(target=self._listen, args=(client,))
+        thread.daemon = True
+        thread.start()
+
+    def _listen(self, client):
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(PURGE_CHANNEL)
+                for message in pubsub.listen():
+                    uid = message['data']
+                    if isinstance(uid, bytes):
+                        uid = uid.decode('utf-8')
+                    self.purge_local(uid)
+            except RedisError as e:
+                # Purges may have been missed while disconnected.
+                self.clear()
+                statsd.incr('oauth_user_cache.subscribe_error')
+                logger.warning(
+                    'lost user purge subscription: {}'.format(e))
+                time.sleep(5)
+
+
+user_cache = UserCache()
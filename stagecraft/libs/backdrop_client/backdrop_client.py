@@ -9,6 +9,8 @@ from contextlib import contextmanager
 
 from django.conf import settings
 
+from stagecraft.libs.http_client import get_http_client
+
 logger = logging.getLogger(__name__)
 
 _DISABLED = False
@@ -110,7 +112,7 @@ def delete_data_set(name):
     endpoint_url = '{url}/data-sets/{name}'.format(
         url=settings.BACKDROP_WRITE_URL, name=name)
 
-    backdrop_request = lambda: requests.delete(
+    backdrop_request = lambda: get_http_client('backdrop').delete(
         endpoint_url,
         headers=_get_headers())
 
@@ -120,7 +122,8 @@ def delete_data_set(name):
 def _send_backdrop_request(backdrop_request):
     try:
         response = backdrop_request()
-    except requests.exceptions.ConnectionError as e:
+    except (requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout) as e:
         raise BackdropConnectionError(e)
 
     try:
@@ -0,0 +1,26 @@
+from django.test import TestCase
+from hamcrest import assert_that, calling, raises
+from mock import patch
+import requests
+
+from stagecraft.libs.backdrop_client import (
+    BackdropConnectionError, delete_data_set)
+from stagecraft.libs.http_client import CircuitOpenError
+
+
+@patch('stagecraft.libs.backdrop_client.backdrop_client.get_http_client')
+class SendBackdropRequestTestCase(TestCase):
+
+    def test_a_timeout_is_a_connection_error(self, get_http_client):
+        get_http_client.return_value.delete.side_effect = \
+            requests.exceptions.ReadTimeout('too slow')
+
+        assert_that(calling(delete_data_set).with_args('a-data-set'),
+                    raises(BackdropConnectionError))
+
+    def test_an_open_circuit_is_a_connection_error(self, get_http_client):
+        get_http_client.return_value.delete.side_effect = \
+            CircuitOpenError('backdrop')
+
+        assert_that(calling(delete_data_set).with_args('a-data-set'),
+                    raises(BackdropConnectionError))
@@ -0,0 +1 @@
+from .bulk_update import *
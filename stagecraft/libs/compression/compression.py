@@ -0,0 +1,85 @@
+"""
+Content-coding negotiation and compression of response bodies.
+
+Brotli is offered when the ``brotli`` package is installed; gzip always is.
+"""
+from __future__ import unicode_literals
+
+import re
+
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+__all__ = ['ENCODINGS', 'compress', 'compress_stream', 'negotiate_encoding',
+           'encoded_response']
+
+# In order of preference
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Brotli's default of 11 is too slow to run on every response
+BROTLI_QUALITY = 5
+
+
+def compress(content, encoding):
+    content = force_bytes(content)
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return compress_string(content)
+    raise ValueError('Unsupported content coding: {}'.format(encoding))
+
+
+def compress_stream(sequence):
+    """Gzip an iterable of byte strings as it is consumed."""
+    return compress_sequence(force_bytes(chunk) for chunk in sequence)
+
+
+def negotiate_encoding(request, encodings=ENCODINGS):
+    """
+    The most preferred of ``encodings`` that the request's Accept-Encoding
+    header allows, or None if the body should be sent as it is.
+    """
+    accepted = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        params = coding.split(';')
+        name = params[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params[1:]:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encoded_response(response, encoding):
+    """
+    Label ``response``, whose content is already compressed with
+    ``encoding``, so that clients and caches treat it as such.
+    """
+    response['Content-Encoding'] = encoding
+    if not response.streaming:
+        response['Content-Length'] = str(len(response.content))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    # The compressed bytes differ from those the strong ETag was made for,
+    # but they still represent the same content.
+    if response.has_header('ETag'):
+        response['ETag'] = re.sub(r'^(?!W/)', 'W/', response['ETag'])
+    return response
@@ -0,0 +1,47 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django_statsd.clients import statsd
+
+from .compression import (
+    compress, compress_stream, encoded_response, negotiate_encoding)
+
+
+class CompressionMiddleware(object):
+    """
+    Compresses response bodies of at least ``COMPRESSION_MIN_SIZE`` bytes
+    with the best content coding the client accepts. Streamed bodies are
+    gzipped as they are written. Responses a view has already encoded, such
+    as cached spotlight JSON, pass through unchanged.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+
+        if response.streaming:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            if negotiate_encoding(request, encodings=('gzip',)) is None:
+                return response
+            response.streaming_content = compress_stream(
+                response.streaming_content)
+            del response['Content-Length']
+            statsd.incr('compression.gzip')
+            return encoded_response(response, 'gzip')
+
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request)
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        statsd.incr('compression.{}'.format(encoding))
+        return encoded_response(response, encoding)
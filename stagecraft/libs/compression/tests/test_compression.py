@@ -0,0 +1,103 @@
+from __future__ import unicode_literals
+
+import gzip
+from io import BytesIO
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from hamcrest import assert_that, equal_to, is_, none
+
+from stagecraft.libs.compression.compression import negotiate_encoding
+from stagecraft.libs.compression.middleware import CompressionMiddleware
+
+
+def request(accept_encoding=None):
+    if accept_encoding is None:
+        return RequestFactory().get('/')
+    return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+
+def gunzip(content):
+    return gzip.GzipFile(fileobj=BytesIO(content)).read()
+
+
+BODY = b'{"data": "' + b'a' * 2000 + b'"}'
+
+
+class NegotiateEncodingTestCase(TestCase):
+
+    def test_nothing_is_chosen_without_accept_encoding(self):
+        assert_that(negotiate_encoding(request()), is_(none()))
+
+    def test_picks_the_preferred_accepted_coding(self):
+        assert_that(
+            negotiate_encoding(request('gzip, br'), encodings=('br', 'gzip')),
+            equal_to('br'))
+
+    def test_honours_quality_values(self):
+        assert_that(
+            negotiate_encoding(request('br;q=0.5, gzip'),
+                               encodings=('br', 'gzip')),
+            equal_to('gzip'))
+        assert_that(
+            negotiate_encoding(request('gzip;q=0, deflate')),
+            is_(none()))
+
+    def test_wildcard_accepts_any_unlisted_coding(self):
+        assert_that(
+            negotiate_encoding(request('br;q=0, *'),
+                               encodings=('br', 'gzip')),
+            equal_to('gzip'))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTestCase(TestCase):
+
+    def process(self, response, accept_encoding='gzip'):
+        return CompressionMiddleware().process_response(
+            request(accept_encoding), response)
+
+    def test_compresses_large_bodies(self):
+        response = self.process(HttpResponse(BODY))
+
+        assert_that(response['Content-Encoding'], equal_to('gzip'))
+        assert_that(response['Vary'], equal_to('Accept-Encoding'))
+        assert_that(gunzip(response.content), equal_to(BODY))
+        assert_that(int(response['Content-Length']),
+                    equal_to(len(response.content)))
+
+    def test_leaves_small_bodies_alone(self):
+        response = self.process(HttpResponse(b'{}'))
+
+        assert_that(response.has_header('Content-Encoding'), is_(False))
+        assert_that(response.content, equal_to(b'{}'))
+
+    def test_leaves_bodies_alone_when_no_coding_is_accepted(self):
+        response = self.process(HttpResponse(BODY), accept_encoding=None)
+
+        assert_that(response.has_header('Content-Encoding'), is_(False))
+        assert_that(response['Vary'], equal_to('Accept-Encoding'))
+
+    def test_does_not_recompress_encoded_responses(self):
+        response = HttpResponse(b'already compressed' * 100)
+        response['Content-Encoding'] = 'gzip'
+
+        response = self.process(response)
+
+        assert_that(response.content, equal_to(b'already compressed' * 100))
+
+    def test_weakens_the_etag_of_compressed_responses(self):
+        response = HttpResponse(BODY)
+        response['ETag'] = '"abc"'
+
+        response = self.process(response)
+
+        assert_that(response['ETag'], equal_to('W/"abc"'))
+
+    def test_gzips_streamed_bodies(self):
+        response = self.process(StreamingHttpResponse([BODY[:10], BODY[10:]]))
+
+        assert_that(response['Content-Encoding'], equal_to('gzip'))
+        assert_that(gunzip(b''.join(response.streaming_content)),
+                    equal_to(BODY))
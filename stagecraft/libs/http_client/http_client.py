@@ -0,0 +1,179 @@
+"""
+Shared outbound HTTP layer for the services Stagecraft talks to.
+
+Each named client keeps a pooled ``requests.Session`` (so connections and
+TLS sessions are reused between requests), applies a timeout and bounded
+retries with backoff, and stops calling a host that keeps failing until it
+has had time to recover. Per-client settings come from
+``settings.HTTP_CLIENTS``, falling back to ``HTTP_CLIENT_DEFAULTS``.
+"""
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django_statsd.clients import statsd
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['get_http_client', 'HttpClient', 'CircuitOpenError']
+
+HTTP_CLIENT_DEFAULTS = {
+    'timeout': 10,
+    'retries': 2,
+    'backoff_factor': 0.2,
+    'pool_maxsize': 10,
+    'failure_threshold': 5,
+    'reset_timeout': 30,
+}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without making a request while a client's circuit is open."""
+
+    def __init__(self, client_name, *args, **kwargs):
+        self.client_name = client_name
+        super(CircuitOpenError, self).__init__(*args, **kwargs)
+
+    def __str__(self):
+        return 'Circuit open, not calling {}: {}'.format(
+            self.client_name, super(CircuitOpenError, self).__str__())
+
+
+class CircuitBreaker(object):
+    """
+    Counts consecutive failures. Once ``failure_threshold`` is reached calls
+    are refused for ``reset_timeout`` seconds, after which a single trial
+    call is let through to decide whether to close the circuit again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.time() - self._opened_at >= self.reset_timeout:
+                # half open: let this one through and wait for its result
+                self._opened_at = time.time()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.time()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+
+class HttpClient(object):
+
+    def __init__(self, name, timeout, retries, backoff_factor,
+                 pool_maxsize, failure_threshold, reset_timeout):
+        self.name = name
+        self.timeout = timeout
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold, reset_timeout)
+
+        self.adapter = HTTPAdapter(
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False,
+            ))
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def request(self, method, url, **kwargs):
+        if not self.circuit_breaker.allow_request():
+            statsd.incr('http_client.{}.circuit_open'.format(self.name))
+            raise CircuitOpenError(self.name, url)
+
+        kwargs.setdefault('timeout', self.timeout)
+        self._report_pool_usage(url)
+
+        try:
+            with statsd.timer('http_client.{}.request'.format(self.name)):
+                response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self._record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        statsd.incr('http_client.{}.status.{}'.format(
+            self.name, response.status_code))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def _record_failure(self):
+        statsd.incr('http_client.{}.failure'.format(self.name))
+        self.circuit_breaker.record_failure()
+        if self.circuit_breaker.is_open:
+            logger.warning('circuit open for {}'.format(self.name))
+
+    def _report_pool_usage(self, url):
+        try:
+            pool = self.adapter.poolmanager.connection_from_url(url)
+        except Exception:
+            return
+        if pool.pool is None:
+            return
+        # The pool queue holds a slot for every connection not checked out,
+        # so an empty queue means this request will need an extra connection
+        # that is thrown away afterwards.
+        available = pool.pool.qsize()
+        statsd.gauge(
+            'http_client.{}.pool.available'.format(self.name), available)
+        if available == 0:
+            statsd.incr('http_client.{}.pool.exhausted'.format(self.name))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(name):
+    """
+    Return the process-wide client called ``name``, creating it from
+    settings on first use.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                config = dict(HTTP_CLIENT_DEFAULTS)
+                config.update(
+                    getattr(settings, 'HTTP_CLIENTS', {}).get(name, {}))
+                client = _clients[name] = HttpClient(name, **config)
+    return client
@@ -0,0 +1,70 @@
+from django.test import TestCase
+from hamcrest import assert_that, calling, equal_to, raises
+from httmock import HTTMock, urlmatch
+
+from stagecraft.libs.http_client.http_client import (
+    CircuitBreaker, CircuitOpenError, HttpClient)
+
+
+def make_client():
+    return HttpClient('test', timeout=1, retries=0, backoff_factor=0,
+                      pool_maxsize=1, failure_threshold=2, reset_timeout=60)
+
+
+@urlmatch(netloc=r'.*broken.*')
+def broken(url, request):
+    return {'status_code': 503, 'content': ''}
+
+
+@urlmatch(netloc=r'.*working.*')
+def working(url, request):
+    return {'status_code': 200, 'content': '{}'}
+
+
+class CircuitBreakerTestCase(TestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+        breaker.record_failure()
+        assert_that(breaker.allow_request(), equal_to(True))
+        breaker.record_failure()
+        assert_that(breaker.allow_request(), equal_to(False))
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert_that(breaker.allow_request(), equal_to(True))
+
+    def test_lets_a_trial_request_through_after_reset_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+
+        breaker.record_failure()
+
+        assert_that(breaker.allow_request(), equal_to(True))
+
+
+class HttpClientTestCase(TestCase):
+
+    def test_returns_response(self):
+        client = make_client()
+
+        with HTTMock(working):
+            response = client.get('http://working.example.com/')
+
+        assert_that(response.status_code, equal_to(200))
+
+    def test_fails_fast_once_a_host_keeps_failing(self):
+        client = make_client()
+
+        with HTTMock(broken):
+            client.get('http://broken.example.com/')
+            client.get('http://broken.example.com/')
+
+            assert_that(
+                calling(client.get).with_args('http://broken.example.com/'),
+                raises(CircuitOpenError))
@@ -0,0 +1,41 @@
+from __future__ import unicode_literals
+
+import logging
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['get_redis_client', 'reset_redis_client', 'RedisError']
+
+RedisError = redis.RedisError
+
+_client = None
+
+
+def get_redis_client():
+    """
+    Return a shared Redis client for the instance configured in
+    ``settings.REDIS_URL``, or None if Redis is not configured.
+
+    Callers should treat Redis as optional and carry on without it if this
+    returns None or a command raises ``RedisError``.
+    """
+    global _client
+    if _client is None:
+        url = getattr(settings, 'REDIS_URL', None)
+        if not url:
+            return None
+        _client = redis.StrictRedis.from_url(
+            url, **getattr(settings, 'BROKER_USE_SSL', {}))
+    return _client
+
+
+def reset_redis_client():
+    """
+    Drop the shared client so that the next call to get_redis_client()
+    reads the settings again. Mainly useful in tests.
+    """
+    global _client
+    _client = None
@@ -1,9 +1,12 @@
 import logging
-logger = logging.getLogger(__name__)
+import threading
+import time
 
 from django.conf import settings
 from json import loads as json_loads
-from os import path, listdir
+from os import path, listdir, stat
+
+logger = logging.getLogger(__name__)
 
 SCHEMA_PATH = 'stagecraft/apps/datasets/schemas/'
 schema_root = path.join(
@@ -28,24 +31,87 @@ def load_json_schema(schema_path):
         return json_loads(schema_file.read())
 
 
-def get_schema(data_group, data_type):
-    schema = {
-        "description": "Schema for {}/{}".format(data_group, data_type),
-        "definitions": {
-            "_timestamp": load_json_schema('timestamp.json'),
-        },
-        "allOf": [{"$ref": "#/definitions/_timestamp"}]
-    }
-
-    if data_type in get_defined_schemas('data-types'):
-        try:
-            schema['definitions'][data_type] = load_json_schema(
-                'data-types/' + data_type)
+class SchemaRegistry(object):
+    """
+    The data-type schemas, read from disk once and shared between every
+    caller. The schemas returned are shared objects and must not be
+    modified.
+
+    With ``reload_on_change`` the schema files are checked for changes at
+    most once a second and reread if any have been edited, added or removed.
+    """
+
+    def __init__(self, root, reload_on_change=False):
+        self.root = root
+        self.reload_on_change = reload_on_change
+        self._lock = threading.Lock()
+        self._checked_at = 0
+        self.load()
+
+    def load(self):
+        timestamp = load_json_schema('timestamp.json')
+
+        data_types = {}
+        for data_type in get_defined_schemas('data-types'):
+            try:
+                data_types[data_type] = load_json_schema(
+                    'data-types/' + data_type)
+            except IOError as e:
+                logger.exception(e)
+
+        with self._lock:
+            self._timestamp = timestamp
+            self._data_types = data_types
+            self._schemas = {}
+            self._signature = self._files_signature()
+
+    def get_schema(self, data_group, data_type):
+        if self.reload_on_change:
+            self._reload_if_changed()
 
+        key = (data_group, data_type)
+        schema = self._schemas.get(key)
+        if schema is None:
+            schema = self._schemas[key] = self._build(data_group, data_type)
+        return schema
+
+    def _build(self, data_group, data_type):
+        schema = {
+            "description": "Schema for {}/{}".format(data_group, data_type),
+            "definitions": {
+                "_timestamp": self._timestamp,
+            },
+            "allOf": [{"$ref": "#/definitions/_timestamp"}]
+        }
+
+        if data_type in self._data_types:
+            schema['definitions'][data_type] = self._data_types[data_type]
             schema["allOf"].append(
                 {"$ref": "#/definitions/{}".format(data_type)}
             )
-        except IOError as e:
-            logger.exception(e)
 
-    return schema
+        return schema
+
+    def _files_signature(self):
+        files = [path.join(self.root, 'timestamp.json')] + [
+            path.join(self.root, 'data-types', name)
+            for name in sorted(listdir(path.join(self.root, 'data-types')))]
+        return tuple((f, stat(f).st_mtime) for f in files)
+
+    def _reload_if_changed(self):
+        now = time.time()
+        if now - self._checked_at < 1:
+            return
+        self._checked_at = now
+        if self._files_signature() != self._signature:
+            logger.info('schema files changed, reloading')
+            self.load()
+
+
+registry = SchemaRegistry(
+    schema_root,
+    reload_on_change=getattr(settings, 'SCHEMAS_RELOAD_ON_CHANGE', False))
+
+
+def get_schema(data_group, data_type):
+    return registry.get_schema(data_group, data_type)
@@ -1,3 +1,4 @@
+import mock
 from jsonschema.validators import validator_for
 
 from stagecraft.libs.schemas.schemas import get_defined_schemas, get_schema
@@ -11,3 +12,21 @@ def test_data_type_schemas_are_valid():
 def check_data_type_schema_is_valid(data_type):
     schema = get_schema('example', data_type)
     validator_for(schema).check_schema(schema)
+
+
+def test_get_schema_shares_loaded_schemas():
+    first = get_schema('example', 'realtime')
+    second = get_schema('other-example', 'realtime')
+
+    assert first['definitions']['realtime'] is \
+        second['definitions']['realtime']
+    assert get_schema('example', 'realtime') is first
+
+
+def test_get_schema_does_not_read_the_disk_once_loaded():
+    with mock.patch('stagecraft.libs.schemas.schemas.open',
+                    create=True) as open_:
+        get_schema('example', 'no-show')
+        get_schema('example', 'not-a-data-type')
+
+    assert not open_.called
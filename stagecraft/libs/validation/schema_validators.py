@@ -0,0 +1,91 @@
+"""
+Registry of compiled JSON Schema validators.
+
+``jsonschema.validate`` checks the schema against its meta-schema and builds
+a new validator on every call. Here each schema is checked and compiled once
+per process, keyed by a hash of its content, so that validating an instance
+costs only the instance check. Schemas stored on models are registered with
+``evict_on_change`` so that an edited schema's old validator is dropped.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+from django.db.models.signals import pre_save
+from jsonschema.validators import validator_for
+
+MAX_VALIDATORS = 500
+
+_validators = OrderedDict()
+_lock = threading.Lock()
+
+
+def _key(schema, format_checker):
+    content = json.dumps(schema, sort_keys=True, separators=(',', ':'))
+    return (hashlib.sha1(content.encode('utf-8')).hexdigest(),
+            id(format_checker) if format_checker is not None else None)
+
+
+def get_validator(schema, format_checker=None):
+    """
+    Return a validator for ``schema``, raising ``jsonschema.SchemaError``
+    if the schema itself is invalid.
+    """
+    key = _key(schema, format_checker)
+    with _lock:
+        validator = _validators.pop(key, None)
+        if validator is not None:
+            _validators[key] = validator
+            return validator
+
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    validator = cls(schema, format_checker=format_checker)
+
+    with _lock:
+        _validators[key] = validator
+        while len(_validators) > MAX_VALIDATORS:
+            _validators.popitem(last=False)
+    return validator
+
+
+def validate(instance, schema, format_checker=None):
+    """A drop-in for ``jsonschema.validate`` using the registry."""
+    get_validator(schema, format_checker).validate(instance)
+
+
+def evict(schema):
+    """Forget every validator compiled from ``schema``."""
+    digest = _key(schema, None)[0]
+    with _lock:
+        for key in [k for k in _validators if k[0] == digest]:
+            del _validators[key]
+
+
+def clear():
+    with _lock:
+        _validators.clear()
+
+
+def evict_on_change(model, *fields):
+    """
+    Evict the validators for the previous values of ``fields`` whenever
+    an instance of ``model`` is saved with any of them changed.
+    """
+    def schema_changing(sender, instance, raw=False, **kwargs):
+        if raw or instance._state.adding:
+            return
+        previous = model._default_manager.filter(
+            pk=instance.pk).values(*fields).first()
+        if previous is None:
+            return
+        for field in fields:
+            if previous[field] != getattr(instance, field):
+                evict(previous[field])
+
+    pre_save.connect(schema_changing, sender=model, weak=False,
+                     dispatch_uid='evict_schema_validators_{}'.format(
+                         model._meta.label))
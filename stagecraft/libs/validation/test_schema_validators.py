@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from hamcrest import assert_that, calling, is_, is_not, raises
+from jsonschema import SchemaError, ValidationError
+
+from stagecraft.apps.dashboards.tests.factories.factories import (
+    ModuleTypeFactory)
+from stagecraft.libs.validation import schema_validators
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {'name': {'type': 'string'}},
+}
+
+
+class SchemaValidatorsTestCase(TestCase):
+
+    def setUp(self):
+        schema_validators.clear()
+
+    def test_validator_is_compiled_once_per_schema_content(self):
+        validator = schema_validators.get_validator(SCHEMA)
+
+        assert_that(
+            schema_validators.get_validator(dict(SCHEMA)), is_(validator))
+        assert_that(
+            schema_validators.get_validator({'type': 'array'}),
+            is_not(validator))
+
+    def test_validate_raises_like_jsonschema(self):
+        assert_that(
+            calling(schema_validators.validate).with_args(
+                {'name': 1}, SCHEMA),
+            raises(ValidationError))
+        assert_that(
+            calling(schema_validators.validate).with_args(
+                {}, {'type': 'not-a-type'}),
+            raises(SchemaError))
+
+    def test_editing_a_stored_schema_evicts_its_validator(self):
+        module_type = ModuleTypeFactory(schema=SCHEMA)
+        validator = schema_validators.get_validator(SCHEMA)
+
+        module_type.schema = {'type': 'object'}
+        module_type.save()
+
+        assert_that(
+            schema_validators.get_validator(SCHEMA), is_not(validator))
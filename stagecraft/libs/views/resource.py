@@ -1,30 +1,36 @@
+import base64
 import json
 from django.views.decorators.cache import never_cache
 from django.views.decorators.vary import vary_on_headers
-import jsonschema
 import logging
 import re
 from stagecraft.apps.users.models import User
 from stagecraft.libs.authorization.http import authorize, \
     _get_resource_role_permissions
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
 from django.conf.urls import url
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 from django.views.decorators.csrf import csrf_exempt
 
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
 
 from django.db import DataError, IntegrityError, OperationalError
+from django.db.models.query import QuerySet
 
 from jsonschema import FormatChecker
 from jsonschema.compat import str_types
 from jsonschema.exceptions import ValidationError
-from stagecraft.libs.views.utils import create_http_error
+from stagecraft.libs.validation import schema_validators
+from stagecraft.libs.views.utils import (
+    create_http_error, JsonEncoder, to_compact_json, wants_compact_json)
 
 from .transaction import atomic_view
-from django.db.models import Q
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.constants import LOOKUP_SEP
 
 
 logger = logging.getLogger(__name__)
@@ -50,6 +56,22 @@ def resource_re_string(ident, cls):
         ident, id_matcher)
 
 
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(
+        json.dumps(key, cls=JsonEncoder).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(
+            base64.urlsafe_b64decode(str(cursor)).decode('utf-8'))
+    except (TypeError, ValueError):
+        raise ValueError('invalid cursor')
+    if not isinstance(key, list):
+        raise ValueError('invalid cursor')
+    return key
+
+
 @FORMAT_CHECKER.checks('uuid')
 def is_uuid(instance):
     return isinstance(instance, str_types) and \
@@ -62,6 +84,7 @@ class ResourceView(View):
         if self.model:
             self.permissions = _get_resource_role_permissions(
                 self.model.__name__)
+            self._order_path()
         else:
             self.permissions = {
                 'get': None,
@@ -80,7 +103,28 @@ class ResourceView(View):
     sub_resources = {}
     list_filters = {}
     any_of_multiple_values_filter = {}
+    # A field, or a path through forward relations to one, optionally
+    # prefixed with '-'. Paginated listings put NULLs last either way.
     order_by = 'pk'
+    # Largest page a list request can ask for with ?limit=
+    max_page_size = 1000
+    # Fields that must never be returned through ?fields=
+    private_fields = set()
+    # Write unpaginated listings out a chunk at a time rather than building
+    # the whole body in memory (see STREAM_LIST_RESPONSES)
+    stream_list = False
+    # Relations read by serialize(), loaded along with the rows rather than
+    # one query per row: {'select_related': [...], 'prefetch_related': [...]}.
+    # 'prepare' may name a function that is given the fetched objects, for
+    # relations prefetch_related can not express, such as whole trees.
+    list_plan = {}
+    # As list_plan, for single objects. Defaults to list_plan.
+    detail_plan = None
+    # Path from the model to the users who own it
+    owners_lookup = 'owners'
+    # Whether to encode responses without whitespace by default. Requests can
+    # ask for either form through the Accept header (see wants_compact_json).
+    compact_json = False
 
     def list(self, request, **kwargs):
         user = kwargs.get('user', None)
@@ -133,11 +177,27 @@ class ResourceView(View):
         else:
             return query_set
 
+    @staticmethod
+    def apply_plan(query_set, plan):
+        if plan.get('select_related'):
+            query_set = query_set.select_related(*plan['select_related'])
+        if plan.get('prefetch_related'):
+            query_set = query_set.prefetch_related(*plan['prefetch_related'])
+        return query_set
+
     def by_id(self, request, id_field, id, user=None):
         get_args = {id_field: id}
+        plan = self.detail_plan if self.detail_plan is not None \
+            else self.list_plan
 
         try:
-            model = self.model.objects.get(**get_args)
+            query_set = self.apply_plan(self.model.objects.all(), plan)
+            if user:
+                query_set = with_user_is_owner(
+                    query_set, user, self.owners_lookup)
+            model = query_set.get(**get_args)
+            if plan.get('prepare'):
+                plan['prepare']([model])
             if user and user_missing_model_permission(user, model):
                 logger.warn("Unauthorized access to '{}' by '{}'".format(
                     id, user['email']))
@@ -153,7 +213,7 @@ class ResourceView(View):
         pass
 
     @method_decorator(never_cache)
-    @method_decorator(vary_on_headers('Authorization'))
+    @method_decorator(vary_on_headers('Authorization', 'Accept'))
     def get(self, request, **kwargs):
         user, err = self._authorize(request)
         if err:
@@ -169,9 +229,254 @@ class ResourceView(View):
             elif sub_resource is not None:
                 return self._get_sub_resource(request, sub_resource, model)
             else:
-                return self._response(model)
+                return self._response(model, request)
+        else:
+            return self._list_response(
+                request, self.list(request, user=user, **kwargs))
+
+    def _list_response(self, request, query_set):
+        """
+        Respond with a listing, applying the optional ?fields= projection
+        and ?limit=/?after= keyset pagination to any queryset.
+        """
+        if not isinstance(query_set, QuerySet):
+            return self._response(query_set, request)
+
+        fields, err = self._projected_fields(request)
+        if err:
+            return err
+
+        if fields is None:
+            query_set = self.apply_plan(query_set, self.list_plan)
+
+        page, limit, err = self._paginate(query_set, request)
+        if err:
+            return err
+
+        if fields is not None:
+            page = page.values(*(fields + self._cursor_fields()))
+
+        if limit is None and self._should_stream():
+            return self._streaming_response(request, page, fields)
+
+        rows = list(page)
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._cursor_for(rows[-1])
+
+        if fields is None and self.list_plan.get('prepare'):
+            self.list_plan['prepare'](rows)
+
+        if fields is not None:
+            response = HttpResponse(
+                self._encoder(request)(
+                    [self._project(row, fields) for row in rows]),
+                content_type='application/json'
+            )
         else:
-            return self._response(self.list(request, user=user, **kwargs))
+            response = self._response(rows, request)
+
+        if next_cursor is not None:
+            response['X-Next-Cursor'] = next_cursor
+
+        return response
+
+    def _should_stream(self):
+        # iterator() skips prefetch_related, and a list is prepared only once
+        # it has all been fetched, so neither kind of list is streamed
+        return (self.stream_list and
+                getattr(settings, 'STREAM_LIST_RESPONSES', False) and
+                hasattr(self.__class__, 'serialize') and
+                not self.list_plan.get('prefetch_related') and
+                not self.list_plan.get('prepare'))
+
+    def _streaming_response(self, request, query_set, fields):
+        if fields is not None:
+            def serialize(row):
+                return self._project(row, fields)
+        elif hasattr(self.__class__, 'serialize_for_list'):
+            serialize = self.__class__.serialize_for_list
+        else:
+            serialize = self.__class__.serialize
+        chunk_size = settings.STREAM_LIST_CHUNK_SIZE
+        encode = self._encoder(request)
+
+        def json_array():
+            yield '['
+            separator = ''
+            chunk = []
+            for row in query_set.iterator():
+                chunk.append(encode(serialize(row)))
+                if len(chunk) >= chunk_size:
+                    yield separator + ','.join(chunk)
+                    separator = ','
+                    chunk = []
+            if chunk:
+                yield separator + ','.join(chunk)
+            yield ']'
+
+        return StreamingHttpResponse(
+            json_array(), content_type='application/json')
+
+    def _encoder(self, request):
+        if wants_compact_json(request, default=self.compact_json):
+            return to_compact_json
+        return lambda obj: json.dumps(obj, cls=JsonEncoder)
+
+    @staticmethod
+    def _project(row, fields):
+        return {field: row[field] for field in fields}
+
+    def _projected_fields(self, request):
+        fields = request.GET.get('fields')
+        if not fields:
+            return None, None
+
+        fields = [field.strip() for field in fields.split(',')
+                  if field.strip()]
+        allowed = self.projectable_fields()
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            return None, create_http_error(
+                400, 'unknown fields: {}'.format(', '.join(unknown)),
+                request)
+
+        return fields, None
+
+    def projectable_fields(self):
+        names = set()
+        for field in self.model._meta.concrete_fields:
+            if field.name.startswith('_'):
+                continue
+            names.add(field.name)
+            names.add(field.attname)
+        return names - set(self.private_fields)
+
+    def _paginate(self, query_set, request):
+        limit = request.GET.get('limit')
+        after = request.GET.get('after')
+        if limit is None and after is None:
+            return query_set, None, None
+
+        try:
+            limit = int(limit) if limit is not None else self.max_page_size
+        except ValueError:
+            return None, None, create_http_error(
+                400, 'limit must be an integer', request)
+        if limit < 1:
+            return None, None, create_http_error(
+                400, 'limit must be greater than zero', request)
+        limit = min(limit, self.max_page_size)
+
+        descending = self.order_by.startswith('-')
+        order_field = self.order_by.lstrip('-')
+        pk_order = '-pk' if descending else 'pk'
+        if order_field == 'pk':
+            query_set = query_set.order_by(pk_order)
+        elif descending:
+            query_set = query_set.order_by(
+                F(order_field).desc(nulls_last=True), pk_order)
+        else:
+            query_set = query_set.order_by(
+                F(order_field).asc(nulls_last=True), pk_order)
+
+        if after is not None:
+            try:
+                query_set = query_set.filter(
+                    self._after_cursor(decode_cursor(after)))
+            except (ValueError, DjangoValidationError):
+                return None, None, create_http_error(
+                    400, 'invalid cursor', request)
+
+        return query_set[:limit + 1], limit, None
+
+    def _cursor_fields(self):
+        order_field = self.order_by.lstrip('-')
+        if order_field == 'pk':
+            return ['pk']
+        return [order_field, 'pk']
+
+    def _order_path(self):
+        """
+        The fields ``order_by`` passes through to the one rows are ordered
+        by. Only forward relations may be followed, as others would repeat
+        rows.
+        """
+        order_field = self.order_by.lstrip('-')
+        if order_field == 'pk':
+            return [self.model._meta.pk]
+
+        path = []
+        model = self.model
+        for name in order_field.split(LOOKUP_SEP):
+            try:
+                if model is None:
+                    raise FieldDoesNotExist(name)
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    '{}.order_by names no field: {}'.format(
+                        type(self).__name__, self.order_by))
+            if not field.concrete or field.many_to_many:
+                raise ImproperlyConfigured(
+                    '{}.order_by can only follow forward relations: '
+                    '{}'.format(type(self).__name__, self.order_by))
+            path.append(field)
+            model = field.related_model
+        return path
+
+    def _cursor_for(self, row):
+        if isinstance(row, dict):
+            return encode_cursor([row[f] for f in self._cursor_fields()])
+
+        key = []
+        for cursor_field in self._cursor_fields():
+            if cursor_field == 'pk':
+                key.append(row.pk)
+                continue
+            value = row
+            path = self._order_path()
+            # Follow the relations, stopping at the first that is unset
+            for field in path[:-1]:
+                value = getattr(value, field.name)
+                if value is None:
+                    break
+            else:
+                value = getattr(value, path[-1].attname)
+            key.append(value)
+        return encode_cursor(key)
+
+    def _after_cursor(self, key):
+        """
+        Build the filter selecting rows that sort after the cursor ``key``.
+        Key values are checked here so bad cursors fail before querying.
+        """
+        cursor_fields = self._cursor_fields()
+        if len(key) != len(cursor_fields):
+            raise ValueError('invalid cursor')
+
+        op = 'lt' if self.order_by.startswith('-') else 'gt'
+        pk = self.model._meta.pk.to_python(key[-1])
+        after_pk = Q(**{'pk__{}'.format(op): pk})
+        if len(cursor_fields) == 1:
+            return after_pk
+
+        order_field = cursor_fields[0]
+        path = self._order_path()
+        nullable = any(field.null for field in path)
+        # NULLs sort last, so come after every value and only each other
+        if key[0] is None:
+            if not nullable:
+                raise ValueError('invalid cursor')
+            return Q(**{'{}__isnull'.format(order_field): True}) & after_pk
+
+        value = path[-1].to_python(key[0])
+        after = Q(**{'{}__{}'.format(order_field, op): value}) | (
+            Q(**{order_field: value}) & after_pk)
+        if nullable:
+            after |= Q(**{'{}__isnull'.format(order_field): True})
+        return after
 
     def _find_id(self, args):
         for key, regex in self.id_fields.items():
@@ -260,7 +565,7 @@ class ResourceView(View):
             if err:
                 return err
 
-            return self._response(model)
+            return self._response(model, request)
 
     @method_decorator(never_cache)
     @method_decorator(atomic_view)
@@ -298,7 +603,7 @@ class ResourceView(View):
         if err:
             return err
 
-        return self._response(model)
+        return self._response(model, request)
 
     @method_decorator(never_cache)
     @method_decorator(atomic_view)
@@ -334,7 +639,7 @@ class ResourceView(View):
         except (OperationalError, IntegrityError) as err:
             return None, create_http_error(400, 'error deleting model: {}'
                                            .format())
-        return self._response(model)
+        return self._response(model, request)
 
     def _authorize(self, request):
         permission_required = self.permissions[request.method.lower()]
@@ -351,9 +656,8 @@ class ResourceView(View):
                                            .format(ValueError), request)
 
         try:
-            jsonschema.validate(
-                model_json, self.schema,
-                format_checker=FORMAT_CHECKER)
+            schema_validators.validate(
+                model_json, self.schema, format_checker=FORMAT_CHECKER)
         except ValidationError as err:
             message = 'options failed validation: {}'.format(err.message)
             return None, create_http_error(400, message, request)
@@ -379,7 +683,7 @@ class ResourceView(View):
                                      .format('\n'.join(messages)),
                                      request)
 
-    def _response(self, model):
+    def _response(self, model, request=None):
         if hasattr(self.__class__, 'serialize'):
             if hasattr(model, '__iter__'):
                 if hasattr(self.__class__, 'serialize_for_list'):
@@ -395,15 +699,35 @@ class ResourceView(View):
         # throw some kind of no serializer error
 
         return HttpResponse(
-            json.dumps(obj),
+            self._encoder(request)(obj),
             content_type='application/json'
         )
 
 
+def user_sees_all(user):
+    return ('admin' in user['permissions'] or
+            'omniscient' in user['permissions'])
+
+
+def with_user_is_owner(query_set, user, owners_lookup='owners'):
+    """
+    Annotate each row with ``user_is_owner`` so that fetching an object also
+    decides whether the user may see it, rather than costing a second query.
+    """
+    if user_sees_all(user) or not hasattr(query_set.model, 'owners'):
+        return query_set
+    owned = query_set.model.objects.filter(
+        pk=OuterRef('pk'),
+        **{'{}__email'.format(owners_lookup): user['email']})
+    return query_set.annotate(user_is_owner=Exists(owned.values('pk')))
+
+
 def user_missing_model_permission(user, model):
-    user_does_not_see_all = ('admin' not in user['permissions'] and
-                             'omniscient' not in user['permissions'])
-    user_is_not_assigned = hasattr(model, 'owners') and \
-        model.owners.filter(email=user['email']).count() == 0
+    if user_sees_all(user) or not hasattr(model, 'owners'):
+        return False
+
+    user_is_owner = getattr(model, 'user_is_owner', None)
+    if user_is_owner is None:
+        user_is_owner = model.owners.filter(email=user['email']).exists()
 
-    return user_does_not_see_all and user_is_not_assigned
+    return not user_is_owner
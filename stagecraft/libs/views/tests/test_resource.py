@@ -5,8 +5,13 @@ from hamcrest import (
     assert_that, is_, calling, raises, is_not,
     instance_of, starts_with, has_key, has_entry,
     contains, equal_to, contains_inanyorder)
-from django.http import HttpRequest, HttpResponse
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import override_settings
 from jsonschema import FormatError
+from mock import patch
 
 from stagecraft.apps.organisation.models import Node, NodeType
 from stagecraft.apps.collectors.models import Collector
@@ -15,6 +20,7 @@ from stagecraft.apps.collectors.tests.factories import(
 from stagecraft.apps.organisation.tests.factories import (
     NodeFactory, NodeTypeFactory
 )
+from stagecraft.apps.users.tests.factories import UserFactory
 from ..resource import (
     FORMAT_CHECKER, ResourceView, resource_re_string,
     UUID_RE_STRING)
@@ -179,6 +185,10 @@ TestResourceView.sub_resources = {
 }
 
 
+class TestResourceViewStreaming(TestResourceView):
+    stream_list = True
+
+
 class TestResourceViewMultipleIDs(ResourceView):
 
     model = Node
@@ -302,18 +312,126 @@ class ResourceViewTestCase(TestCase):
         NodeFactory(name='foo-node-1', slug='b')
         NodeFactory(name='foo-node-2', slug='a')
 
-        TestResourceView.order_by = 'name'
-        status_code, json_response = self.get()
+        with patch.object(TestResourceView, 'order_by', 'name'):
+            status_code, json_response = self.get()
 
         assert_that(status_code, is_(200))
         assert_that(json_response[0]['name'], is_('foo-node-1'))
 
-        TestResourceView.order_by = 'slug'
-        status_code, json_response = self.get()
+        with patch.object(TestResourceView, 'order_by', 'slug'):
+            status_code, json_response = self.get()
 
         assert_that(status_code, is_(200))
         assert_that(json_response[0]['name'], is_('foo-node-2'))
 
+    def get_response(self, query={}, cls=TestResourceView):
+        request = HttpRequest()
+        request.method = 'GET'
+        for (k, v) in query.items():
+            request.GET[k] = v
+
+        return cls().get(request)
+
+    @patch.object(TestResourceView, 'order_by', 'name')
+    def test_list_pages_with_limit_and_after(self):
+        for name in ['node-a', 'node-b', 'node-c']:
+            NodeFactory(name=name)
+
+        response = self.get_response(query={'limit': '2'})
+        first_page = json.loads(response.content)
+        assert_that([n['name'] for n in first_page],
+                    contains('node-a', 'node-b'))
+
+        response = self.get_response(query={
+            'limit': '2',
+            'after': response['X-Next-Cursor'],
+        })
+        second_page = json.loads(response.content)
+        assert_that([n['name'] for n in second_page], contains('node-c'))
+        assert_that(response.has_header('X-Next-Cursor'), is_(False))
+
+    def page_through(self, page_size=1):
+        names, query = [], {'limit': str(page_size)}
+        while True:
+            response = self.get_response(query=query)
+            names.extend(n['name'] for n in json.loads(response.content))
+            if not response.has_header('X-Next-Cursor'):
+                return names
+            query['after'] = response['X-Next-Cursor']
+
+    @patch.object(TestResourceView, 'order_by', 'typeOf__name')
+    def test_list_pages_ordered_across_a_relation(self):
+        for name, type_name in [('node-a', 'type-c'), ('node-b', 'type-a'),
+                                ('node-c', 'type-b')]:
+            NodeFactory(name=name, typeOf=NodeTypeFactory(name=type_name))
+
+        assert_that(self.page_through(),
+                    contains('node-b', 'node-c', 'node-a'))
+
+    def test_list_pages_put_null_order_values_last(self):
+        for name, abbreviation in [('node-a', 'b'), ('node-b', None),
+                                   ('node-c', 'a'), ('node-d', None)]:
+            NodeFactory(name=name, abbreviation=abbreviation)
+
+        with patch.object(TestResourceView, 'order_by', 'abbreviation'):
+            names = self.page_through()
+        assert_that(names[:2], contains('node-c', 'node-a'))
+        assert_that(names[2:], contains_inanyorder('node-b', 'node-d'))
+
+        with patch.object(TestResourceView, 'order_by', '-abbreviation'):
+            names = self.page_through()
+        assert_that(names[:2], contains('node-a', 'node-c'))
+        assert_that(names[2:], contains_inanyorder('node-b', 'node-d'))
+
+    def test_unsupported_order_by_is_rejected(self):
+        for order_by in ['no_such_field', 'typeOf__no_such_field',
+                         'parents__name', 'name__typeOf']:
+            with patch.object(TestResourceView, 'order_by', order_by):
+                assert_that(calling(TestResourceView),
+                            raises(ImproperlyConfigured))
+
+    def test_list_with_bad_limit_or_cursor(self):
+        NodeFactory()
+
+        status_code, _ = self.get(query={'limit': 'lots'})
+        assert_that(status_code, is_(400))
+
+        status_code, _ = self.get(query={'after': 'not-a-cursor'})
+        assert_that(status_code, is_(400))
+
+    def test_list_projects_fields(self):
+        node = NodeFactory(name='foo-node', slug='foo')
+
+        status_code, json_response = self.get(query={'fields': 'id,slug'})
+
+        assert_that(status_code, is_(200))
+        assert_that(json_response, contains(
+            equal_to({'id': str(node.id), 'slug': 'foo'})))
+
+    def test_list_rejects_unknown_fields(self):
+        status_code, _ = self.get(query={'fields': 'id,password'})
+
+        assert_that(status_code, is_(400))
+
+    @override_settings(STREAM_LIST_RESPONSES=True, STREAM_LIST_CHUNK_SIZE=2)
+    def test_list_streams_when_enabled(self):
+        for name in ['node-a', 'node-b', 'node-c']:
+            NodeFactory(name=name)
+
+        response = self.get_response(cls=TestResourceViewStreaming)
+
+        assert_that(response, instance_of(StreamingHttpResponse))
+        json_response = json.loads(b''.join(response.streaming_content))
+        assert_that(len(json_response), is_(3))
+        assert_that(json_response[0]['in_list'], is_(True))
+
+    @override_settings(STREAM_LIST_RESPONSES=True)
+    def test_list_streams_empty_list(self):
+        response = self.get_response(cls=TestResourceViewStreaming)
+
+        assert_that(json.loads(b''.join(response.streaming_content)),
+                    equal_to([]))
+
     def test_resource_re_string_multiple_ids(self):
         re = resource_re_string('node', TestResourceViewMultipleIDs)
         assert_that(re, is_(
@@ -539,6 +657,24 @@ class ResourceViewTestCase(TestCase):
             response = view.get(request, **{'id': self.collector1.id})
             assert_that(response.status_code, is_(404))
 
+    def test_by_id_decides_ownership_in_the_lookup_query(self):
+        owner = UserFactory()
+        self.collector1.owners.add(owner)
+        view = TestResourceViewCollector()
+
+        try:
+            for email, visible in [(owner.email, True),
+                                   ('someone@example.com', False)]:
+                user = {'email': email, 'permissions': ['collector-view']}
+                with CaptureQueriesContext(connection) as queries:
+                    model = view.by_id(
+                        HttpRequest(), 'id', self.collector1.id, user=user)
+                assert_that(model is not None, is_(visible))
+                assert_that(len(queries), is_(1))
+        finally:
+            self.collector1.owners.remove(owner)
+            owner.delete()
+
     # --------------------------------------
     # sub view tests
     # --------------------------------------
@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+import json
+from datetime import date, datetime
+from unittest import TestCase
+from uuid import UUID
+
+from django.test import RequestFactory
+from hamcrest import assert_that, equal_to, is_, is_not, contains_string
+
+from ..utils import to_compact_json, to_json, wants_compact_json
+
+
+class Serializable(object):
+
+    def serialize(self):
+        return {'serialized': True}
+
+
+class CompactJsonTestCase(TestCase):
+
+    value = {
+        'id': UUID('00000000-0000-0000-0000-000000000001'),
+        'day': date(2016, 3, 1),
+        'at': datetime(2016, 3, 1, 12, 30, 15),
+        'nested': [Serializable(), 1, 'two'],
+    }
+
+    def test_compact_json_has_no_whitespace_between_tokens(self):
+        encoded = to_compact_json({'a': [1, 2], 'b': {'c': None}})
+
+        assert_that(encoded, is_not(contains_string(' ')))
+        assert_that(encoded, is_not(contains_string('\n')))
+
+    def test_compact_json_decodes_to_the_same_as_the_readable_form(self):
+        assert_that(json.loads(to_compact_json(self.value)),
+                    equal_to(json.loads(to_json(self.value))))
+
+    def test_compact_json_encodes_uuids_dates_and_serializables(self):
+        assert_that(json.loads(to_compact_json(self.value)), equal_to({
+            'id': '00000000-0000-0000-0000-000000000001',
+            'day': '2016-03-01',
+            'at': '2016-03-01T12:30:15',
+            'nested': [{'serialized': True}, 1, 'two'],
+        }))
+
+    def test_to_json_can_be_asked_for_the_compact_form(self):
+        assert_that(to_json([1, 2], compact=True), equal_to('[1,2]'))
+
+
+class WantsCompactJsonTestCase(TestCase):
+
+    def request(self, accept=None):
+        if accept is None:
+            return RequestFactory().get('/')
+        return RequestFactory().get('/', HTTP_ACCEPT=accept)
+
+    def test_endpoint_default_is_used_without_an_indent_parameter(self):
+        assert_that(wants_compact_json(self.request()), is_(False))
+        assert_that(
+            wants_compact_json(self.request('application/json'),
+                               default=True),
+            is_(True))
+
+    def test_indent_zero_asks_for_compact_json(self):
+        assert_that(
+            wants_compact_json(self.request('application/json; indent=0')),
+            is_(True))
+
+    def test_other_indents_ask_for_readable_json(self):
+        assert_that(
+            wants_compact_json(self.request('application/json;indent=1'),
+                               default=True),
+            is_(False))
+
+    def test_indent_on_other_media_types_is_ignored(self):
+        assert_that(
+            wants_compact_json(self.request('text/html; indent=0, */*')),
+            is_(False))
@@ -1,10 +1,14 @@
 import json
 
+from datetime import date
 from django.utils.cache import patch_response_headers
 from functools import wraps
 from uuid import UUID
 from django.http import HttpResponse
 
+COMPACT_SEPARATORS = (',', ':')
+JSON_MEDIA_RANGES = ('application/json', 'application/*', '*/*')
+
 
 class JsonEncoder(json.JSONEncoder):
 
@@ -12,6 +16,9 @@ class JsonEncoder(json.JSONEncoder):
         if isinstance(obj, UUID):
             return '{}'.format(obj)
 
+        if isinstance(obj, date):
+            return obj.isoformat()
+
         if hasattr(obj, 'serialize'):
             return obj.serialize()
 
@@ -27,10 +34,39 @@ def long_cache(a_view):
     return _wrapped_view
 
 
-def to_json(what):
+def to_json(what, compact=False):
+    if compact:
+        return to_compact_json(what)
     return json.dumps(what, indent=1, cls=JsonEncoder)
 
 
+def to_compact_json(what):
+    """
+    Encode ``what`` without any whitespace between tokens. Without an indent
+    the standard library encoder can use its C implementation.
+    """
+    return json.dumps(what, separators=COMPACT_SEPARATORS, cls=JsonEncoder)
+
+
+def wants_compact_json(request, default=False):
+    """
+    Whether to answer ``request`` with compact JSON. An ``indent`` parameter
+    on a JSON media range in the Accept header overrides the endpoint's
+    default: ``application/json; indent=0`` asks for compact output and any
+    other indent for the readable form.
+    """
+    accept = request.META.get('HTTP_ACCEPT', '') if request else ''
+    for media_range in accept.split(','):
+        params = [param.strip() for param in media_range.split(';')]
+        if params[0].lower() not in JSON_MEDIA_RANGES:
+            continue
+        for param in params[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'indent':
+                return value.strip().strip('"') == '0'
+    return default
+
+
 def create_error(request, status, code='', title='', detail=''):
     """creates a JSON API error - http://jsonapi.org/format/#errors
 
@@ -100,6 +100,7 @@ MIDDLEWARE_CLASSES = (
     'dogslow.WatchdogMiddleware',
     'django_statsd.middleware.GraphiteRequestTimingMiddleware',
     'stagecraft.libs.request_logger.middleware.RequestLoggerMiddleware',
+    'stagecraft.libs.compression.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -157,11 +158,6 @@ CELERY_WORKER_MAX_MEMORY_PER_CHILD = 64000
 CELERY_RESULT_BACKEND = 'djcelery.backends.database.DatabaseBackend'
 CELERYBEAT_SCHEDULER = 'djcelery.schedulers.DatabaseScheduler'
 CELERYBEAT_SCHEDULE = {
-    'realtime': {
-        'task': 'stagecraft.apps.collectors.tasks.run_collectors_by_type',
-        'schedule': crontab(minute='*/5'),
-        'args': ('ga-realtime', 'piwik-realtime')
-    },
     'hourly': {
         'task': 'stagecraft.apps.collectors.tasks.run_collectors_by_type',
         'schedule': crontab(minute=0),
@@ -180,6 +176,10 @@ CELERYBEAT_SCHEDULE = {
             'webtrends-reports'
         )
     },
+    'prune-collector-runs': {
+        'task': 'stagecraft.apps.collectors.tasks.prune_collector_runs',
+        'schedule': crontab(minute=30, hour=1),
+    },
 }
 
 
@@ -191,14 +191,18 @@ ROLES = [
             "Provider": ["get", "post", "put", "delete"],
             "DataSource": ["get", "post", "put", "delete"],
             "CollectorType": ["get", "post", "put", "delete"],
-            "Collector": ["get", "post", "put", "delete"]
+            "Collector": ["get", "post", "put", "delete"],
+            "CollectorRun": ["get"],
+            "Backfill": ["get", "post"]
         }
     },
     {
         "role": "collector-view",
         "permissions": {
             "CollectorType": ["get"],
-            "Collector": ["get"]
+            "Collector": ["get"],
+            "CollectorRun": ["get"],
+            "Backfill": ["get"]
         }
     },
     {
@@ -240,6 +244,8 @@ ROLES = [
             "DataSource": ["get", "post", "put", "delete"],
             "CollectorType": ["get", "post", "put", "delete"],
             "Collector": ["get", "post", "put", "delete"],
+            "CollectorRun": ["get"],
+            "Backfill": ["get", "post"],
         },
     },
     {
@@ -290,6 +296,90 @@ ROLES = [
 
 DISABLE_COLLECTORS = False
 
+# How hard scheduled collectors may hit each provider, keyed by provider
+# slug: at most `concurrency` collectors running at once, starting no more
+# than `rate` per second after an initial `burst`. A rate of None is
+# unlimited.
+COLLECTOR_PROVIDER_LIMIT_DEFAULTS = {
+    'concurrency': 4,
+    'rate': None,
+    'burst': 1,
+}
+COLLECTOR_PROVIDER_LIMITS = {
+    'ga': {'concurrency': 2, 'rate': 1, 'burst': 5},
+    'webtrends': {'concurrency': 2, 'rate': 0.5, 'burst': 2},
+    'piwik': {'concurrency': 2, 'rate': 1, 'burst': 2},
+}
+
+# CollectorRuns older than this are deleted by the prune-collector-runs task
+COLLECTOR_RUN_RETENTION_DAYS = 90
+
+# Each worker process keeps the assembled config of up to this many
+# collectors, reloading them when any collector config changes. Needs Redis.
+COLLECTOR_CONFIG_CACHE_SIZE = 1000
+
+# Backfills run this many of their chunks at once. A chunk still marked as
+# running after BACKFILL_CHUNK_TIMEOUT seconds is taken to have failed.
+# A backfill may cover at most BACKFILL_MAX_DAYS days.
+BACKFILL_CONCURRENCY = 4
+BACKFILL_CHUNK_TIMEOUT = 60 * 60 * 2
+BACKFILL_MAX_DAYS = 366 * 2
+
+# Realtime collectors are not scheduled by beat but run by the
+# run_realtime_collectors command, which starts each of them once every
+# REALTIME_COLLECTOR_INTERVAL seconds, at most REALTIME_COLLECTOR_JITTER
+# seconds from its own slot in the interval.
+REALTIME_COLLECTOR_TYPES = ('ga-realtime', 'piwik-realtime')
+REALTIME_COLLECTOR_INTERVAL = 60 * 5
+REALTIME_COLLECTOR_JITTER = 10
+REALTIME_COLLECTOR_WORKERS = 8
+
+# What run_collector does when the collector is already running: 'skip'
+# the run, 'queue' it again after COLLECTOR_OVERLAP_RETRY_DELAY seconds, or
+# 'supersede' it, queueing it again but dropping all but the latest request.
+# A running collector's lock lapses after COLLECTOR_RUN_LOCK_TIMEOUT seconds,
+# and a queued request is forgotten, so an identical one may be queued,
+# after COLLECTOR_PENDING_TIMEOUT.
+COLLECTOR_OVERLAP_POLICY = 'queue'
+COLLECTOR_OVERLAP_RETRY_DELAY = 60
+COLLECTOR_RUN_LOCK_TIMEOUT = 60 * 60 * 2
+COLLECTOR_PENDING_TIMEOUT = 60 * 60 * 6
+
+# Collectors wait up to this many seconds for another worker to finish
+# refreshing a data source's OAuth 2.0 token before refreshing it themselves.
+OAUTH2_REFRESH_LOCK_TIMEOUT = 60
+
+# Redis instance shared with the Celery broker, used for application caches.
+# Leave as None to run without them.
+REDIS_URL = None
+
+SPOTLIGHT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Response bodies smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+# Users looked up by bearer token are kept in each worker process for up to
+# OAUTH_USER_CACHE_TTL seconds. Set OAUTH_USER_CACHE_SIZE to 0 to disable.
+OAUTH_USER_CACHE_SIZE = 1000
+OAUTH_USER_CACHE_TTL = 60
+
+# ResourceViews with stream_list set write unpaginated listings out in
+# chunks of this many items instead of building the whole body in memory.
+STREAM_LIST_RESPONSES = True
+STREAM_LIST_CHUNK_SIZE = 200
+
+# Per-service overrides for stagecraft.libs.http_client, eg.
+# {'signon': {'timeout': 5, 'retries': 1}}
+HTTP_CLIENTS = {
+    'signon': {
+        'timeout': 5,
+    },
+}
+
+# Data-type schemas are read from disk once per process; set this to reread
+# them when the files change.
+SCHEMAS_RELOAD_ON_CHANGE = False
+
 TEMPLATES = [{
     'BACKEND': 'django.template.backends.django.DjangoTemplates',
     'DIRS': ['templates'],
@@ -25,6 +25,9 @@ FERNET_KEYS = [
 
 DEBUG = True
 
+# Pick up edits to the data-type schema files without a restart
+SCHEMAS_RELOAD_ON_CHANGE = True
+
 APP_HOSTNAME = 'stagecraft.dev.gov.uk'
 ENV_HOSTNAME = '.dev.gov.uk'
 
@@ -55,6 +58,9 @@ DEVELOPMENT_USERS = {
 
 MIGRATION_SIGNON_TOKEN = 'development-oauth-access-token'
 
+# Tests read listings from response.content.
+STREAM_LIST_RESPONSES = False
+
 VARNISH_CACHES = [
     ('http://development-1', 7999)
 ]